@@ -0,0 +1,123 @@
+"""
+Sync vs async gate routes under many in-flight evaluations.
+
+Starts the app in-process (httpx ASGI transport, no network), seeds anchors
+into a scratch SQLite file and fires N concurrent /gate/evaluate requests
+at the sync routes (Starlette threadpool) and at the SW_DB_ASYNC=1 routes,
+with inline and group-commit trace writes. Reports evaluations/s, p99
+latency, failed requests and the peak number of live threads.
+
+Run from the project root:
+    python bench/bench_async_gate.py [--inflight 2000] [--anchors 200]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+
+def _worker(args) -> dict:
+    sys.path.insert(0, str(SRC))
+    import httpx
+
+    from app.main import app
+    from app.auth import get_tenant, get_tenant_async
+    from app.db import SessionLocal
+    from app.db_async import dispose_async_engine
+    from app.models import Tenant, TruthAnchor
+
+    with SessionLocal() as db:
+        tenant = Tenant(name="bench", api_key_hash="bench")
+        db.add(tenant)
+        db.add_all(
+            TruthAnchor(level=1 + i % 3, statement=f"Never approve action {i} on resource {i % 50}", scope="global")
+            for i in range(args.anchors)
+        )
+        db.commit()
+        tenant = SimpleNamespace(id=tenant.id)
+    app.dependency_overrides[get_tenant] = lambda: tenant
+    app.dependency_overrides[get_tenant_async] = lambda: tenant
+    # No per-IP rate limit: every request comes from the same client.
+    for route in app.routes:
+        for dep in getattr(route, "dependant", SimpleNamespace(dependencies=[])).dependencies:
+            if dep.call.__name__ == "_rl":
+                app.dependency_overrides[dep.call] = lambda: None
+
+    peak = threading.active_count()
+
+    async def one(client, i):
+        started = time.perf_counter()
+        try:
+            r = await client.post("/gate/evaluate", json={"request_summary": f"please approve action {i % 300} on resource {i % 50}"})
+            ok = r.status_code == 200
+        except Exception:
+            ok = False
+        return ok, time.perf_counter() - started
+
+    async def main():
+        nonlocal peak
+        stop = asyncio.Event()
+
+        async def watch():
+            nonlocal peak
+            while not stop.is_set():
+                peak = max(peak, threading.active_count())
+                await asyncio.sleep(0.005)
+
+        watcher = asyncio.create_task(watch())
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            started = time.perf_counter()
+            results = await asyncio.gather(*(one(client, i) for i in range(args.inflight)))
+            elapsed = time.perf_counter() - started
+        stop.set()
+        await watcher
+        await dispose_async_engine()
+        latencies = sorted(t for ok, t in results if ok)
+        return {
+            "evals_per_s": len(latencies) / elapsed,
+            "errors": sum(1 for ok, _t in results if not ok),
+            "p99_ms": latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000 if latencies else 0.0,
+            "peak_threads": peak,
+        }
+
+    return asyncio.run(main())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--inflight", type=int, default=2000)
+    parser.add_argument("--anchors", type=int, default=200)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(_worker(args)))
+        return
+
+    print(f"{'routes':>6} {'writer':>7} {'evals/s':>9} {'p99 ms':>9} {'errors':>7} {'peak threads':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for writer in ("inline", "group"):
+            for mode in ("sync", "async"):
+                db_path = os.path.join(tmp, f"{mode}-{writer}.db")
+                env = dict(os.environ, SIGNALWEAVER_DB=db_path, SW_DB_PROFILE="throughput", SW_TRACE_WRITER=writer,
+                           SW_TRACE_SPOOL=db_path + ".spool", SW_DB_ASYNC="1" if mode == "async" else "0")
+                cmd = [sys.executable, __file__, "--worker", "--inflight", str(args.inflight),
+                       "--anchors", str(args.anchors)]
+                r = json.loads(subprocess.run(cmd, env=env, check=True, capture_output=True, text=True).stdout)
+                print(f"{mode:>6} {writer:>7} {r['evals_per_s']:>9,.0f} {r['p99_ms']:>9,.0f} {r['errors']:>7} "
+                      f"{r['peak_threads']:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Concurrent evaluate throughput per SQLite storage profile (SW_DB_PROFILE).
+
+Each profile runs in its own process against a fresh scratch database
+seeded with anchors. Worker threads call the /gate/evaluate route function
+directly (no HTTP, no auth) with their own sessions, then issue read-only
+queries over the traces written. readonly-analytics can't evaluate, so it
+only runs the read phase, against a database prepared by a writable profile.
+
+Run from the project root:
+    python bench/bench_db_profiles.py [--threads 8] [--requests 400] [--anchors 200]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+PROFILES = ("default", "throughput", "durable", "readonly-analytics")
+
+
+def _worker(args) -> dict:
+    sys.path.insert(0, str(SRC))
+    from types import SimpleNamespace
+
+    from fastapi import Response
+    from sqlalchemy import select
+
+    import app.main  # noqa: F401  (creates tables)
+    from app.api.gate import evaluate
+    from app.db import DB_PROFILE, SessionLocal
+    from app.models import DecisionTrace, TruthAnchor
+    from app.schemas import GateEvaluateIn
+
+    tenant = SimpleNamespace(id=1)
+    out = {"profile": DB_PROFILE.name}
+
+    if not DB_PROFILE.read_only:
+        with SessionLocal() as db:
+            if db.scalar(select(TruthAnchor.id).limit(1)) is None:
+                db.add_all(
+                    TruthAnchor(level=1 + i % 3, statement=f"Never approve action {i} on resource {i % 50}", scope="global")
+                    for i in range(args.anchors)
+                )
+                db.commit()
+
+        def one_eval(i):
+            with SessionLocal() as db:
+                evaluate(GateEvaluateIn(request_summary=f"please approve action {i % 300} on resource {i % 50}"),
+                         Response(), db=db, tenant=tenant)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as pool:
+            list(pool.map(one_eval, range(args.requests)))
+        out["evaluate_per_s"] = args.requests / (time.perf_counter() - started)
+
+    def one_read(i):
+        with SessionLocal() as db:
+            list(db.scalars(select(DecisionTrace).order_by(DecisionTrace.id.desc()).offset(i % 100).limit(50)))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        list(pool.map(one_read, range(args.requests)))
+    out["reads_per_s"] = args.requests / (time.perf_counter() - started)
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--anchors", type=int, default=200)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(_worker(args)))
+        return
+
+    print(f"{'profile':>20} {'evaluate/s':>11} {'reads/s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        shared = os.path.join(tmp, "shared.db")
+        for profile in PROFILES:
+            # readonly-analytics reads the database the previous profile wrote.
+            db_path = shared if profile in ("durable", "readonly-analytics") else os.path.join(tmp, f"{profile}.db")
+            env = dict(os.environ, SIGNALWEAVER_DB=db_path, SW_DB_PROFILE=profile, SW_TRACE_SPOOL=db_path + ".spool")
+            cmd = [sys.executable, __file__, "--worker", "--threads", str(args.threads),
+                   "--requests", str(args.requests), "--anchors", str(args.anchors)]
+            result = json.loads(subprocess.run(cmd, env=env, check=True, capture_output=True, text=True).stdout)
+            evals = result.get("evaluate_per_s")
+            print(f"{profile:>20} {evals and f'{evals:,.0f}' or 'n/a':>11} {result['reads_per_s']:>9,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Trace persistence benchmark: ORM unit-of-work vs multi-row Core INSERTs.
+
+Writes one GateLog + DecisionTrace with a snapshot row per active anchor
+(the pre-manifest evaluate shape, i.e. the worst case) into a scratch SQLite
+file, and reports rows/s for:
+
+    orm   one ORM object per row, db.add() each, flush for IDs, commit
+    core  app.trace_writer.write_records(): executemany INSERTs, precomputed hashes
+
+Run from the project root:
+    python bench/bench_trace_writes.py [--traces 20] [--anchors 100 1000 10000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.models import Base, DecisionTrace, DecisionTraceAnchor, GateLog, TruthAnchor  # noqa: E402
+from app.trace_writer import TraceRecord, write_records  # noqa: E402
+
+
+def _anchors(n: int) -> list[TruthAnchor]:
+    return [
+        TruthAnchor(id=i + 1, level=1 + i % 3, statement=f"Policy statement number {i} about topic {i % 97}",
+                    scope="global", active=True)
+        for i in range(n)
+    ]
+
+
+def _write_orm(db, anchors, i: int) -> None:
+    log = GateLog(request_summary=f"request {i}", decision="gate", reason="l3_anchor_conflict")
+    db.add(log)
+    db.flush()
+    trace = DecisionTrace(request_text=f"request {i}", decision="gate", reason="l3_anchor_conflict")
+    db.add(trace)
+    db.flush()
+    for a in anchors:
+        db.add(DecisionTraceAnchor(
+            trace_id=trace.id, anchor_id=a.id, anchor_hash=a.stable_hash(), statement_snapshot=a.statement,
+            scope_snapshot=a.scope, level_snapshot=a.level, active_snapshot=a.active,
+            matched=(a.id == 1), match_note="conflict",
+        ))
+    db.commit()
+
+
+def _write_core(db, snapshot_rows, i: int) -> None:
+    record = TraceRecord(
+        log={"request_summary": f"request {i}", "decision": "gate", "reason": "l3_anchor_conflict"},
+        trace={"request_text": f"request {i}", "decision": "gate", "reason": "l3_anchor_conflict"},
+        anchors=snapshot_rows,
+    )
+    write_records(db, [record])
+    db.commit()
+
+
+def run(n_anchors: int, n_traces: int) -> dict:
+    anchors = _anchors(n_anchors)
+    # Hashes are computed once per anchor version, not per trace.
+    snapshot_rows = [
+        dict(anchor_id=a.id, anchor_hash=a.stable_hash(), statement_snapshot=a.statement, scope_snapshot=a.scope,
+             level_snapshot=a.level, active_snapshot=a.active, matched=(a.id == 1), match_note="conflict")
+        for a in anchors
+    ]
+    out = {}
+    for mode in ("orm", "core"):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            Base.metadata.create_all(engine)
+            Session = sessionmaker(bind=engine, autoflush=False)
+            with Session() as db:
+                db.add_all(_anchors(n_anchors))
+                db.commit()
+            started = time.perf_counter()
+            for i in range(n_traces):
+                with Session() as db:
+                    if mode == "orm":
+                        _write_orm(db, anchors, i)
+                    else:
+                        _write_core(db, snapshot_rows, i)
+            elapsed = time.perf_counter() - started
+            engine.dispose()
+        rows = n_traces * (n_anchors + 2)
+        out[mode] = rows / elapsed
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--traces", type=int, default=20)
+    parser.add_argument("--anchors", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    print(f"{'anchors':>8} {'orm rows/s':>12} {'core rows/s':>12} {'speedup':>8}")
+    for n in args.anchors:
+        r = run(n, args.traces)
+        print(f"{n:>8} {r['orm']:>12,.0f} {r['core']:>12,.0f} {r['core'] / r['orm']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
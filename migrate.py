@@ -1,13 +1,90 @@
-import sqlite3
+"""
+Bring an existing database up to the current schema.
 
-conn = sqlite3.connect(r'C:\Users\verti\projects\signalweaver\data\signalweaver.db')
-cur = conn.cursor()
+Uses the app's own engine, so it migrates whatever SIGNALWEAVER_DATABASE_URL
+(or SIGNALWEAVER_DB for SQLite) points at. Missing tables and indexes are
+created from the models; columns added since a table was first created are
+ALTERed in. Gate logs written before gate_log_anchors existed are then linked
+in chunks (app.gate_log_anchors.backfill), which is safe while the app runs,
+and newly created anchor_counters and decision_rollups tables are filled
+from history. Safe to run repeatedly.
 
-cur.execute("ALTER TABLE policy_profiles ADD COLUMN enforcement_mode TEXT NOT NULL DEFAULT 'hard'")
-cur.execute("ALTER TABLE decision_traces ADD COLUMN would_block INTEGER NOT NULL DEFAULT 0")
-cur.execute("ALTER TABLE decision_traces ADD COLUMN enforcement_mode_snapshot TEXT NOT NULL DEFAULT 'hard'")
-cur.execute("ALTER TABLE decision_traces ADD COLUMN override_reason TEXT NOT NULL DEFAULT ''")
+    python migrate.py
+"""
 
-conn.commit()
-conn.close()
-print('migration OK')
\ No newline at end of file
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src"))
+
+from sqlalchemy import inspect, text  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+from app.db import SessionLocal, engine  # noqa: E402
+from app.anchor_counters import rebuild  # noqa: E402
+from app.decision_rollups import rebuild as rebuild_rollups  # noqa: E402
+from app.gate_log_anchors import backfill  # noqa: E402
+from app.models import Base  # noqa: E402
+
+# Columns added to existing tables, with the default that backfills old rows.
+ADDED_COLUMNS = [
+    ("policy_profiles", "enforcement_mode", "'hard'"),
+    ("decision_traces", "would_block", "false"),
+    ("decision_traces", "enforcement_mode_snapshot", "'hard'"),
+    ("decision_traces", "override_reason", "''"),
+    ("decision_traces", "anchor_generation", None),
+    ("decision_traces", "manifest_hash", None),
+    ("decision_traces", "trace_tier", "'full'"),
+    ("decision_traces", "trace_sample_rate", "1"),
+    ("tenants", "trace_proceed_sample_rate", None),
+    ("policy_profiles", "trace_proceed_sample_rate", None),
+    ("gate_logs", "tenant_id", None),
+    ("decision_traces", "tenant_id", None),
+]
+
+
+def migrate(bind: Engine) -> list[str]:
+    """Apply missing schema changes; returns a description of each one."""
+    applied = []
+    existing = set(inspect(bind).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            applied.append(f"create table {table.name}")
+    Base.metadata.create_all(bind=bind)
+
+    with bind.begin() as conn:
+        for table_name, column_name, default in ADDED_COLUMNS:
+            if table_name not in existing:
+                continue  # created above with every column
+            present = {c["name"] for c in inspect(conn).get_columns(table_name)}
+            if column_name in present:
+                continue
+            column = Base.metadata.tables[table_name].c[column_name]
+            ddl = f"{column_name} {column.type.compile(dialect=bind.dialect)}"
+            if default is not None:
+                ddl += f" NOT NULL DEFAULT {default}"
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {ddl}"))
+            applied.append(f"add column {table_name}.{column_name}")
+
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing:
+                continue
+            present = {i["name"] for i in inspect(conn).get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in present:
+                    index.create(conn)
+                    applied.append(f"create index {index.name}")
+    return applied
+
+
+if __name__ == "__main__":
+    applied = migrate(engine)
+    for change in applied:
+        print(change)
+    with SessionLocal() as db:
+        print(f"gate_log_anchors backfilled: {backfill(db)} rows")
+        if "create table anchor_counters" in applied:
+            print(f"anchor_counters rebuilt: {rebuild(db)} rows")
+        if "create table decision_rollups" in applied:
+            print(f"decision_rollups rebuilt: {rebuild_rollups(db)} rows")
+    print("migration OK")
@@ -0,0 +1,24 @@
+"""
+Recompute the insight counters (anchor_counters) and decision rollups
+(decision_rollups) from gate_logs, gate_log_anchors and decision_traces,
+for whatever database the app is configured for.
+
+Gate logs and traces written while it runs may be missing from the result.
+Pause traffic first, or run it again once traffic is quiet.
+
+    python rebuild_counters.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src"))
+
+from app.anchor_counters import rebuild  # noqa: E402
+from app.decision_rollups import rebuild as rebuild_rollups  # noqa: E402
+from app.db import SessionLocal  # noqa: E402
+
+if __name__ == "__main__":
+    with SessionLocal() as db:
+        print(f"anchor_counters rebuilt: {rebuild(db)} rows")
+        print(f"decision_rollups rebuilt: {rebuild_rollups(db)} rows")
@@ -0,0 +1,126 @@
+"""
+Insight counters (anchor_counters), so /insight reads O(anchors) rows
+instead of scanning gate_logs and decision_traces.
+
+Per (tenant, anchor, decision) they count gate logs the anchor conflicted
+in, the acknowledged overrides among them, and the last time it was hit.
+anchor_id 0 counts every log and trace of the tenant. count_records() is
+called by write_records() and count_logs() by reframe, inside the
+transaction that writes the rows, so the counters commit or roll back with
+them. Deltas are summed per key and applied with one upsert_add().
+
+rebuild() recomputes everything from history in one transaction:
+
+    python rebuild_counters.py
+
+Run it after restoring or pruning logs. Logs written while it runs may be
+missing from the result, so pause traffic first or run it again afterwards.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.orm import Session
+
+from app.db import upsert_add
+from app.models import AnchorCounter, DecisionTrace, GateLog, GateLogAnchor
+
+TOTALS = 0  # anchor_id of a tenant's totals row
+
+OVERRIDE_REASON = "proceed_acknowledged"
+
+
+class _Delta:
+    __slots__ = ("logs", "traces", "overrides", "last_hit_at")
+
+    def __init__(self) -> None:
+        self.logs = self.traces = self.overrides = 0
+        self.last_hit_at: datetime | None = None
+
+    def add_log(self, reason: str, created_at: datetime | None) -> None:
+        self.logs += 1
+        self.overrides += int(reason == OVERRIDE_REASON)
+        if created_at is not None and (self.last_hit_at is None or created_at > self.last_hit_at):
+            self.last_hit_at = created_at
+
+
+def _count_log(deltas: dict, tenant_id: int | None, log: dict, anchor_ids) -> None:
+    tenant = tenant_id or 0
+    decision, reason, created_at = log["decision"], log.get("reason") or "", log.get("created_at")
+    deltas[(tenant, TOTALS, decision)].add_log(reason, created_at)
+    for anchor_id in set(anchor_ids):
+        deltas[(tenant, anchor_id, decision)].add_log(reason, created_at)
+
+
+def count_records(db: Session, records) -> None:
+    """Count TraceRecords (each a gate log, its anchor links and a trace) being written."""
+    deltas: dict = defaultdict(_Delta)
+    for r in records:
+        tenant_id = r.log.get("tenant_id")
+        _count_log(deltas, tenant_id, r.log, (row["anchor_id"] for row in r.log_anchors))
+        deltas[(tenant_id or 0, TOTALS, r.trace["decision"])].traces += 1
+    _apply(db, deltas)
+
+
+def count_logs(db: Session, logs: list[GateLog]) -> None:
+    """Count gate logs written without a trace (reframe); their anchors must be loaded or pending."""
+    deltas: dict = defaultdict(_Delta)
+    for log in logs:
+        values = {"decision": log.decision, "reason": log.reason, "created_at": log.created_at}
+        _count_log(deltas, log.tenant_id, values, (a.anchor_id for a in log.anchors))
+    _apply(db, deltas)
+
+
+def _apply(db: Session, deltas: dict) -> None:
+    rows = [
+        {"tenant_id": t, "anchor_id": a, "decision": d, "logs": v.logs, "traces": v.traces,
+         "overrides": v.overrides, "last_hit_at": v.last_hit_at}
+        for (t, a, d), v in deltas.items()
+    ]
+    upsert_add(db, AnchorCounter.__table__, ["tenant_id", "anchor_id", "decision"], rows, latest=("last_hit_at",))
+
+
+def rebuild(db: Session) -> int:
+    """Recompute all counters from gate_logs, gate_log_anchors and decision_traces; returns rows written."""
+    tenant = func.coalesce(GateLog.tenant_id, 0)
+    overrides = func.sum(case((GateLog.reason == OVERRIDE_REASON, 1), else_=0))
+    counters: dict = {}
+
+    def row(key) -> dict:
+        if key not in counters:
+            counters[key] = {"logs": 0, "traces": 0, "overrides": 0, "last_hit_at": None}
+        return counters[key]
+
+    totals = db.execute(
+        select(tenant, GateLog.decision, func.count(), overrides, func.max(GateLog.created_at))
+        .group_by(tenant, GateLog.decision)
+    )
+    for t, decision, logs, ov, last in totals:
+        row((t, TOTALS, decision)).update(logs=logs, overrides=ov or 0, last_hit_at=last)
+
+    per_anchor = db.execute(
+        select(tenant, GateLogAnchor.anchor_id, GateLog.decision, func.count(), overrides, func.max(GateLog.created_at))
+        .join(GateLog, GateLog.id == GateLogAnchor.log_id)
+        .group_by(tenant, GateLogAnchor.anchor_id, GateLog.decision)
+    )
+    for t, anchor_id, decision, logs, ov, last in per_anchor:
+        row((t, anchor_id, decision)).update(logs=logs, overrides=ov or 0, last_hit_at=last)
+
+    trace_tenant = func.coalesce(DecisionTrace.tenant_id, 0)
+    traces = db.execute(
+        select(trace_tenant, DecisionTrace.decision, func.count()).group_by(trace_tenant, DecisionTrace.decision)
+    )
+    for t, decision, n in traces:
+        row((t, TOTALS, decision))["traces"] = n
+
+    db.execute(delete(AnchorCounter))
+    if counters:
+        db.execute(
+            AnchorCounter.__table__.insert(),
+            [{"tenant_id": t, "anchor_id": a, "decision": d, **v} for (t, a, d), v in sorted(counters.items())],
+        )
+    db.commit()
+    return len(counters)
@@ -0,0 +1,55 @@
+"""
+Persisted anchor-set generation numbers.
+
+Every change to a tenant's anchor set (anchor create/archive, profile
+membership) bumps a counter in the same transaction as the change, so
+"has the anchor set moved since generation N?" is one primary-key read for
+any worker, cache or client.
+
+A tenant sees its own anchors plus the shared ones (tenant_id NULL, counted
+under row 0), so its generation is the sum of the two counters — still
+monotonic, and it moves whenever either set does.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db import upsert_add
+from app.models import AnchorSetGeneration, TruthAnchor
+
+SHARED_ANCHORS = 0
+
+
+def _row_key(tenant_id: int | None) -> int:
+    return SHARED_ANCHORS if tenant_id is None else tenant_id
+
+
+def bump_anchor_generation(db: Session, tenant_id: int | None) -> None:
+    """Bump the generation of the anchor set owned by tenant_id; the caller commits."""
+    # One upsert, so two first writes for a tenant can't both try to insert its row.
+    row = {"tenant_id": _row_key(tenant_id), "generation": 1}
+    upsert_add(db, AnchorSetGeneration.__table__, ["tenant_id"], [row])
+
+
+def current_anchor_generation(db: Session, tenant_id: int | None) -> int:
+    """Generation of the anchor set visible to tenant_id."""
+    keys = {SHARED_ANCHORS, _row_key(tenant_id)}
+    total = db.scalar(
+        select(func.coalesce(func.sum(AnchorSetGeneration.generation), 0))
+        .where(AnchorSetGeneration.tenant_id.in_(keys))
+    )
+    return int(total or 0)
+
+
+def visible_anchors_stmt(tenant_id: int | None):
+    """Active anchors in the set current_anchor_generation() versions for tenant_id."""
+    return select(TruthAnchor).where(
+        TruthAnchor.active == True,  # noqa: E712
+        (TruthAnchor.tenant_id == tenant_id) | (TruthAnchor.tenant_id == None),  # noqa: E711
+    )
+
+
+def anchor_generation_etag(generation: int) -> str:
+    return f'"anchors-{generation}"'
@@ -0,0 +1,216 @@
+"""
+Process-wide compiled anchor index for the naive matcher.
+
+Each anchor statement is normalised and tokenised once and cached under its
+TruthAnchor.stable_hash(), so a gate request only pays for tokenising the
+request text itself. Inverted postings (token, bigram, not-stripped text,
+scope) let the matcher score only anchors that share terms with the request.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from dataclasses import dataclass
+
+_FILLER = frozenset({"a", "an", "the", "to", "and", "or", "of", "in", "on", "for"})
+_STOP = _FILLER | {"i", "you", "we", "it", "is", "are", "be", "will", "not", "do"}
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _norm(s: str) -> str:
+    return " ".join(s.strip().lower().split())
+
+
+def _has_not(s: str) -> bool:
+    s = _norm(s)
+    return " not " in f" {s} "
+
+
+def _strip_not(s: str) -> str:
+    s = _norm(s)
+    return " ".join(tok for tok in s.split() if tok != "not")
+
+
+def _stem(t: str) -> str:
+    if t.endswith("ing") and len(t) > 5:
+        t = t[:-3]
+    elif t.endswith("ed") and len(t) > 4:
+        t = t[:-2]
+    elif t.endswith("s") and len(t) > 4:
+        t = t[:-1]
+    return t
+
+
+def _meaningful_tokens(s: str) -> list[str]:
+    toks: list[str] = []
+    for raw in _TOKEN_RE.findall(_norm(s)):
+        t = _stem(raw)
+        if len(t) < 3:
+            continue
+        if t in _STOP:
+            continue
+        toks.append(t)
+
+    return toks
+
+
+def _bigrams(tokens: list[str]) -> set[str]:
+    return {f"{tokens[i]} {tokens[i+1]}" for i in range(len(tokens) - 1)}
+
+
+@dataclass(frozen=True)
+class CompiledAnchor:
+    """Everything the naive matcher needs to know about one anchor statement."""
+
+    norm: str
+    has_not: bool
+    wo_not: str
+    tokens: frozenset[str]
+    bigrams: frozenset[str]
+
+
+def compile_statement(statement: str) -> CompiledAnchor:
+    stmt_norm = _norm(statement)
+    tokens = _meaningful_tokens(stmt_norm)
+    return CompiledAnchor(
+        norm=stmt_norm,
+        has_not=_has_not(stmt_norm),
+        wo_not=_strip_not(stmt_norm),
+        tokens=frozenset(tokens),
+        bigrams=frozenset(_bigrams(tokens)),
+    )
+
+
+def _signature(anchor) -> tuple:
+    # Same fields stable_hash() covers; lets us skip re-hashing unchanged anchors.
+    return (anchor.level, anchor.scope, bool(anchor.active), anchor.statement)
+
+
+class AnchorIndex:
+    """
+    Compiled anchors keyed by stable_hash().
+
+    The API keeps it current on anchor create/archive; get() also compiles on
+    miss, so anchors written by another worker or a seed script still match.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._by_hash: dict[str, CompiledAnchor] = {}
+        self._ids_by_hash: dict[str, set[int]] = {}
+        self._hash_by_id: dict[int, tuple[tuple, str]] = {}
+        self._by_token: dict[str, set[str]] = {}
+        self._by_bigram: dict[str, set[str]] = {}
+        self._by_wo_not: dict[str, set[str]] = {}
+        self._by_scope: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_hash)
+
+    def key_for(self, anchor) -> str:
+        """Return the anchor's stable hash, binding it into the index if new or changed."""
+        sig = _signature(anchor)
+        bound = self._hash_by_id.get(anchor.id)
+        if bound is not None and bound[0] == sig:
+            return bound[1]
+        return self._bind(anchor, sig)
+
+    def get(self, anchor) -> CompiledAnchor:
+        compiled = self._by_hash.get(self.key_for(anchor))
+        if compiled is None:
+            # Unbound by a concurrent archive between key_for() and here.
+            compiled = compile_statement(anchor.statement)
+        return compiled
+
+    def add(self, anchor) -> CompiledAnchor:
+        return self.get(anchor)
+
+    def candidates(self, tokens, bigrams, wo_not: str) -> tuple[set[str], dict[str, int], set[str]]:
+        """
+        Keys that could possibly match a request.
+
+        Returns (negation_keys, token_overlap, bigram_keys): keys sharing the
+        request's not-stripped text, keys mapped to how many request tokens
+        they share, and keys sharing at least one request bigram.
+        """
+        token_overlap: dict[str, int] = {}
+        bigram_keys: set[str] = set()
+        with self._lock:
+            negation_keys = set(self._by_wo_not.get(wo_not, ()))
+            for t in tokens:
+                for key in self._by_token.get(t, ()):
+                    token_overlap[key] = token_overlap.get(key, 0) + 1
+            for bg in bigrams:
+                bigram_keys.update(self._by_bigram.get(bg, ()))
+        return negation_keys, token_overlap, bigram_keys
+
+    def keys_with_scope(self, scope: str) -> set[str]:
+        with self._lock:
+            return set(self._by_scope.get(scope, ()))
+
+    def discard(self, anchor_id: int) -> None:
+        with self._lock:
+            self._unbind(anchor_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_hash.clear()
+            self._ids_by_hash.clear()
+            self._hash_by_id.clear()
+            self._by_token.clear()
+            self._by_bigram.clear()
+            self._by_wo_not.clear()
+            self._by_scope.clear()
+
+    def _bind(self, anchor, sig: tuple) -> str:
+        key = anchor.stable_hash()
+        with self._lock:
+            self._unbind(anchor.id)
+            if key not in self._by_hash:
+                compiled = compile_statement(anchor.statement)
+                self._by_hash[key] = compiled
+                self._post(key, compiled, anchor.scope)
+            self._ids_by_hash.setdefault(key, set()).add(anchor.id)
+            self._hash_by_id[anchor.id] = (sig, key)
+        return key
+
+    def _unbind(self, anchor_id: int) -> None:
+        bound = self._hash_by_id.pop(anchor_id, None)
+        if bound is None:
+            return
+        key = bound[1]
+        ids = self._ids_by_hash.get(key)
+        if ids is not None:
+            ids.discard(anchor_id)
+            if not ids:
+                del self._ids_by_hash[key]
+                compiled = self._by_hash.pop(key, None)
+                if compiled is not None:
+                    self._unpost(key, compiled, bound[0][1])
+
+    def _post(self, key: str, compiled: CompiledAnchor, scope: str) -> None:
+        for t in compiled.tokens:
+            self._by_token.setdefault(t, set()).add(key)
+        for bg in compiled.bigrams:
+            self._by_bigram.setdefault(bg, set()).add(key)
+        self._by_wo_not.setdefault(compiled.wo_not, set()).add(key)
+        self._by_scope.setdefault(scope, set()).add(key)
+
+    def _unpost(self, key: str, compiled: CompiledAnchor, scope: str) -> None:
+        for postings, terms in (
+            (self._by_token, compiled.tokens),
+            (self._by_bigram, compiled.bigrams),
+            (self._by_wo_not, (compiled.wo_not,)),
+            (self._by_scope, (scope,)),
+        ):
+            for term in terms:
+                keys = postings.get(term)
+                if keys is None:
+                    continue
+                keys.discard(key)
+                if not keys:
+                    del postings[term]
+
+
+anchor_index = AnchorIndex()
@@ -0,0 +1,132 @@
+"""
+Content-addressed anchor-set snapshots for decision traces.
+
+Instead of copying every active anchor into decision_trace_anchors on every
+evaluation, each distinct anchor state is stored once in anchor_versions
+(keyed by TruthAnchor.stable_hash()) and each distinct anchor set once in
+anchor_manifests (keyed by a hash over its ordered [anchor_id, version]
+list). A trace references its manifest; replay reads the manifest back as
+the same rows the per-trace snapshot used to hold.
+
+The manifest of a tenant's anchor set is remembered per anchor-set
+generation, so steady-state evaluations don't touch truth_anchors for it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.anchor_generation import current_anchor_generation, visible_anchors_stmt
+from app.models import AnchorManifest, AnchorVersion, TruthAnchor
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    """Same fields replay reads from a DecisionTraceAnchor snapshot row."""
+
+    anchor_id: int
+    anchor_hash: str
+    level_snapshot: int
+    scope_snapshot: str
+    active_snapshot: bool
+    statement_snapshot: str
+
+
+def manifest_hash(entries: list[tuple[int, str]]) -> str:
+    payload = "\n".join(f"{anchor_id}:{version}" for anchor_id, version in entries)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_lock = threading.Lock()
+# tenant_id -> (generation, manifest hash) for the latest generation seen.
+_by_tenant: dict[int, tuple[int, str]] = {}
+
+
+def ensure_manifest(db: Session, tenant_id: int, generation: int) -> str:
+    """Hash of the manifest for the tenant's current anchor set, storing it if new."""
+    with _lock:
+        known = _by_tenant.get(tenant_id)
+    if known is not None and known[0] == generation:
+        return known[1]
+
+    anchors = list(db.scalars(visible_anchors_stmt(tenant_id).order_by(TruthAnchor.id)).all())
+    digest = store_manifest(db, anchors)
+
+    # Only remember it if the set didn't move while we were reading it.
+    if current_anchor_generation(db, tenant_id) == generation:
+        with _lock:
+            _by_tenant[tenant_id] = (generation, digest)
+    return digest
+
+
+def store_manifest(db: Session, anchors: list[TruthAnchor]) -> str:
+    """Write any unseen anchor versions and the manifest itself; returns its hash."""
+    entries = sorted((a.id, a.stable_hash()) for a in anchors)
+    digest = manifest_hash(entries)
+    if db.get(AnchorManifest, digest) is not None:
+        return digest
+
+    by_hash = {a.stable_hash(): a for a in anchors}
+    for attempt in range(2):
+        existing = set(
+            db.scalars(select(AnchorVersion.hash).where(AnchorVersion.hash.in_(by_hash))).all()
+        ) if by_hash else set()
+        try:
+            versions = [
+                {"hash": h, "level": a.level, "scope": a.scope, "active": bool(a.active), "statement": a.statement}
+                for h, a in by_hash.items()
+                if h not in existing
+            ]
+            with db.begin_nested():
+                if versions:
+                    db.execute(insert(AnchorVersion.__table__), versions)
+                db.execute(
+                    insert(AnchorManifest.__table__),
+                    {"hash": digest, "entries_json": json.dumps(entries)},
+                )
+            return digest
+        except IntegrityError:
+            # Another writer stored some of the same versions (or this very
+            # manifest) first; pick up what it wrote and try once more.
+            if db.get(AnchorManifest, digest) is not None:
+                return digest
+            if attempt:
+                raise
+    return digest
+
+
+def load_manifest(db: Session, digest: str) -> list[ManifestEntry] | None:
+    """Manifest rows in anchor_id order, or None if the manifest isn't stored."""
+    manifest = db.get(AnchorManifest, digest)
+    if manifest is None:
+        return None
+    entries = [(int(anchor_id), version) for anchor_id, version in json.loads(manifest.entries_json)]
+    versions = {
+        v.hash: v
+        for v in db.scalars(
+            select(AnchorVersion).where(AnchorVersion.hash.in_({h for _id, h in entries}))
+        )
+    }
+    return [
+        ManifestEntry(
+            anchor_id=anchor_id,
+            anchor_hash=h,
+            level_snapshot=versions[h].level,
+            scope_snapshot=versions[h].scope,
+            active_snapshot=versions[h].active,
+            statement_snapshot=versions[h].statement,
+        )
+        for anchor_id, h in entries
+    ]
+
+
+def forget_manifests() -> None:
+    with _lock:
+        _by_tenant.clear()
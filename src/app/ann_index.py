@@ -0,0 +1,117 @@
+"""
+Inverted-file (IVF) approximate nearest-neighbour index over anchor embeddings.
+
+Anchor vectors are L2-normalised, so inner product is cosine similarity.
+Rows are bucketed under the nearest of `nlist` centroids (spherical k-means);
+a query scores the centroids, probes the `nprobe` closest buckets and scores
+only those rows exactly. Recall goes up (and latency with it) as nprobe
+approaches nlist.
+
+Knobs (read when the index is built):
+    SW_EMBEDDING_INDEX   exact | ivf            (default exact)
+    SW_ANN_MIN_ANCHORS   below this, stay exact (default 20000)
+    SW_ANN_NLIST         buckets; 0 = 4*sqrt(n) (default 0)
+    SW_ANN_NPROBE        buckets probed/query   (default 8)
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+_TRAIN_ITERS = 6
+_TRAIN_SAMPLE_PER_LIST = 32
+_ASSIGN_CHUNK = 16384
+
+
+@dataclass(frozen=True)
+class AnnSettings:
+    enabled: bool
+    min_anchors: int
+    nlist: int
+    nprobe: int
+
+    @classmethod
+    def from_env(cls) -> "AnnSettings":
+        return cls(
+            enabled=os.getenv("SW_EMBEDDING_INDEX", "exact").lower() == "ivf",
+            min_anchors=int(os.getenv("SW_ANN_MIN_ANCHORS", "20000")),
+            nlist=int(os.getenv("SW_ANN_NLIST", "0")),
+            nprobe=int(os.getenv("SW_ANN_NPROBE", "8")),
+        )
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    out = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), _ASSIGN_CHUNK):
+        block = vectors[start:start + _ASSIGN_CHUNK]
+        out[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+class IVFIndex:
+    """
+    Immutable once built: add() returns a new index that shares the untouched
+    buckets, so concurrent searches never see a half-updated structure.
+    """
+
+    def __init__(self, centroids: np.ndarray, lists: list[np.ndarray], nprobe: int, trained_size: int) -> None:
+        self.centroids = centroids
+        self.lists = lists
+        self.nprobe = max(1, min(nprobe, len(lists)))
+        self.trained_size = trained_size
+
+    @classmethod
+    def train(cls, matrix: np.ndarray, rows: np.ndarray, nlist: int, nprobe: int, seed: int = 0) -> "IVFIndex":
+        """Cluster matrix[rows]; deterministic for a given matrix, rows and seed."""
+        n = len(rows)
+        k = nlist if nlist > 0 else int(4 * math.sqrt(n))
+        k = max(1, min(k, n))
+
+        rng = np.random.default_rng(seed)
+        sample_size = min(n, k * _TRAIN_SAMPLE_PER_LIST)
+        sample = matrix[np.sort(rng.choice(rows, size=sample_size, replace=False))]
+        centroids = sample[rng.choice(sample_size, size=k, replace=False)].copy()
+
+        for _ in range(_TRAIN_ITERS):
+            assign = _assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1)
+            filled = norms > 0
+            # Empty buckets keep their previous centroid.
+            centroids[filled] = sums[filled] / norms[filled, None]
+
+        assign = _assign(matrix[rows], centroids)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(k + 1))
+        sorted_rows = rows[order]
+        lists = [sorted_rows[bounds[c]:bounds[c + 1]] for c in range(k)]
+        return cls(centroids, lists, nprobe, trained_size=n)
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self.lists)
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray) -> "IVFIndex":
+        assign = _assign(vectors, self.centroids)
+        lists = list(self.lists)
+        for c in np.unique(assign):
+            lists[c] = np.concatenate([lists[c], rows[assign == c]])
+        return IVFIndex(self.centroids, lists, self.nprobe, self.trained_size)
+
+    def search(self, matrix: np.ndarray, query: np.ndarray, threshold: float) -> tuple[np.ndarray, np.ndarray]:
+        """Rows (and exact scores) at or above threshold among the probed buckets."""
+        centroid_scores = self.centroids @ query
+        if self.nprobe < len(self.lists):
+            probe = np.argpartition(-centroid_scores, self.nprobe - 1)[: self.nprobe]
+        else:
+            probe = np.arange(len(self.lists))
+        candidates = np.concatenate([self.lists[c] for c in probe])
+        if len(candidates) == 0:
+            return candidates, np.zeros(0, dtype=matrix.dtype)
+        scores = matrix[candidates] @ query
+        keep = scores >= threshold
+        return candidates[keep], scores[keep]
@@ -1,4 +1,4 @@
-﻿from fastapi import APIRouter, Depends, HTTPException
+﻿from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 
@@ -6,6 +6,10 @@ from app.db import get_db
 from app.auth import get_tenant
 from app.models import TruthAnchor, Tenant
 from app.schemas import TruthAnchorCreate, TruthAnchorOut
+from app.anchor_generation import anchor_generation_etag, bump_anchor_generation, current_anchor_generation
+from app.anchor_index import anchor_index
+from app.decision_cache import decision_cache
+from app.embedding_matcher import forget_anchor, store_anchor
 
 router = APIRouter()
 
@@ -14,8 +18,12 @@ router = APIRouter()
 def create_anchor(payload: TruthAnchorCreate, db: Session = Depends(get_db), tenant: Tenant = Depends(get_tenant)):
     anchor = TruthAnchor(level=payload.level, statement=payload.statement, scope=payload.scope, tenant_id=tenant.id)
     db.add(anchor)
+    bump_anchor_generation(db, anchor.tenant_id)
     db.commit()
     db.refresh(anchor)
+    anchor_index.add(anchor)
+    decision_cache.invalidate()
+    store_anchor(anchor)
     return anchor
 
 
@@ -30,6 +38,18 @@ def list_anchors(active_only: bool = True, db: Session = Depends(get_db), tenant
     return list(db.scalars(stmt).all())
 
 
+@router.get("/generation")
+def get_anchor_generation(
+    request: Request, response: Response, db: Session = Depends(get_db), tenant: Tenant = Depends(get_tenant)
+):
+    generation = current_anchor_generation(db, tenant.id)
+    etag = anchor_generation_etag(generation)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return {"generation": generation}
+
+
 @router.get("/{anchor_id}", response_model=TruthAnchorOut)
 def get_anchor(anchor_id: int, db: Session = Depends(get_db), tenant: Tenant = Depends(get_tenant)):
     anchor = db.get(TruthAnchor, anchor_id)
@@ -43,7 +63,12 @@ def archive_anchor(anchor_id: int, db: Session = Depends(get_db), tenant: Tenant
     anchor = db.get(TruthAnchor, anchor_id)
     if not anchor:
         raise HTTPException(status_code=404, detail="Anchor not found")
+    previous_hash = anchor.stable_hash()
     anchor.active = False
+    bump_anchor_generation(db, anchor.tenant_id)
     db.commit()
     db.refresh(anchor)
+    anchor_index.discard(anchor.id)
+    decision_cache.invalidate()
+    forget_anchor(previous_hash)
     return anchor
@@ -0,0 +1,91 @@
+"""
+Async variant of the anchor routes, mounted instead of app.api.anchors when
+SW_DB_ASYNC=1. Embedding new anchors runs in a worker thread.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.anchor_generation import anchor_generation_etag, bump_anchor_generation, current_anchor_generation
+from app.anchor_index import anchor_index
+from app.auth import get_tenant_async
+from app.concurrency import run_cpu
+from app.db_async import get_async_db
+from app.decision_cache import decision_cache
+from app.embedding_matcher import embedding_enabled, forget_anchor, store_anchor
+from app.models import Tenant, TruthAnchor
+from app.schemas import TruthAnchorCreate, TruthAnchorOut
+
+router = APIRouter()
+
+
+@router.post("/", response_model=TruthAnchorOut)
+async def create_anchor(
+    payload: TruthAnchorCreate, db: AsyncSession = Depends(get_async_db), tenant: Tenant = Depends(get_tenant_async)
+):
+    anchor = TruthAnchor(level=payload.level, statement=payload.statement, scope=payload.scope, tenant_id=tenant.id)
+    db.add(anchor)
+    await db.run_sync(bump_anchor_generation, anchor.tenant_id)
+    await db.commit()
+    await db.refresh(anchor)
+    anchor_index.add(anchor)
+    decision_cache.invalidate()
+    if embedding_enabled():
+        await run_cpu(store_anchor, anchor)
+    return anchor
+
+
+@router.get("/", response_model=list[TruthAnchorOut])
+async def list_anchors(
+    active_only: bool = True, db: AsyncSession = Depends(get_async_db), tenant: Tenant = Depends(get_tenant_async)
+):
+    stmt = select(TruthAnchor).where(
+        (TruthAnchor.tenant_id == tenant.id) | (TruthAnchor.tenant_id == None)  # noqa: E711
+    )
+    if active_only:
+        stmt = stmt.where(TruthAnchor.active == True)  # noqa: E712
+    stmt = stmt.order_by(TruthAnchor.created_at.desc())
+    return list((await db.scalars(stmt)).all())
+
+
+@router.get("/generation")
+async def get_anchor_generation(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    tenant: Tenant = Depends(get_tenant_async),
+):
+    generation = await db.run_sync(current_anchor_generation, tenant.id)
+    etag = anchor_generation_etag(generation)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return {"generation": generation}
+
+
+@router.get("/{anchor_id}", response_model=TruthAnchorOut)
+async def get_anchor(anchor_id: int, db: AsyncSession = Depends(get_async_db), tenant: Tenant = Depends(get_tenant_async)):
+    anchor = await db.get(TruthAnchor, anchor_id)
+    if not anchor:
+        raise HTTPException(status_code=404, detail="Anchor not found")
+    return anchor
+
+
+@router.post("/{anchor_id}/archive", response_model=TruthAnchorOut)
+async def archive_anchor(
+    anchor_id: int, db: AsyncSession = Depends(get_async_db), tenant: Tenant = Depends(get_tenant_async)
+):
+    anchor = await db.get(TruthAnchor, anchor_id)
+    if not anchor:
+        raise HTTPException(status_code=404, detail="Anchor not found")
+    previous_hash = anchor.stable_hash()
+    anchor.active = False
+    await db.run_sync(bump_anchor_generation, anchor.tenant_id)
+    await db.commit()
+    await db.refresh(anchor)
+    anchor_index.discard(anchor.id)
+    decision_cache.invalidate()
+    if embedding_enabled():
+        await run_cpu(forget_anchor, previous_hash)
+    return anchor
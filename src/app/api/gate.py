@@ -1,15 +1,17 @@
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from typing import List, Optional
 import re
 import json
 import os
-from app.embedding_matcher import find_conflicts_embedding
+import time
+from app.embedding_matcher import AnchorEmbeddingStore, find_conflicts_embedding
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import select, func
 from fastapi import APIRouter, Depends
 from app.security import verify_api_key
-from fastapi import Depends, Request
+from fastapi import Depends, Request, Response
 from app.security import verify_api_key, rate_limit
 
 
@@ -25,6 +27,7 @@ def _rl(request: Request):
 from app.models import (
     TruthAnchor,
     GateLog,
+    GateLogAnchor,
     DecisionTrace,
     DecisionTraceAnchor,
     PolicyProfile,
@@ -34,15 +37,40 @@ from app.models import (
 from app.schemas import (
     GateEvaluateIn,
     GateEvaluateOut,
+    GateEvaluateBatchIn,
+    GateEvaluateBatchOut,
+    GateCheckOut,
     GateLogOut,
     GateLogListOut,
-    parse_id_list,
     AnchorOut,
     GateReframeIn,
     GateReframeOut,
     ReplayOut,
 )
-from app.gate import UserState, decide
+from app.gate import GateDecision, UserState, apply_enforcement_mode, decide
+from app.decision_cache import decision_cache
+from app.latency_budget import check_budget
+from app.anchor_generation import anchor_generation_etag, current_anchor_generation, visible_anchors_stmt
+from app.anchor_manifest import ensure_manifest, load_manifest
+from app.anchor_counters import count_logs
+from app.gate_log_anchors import anchor_ids_by_log, legacy_id_list, link_rows
+from app.trace_policy import TIER_COMPACT, TracePolicy, compact_match_debug, resolve_trace_policy
+from app.trace_writer import TraceAckTimeout, TraceRecord, get_trace_writer, trace_writer_enabled, write_records
+from app.phrase_scanner import PhraseScanner
+from app.anchor_index import (
+    AnchorIndex,
+    CompiledAnchor,
+    anchor_index,
+    _norm,
+    _has_not,
+    _strip_not,
+    _meaningful_tokens,
+    _bigrams,
+)
+
+def _enum_value(v):
+    return getattr(v, "value", v)
+
 
 def _norm_state(v: str | None) -> str:
     if not v:
@@ -80,51 +108,6 @@ def _ethos_refs_for(decision: str, max_level: int | None = None) -> list[str]:
     return out
 
 
-def _norm(s: str) -> str:
-    return " ".join(s.strip().lower().split())
-
-
-def _has_not(s: str) -> bool:
-    s = _norm(s)
-    return " not " in f" {s} "
-
-
-def _strip_not(s: str) -> str:
-    s = _norm(s)
-    return " ".join(tok for tok in s.split() if tok != "not")
-
-
-def _meaningful_tokens(s: str) -> list[str]:
-    filler = {"a", "an", "the", "to", "and", "or", "of", "in", "on", "for"}
-    stop = filler | {"i", "you", "we", "it", "is", "are", "be", "will", "not", "do"}
-
-    def _stem(t: str) -> str:
-        if t.endswith("ing") and len(t) > 5:
-            t = t[:-3]
-        elif t.endswith("ed") and len(t) > 4:
-            t = t[:-2]
-        elif t.endswith("s") and len(t) > 4:
-            t = t[:-1]
-        return t
-
-    raw_tokens = re.findall(r"[a-z0-9]+", _norm(s))
-
-    toks: list[str] = []
-    for raw in raw_tokens:
-        t = _stem(raw)
-        if len(t) < 3:
-            continue
-        if t in stop:
-            continue
-        toks.append(t)
-
-    return toks
-
-
-def _bigrams(tokens: list[str]) -> set[str]:
-    return {f"{tokens[i]} {tokens[i+1]}" for i in range(len(tokens) - 1)}
-
-
 import re
 
 _MONEY_RE = re.compile(r"(£|\$|€)\s*([0-9][0-9,]*(?:\.[0-9]+)?)")
@@ -150,108 +133,182 @@ def _max_money_amount(text: str) -> float:
             continue
     return max_amt
 
-def naive_conflicts(request_summary: str, anchors: list[TruthAnchor]) -> list[TruthAnchor]:
+# Phrase sets for the naive matcher. Order matters only for how high-risk hits
+# are listed in explanations.
+_HIGH_RISK_PHRASES = (
+    "break into", "break in", "bypass", "lockpick", "pick lock", "hotwire",
+    "slim jim", "jimmy", "forced entry", "steal", "theft",
+)
+_SAFE_MARKERS = (
+    "legal", "lawful", "licensed", "locksmith", "roadside", "assistance",
+    "manufacturer", "proof", "ownership", "insurance", "police", "tow",
+)
+_AVOID_MARKERS = ("avoid", "please avoid", "do not", "dont", "without details", "no forced entry")
+# Substrings behind the bypass/unlock -> "break into" normalisation below.
+_BYPASS_TERMS = ("bypass", "lock", "key", "unlock", "without")
+
+_PHRASE_SCANNER = PhraseScanner(_HIGH_RISK_PHRASES + _SAFE_MARKERS + _AVOID_MARKERS + _BYPASS_TERMS)
+
+
+@dataclass(frozen=True)
+class MatchEvidence:
+    """
+    Why the matcher flagged one anchor; explanations are rendered from this.
+
+    kind is how it matched: "negation", "bigram", "token", "refund_rule" or
+    "embedding". matched_bigrams excludes the synthetic "break into" bigram
+    added for bypass phrasing.
+    """
+
+    kind: str
+    negated: bool = False
+    matched_tokens: tuple[str, ...] = ()
+    matched_bigrams: tuple[str, ...] = ()
+    high_risk_hits: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class _RequestFeatures:
+    norm: str
+    has_not: bool
+    wo_not: str
+    tokens: frozenset[str]
+    bigrams: frozenset[str]
+    match_bigrams: frozenset[str]
+    high_risk_hits: tuple[str, ...]
+    safe_lockout: bool
+    refund_over_threshold: bool
+
+
+def _request_features(request_summary: str) -> _RequestFeatures:
     req_norm = _norm(request_summary)
-    req_has_not = _has_not(req_norm)
-    req_wo_not = _strip_not(req_norm)
     # --- Domain heuristic: refunds over £100 ---
     refund_hit = _has_refund_word(request_summary)
     max_amt = _max_money_amount(request_summary)
+    phrase_hits = _PHRASE_SCANNER.scan(req_norm)
     # Detect "safe lockout" intent (legal next steps, avoid forced entry)
-    safe_markers = {
-        "legal", "lawful", "licensed", "locksmith", "roadside", "assistance",
-        "manufacturer", "proof", "ownership", "insurance", "police", "tow",
-    }
-    avoid_markers = {"avoid", "please avoid", "do not", "dont", "without details", "no forced entry"}
-    has_safe = any(w in req_norm for w in safe_markers)
-    has_avoid = any(w in req_norm for w in avoid_markers)
-    safe_lockout = has_safe and has_avoid
+    has_safe = not phrase_hits.isdisjoint(_SAFE_MARKERS)
+    has_avoid = not phrase_hits.isdisjoint(_AVOID_MARKERS)
 
     # Detect explicit high-risk phrasing (we should still gate even if "safe" words appear)
-    high_risk_phrases = {
-        "break into", "break in", "bypass", "lockpick", "pick lock", "hotwire",
-        "slim jim", "jimmy", "forced entry", "steal", "theft",
-    }
-    has_high_risk = any(p in req_norm for p in high_risk_phrases)
+    high_risk_hits = tuple(p for p in _HIGH_RISK_PHRASES if p in phrase_hits)
 
     req_tokens = _meaningful_tokens(req_norm)
-    req_token_set = set(req_tokens)
     req_bigrams = _bigrams(req_tokens)
 
     # High-risk normalization: map common bypass phrasing to canonical bigrams
-    if ("bypass" in req_norm) and (("lock" in req_norm) or ("key" in req_norm)):
-        req_bigrams.add("break into")
-    if ("unlock" in req_norm) and ("without" in req_norm) and ("key" in req_norm):
-        req_bigrams.add("break into")
+    match_bigrams = set(req_bigrams)
+    if ("bypass" in phrase_hits) and (("lock" in phrase_hits) or ("key" in phrase_hits)):
+        match_bigrams.add("break into")
+    if ("unlock" in phrase_hits) and ("without" in phrase_hits) and ("key" in phrase_hits):
+        match_bigrams.add("break into")
+
+    return _RequestFeatures(
+        norm=req_norm,
+        has_not=_has_not(req_norm),
+        wo_not=_strip_not(req_norm),
+        tokens=frozenset(req_tokens),
+        bigrams=frozenset(req_bigrams),
+        match_bigrams=frozenset(match_bigrams),
+        high_risk_hits=high_risk_hits,
+        safe_lockout=has_safe and has_avoid,
+        refund_over_threshold=refund_hit and max_amt > 100,
+    )
 
-    hits: list[TruthAnchor] = []
 
-    for a in anchors:
-        stmt_norm = _norm(a.statement)
-        stmt_has_not = _has_not(stmt_norm)
-        stmt_wo_not = _strip_not(stmt_norm)
+def _evidence(req: _RequestFeatures, stmt: CompiledAnchor, kind: str) -> MatchEvidence:
+    return MatchEvidence(
+        kind=kind,
+        negated=(req.wo_not == stmt.wo_not and req.has_not != stmt.has_not),
+        matched_tokens=tuple(sorted(req.tokens & stmt.tokens)),
+        matched_bigrams=tuple(sorted(req.bigrams & stmt.bigrams)),
+        high_risk_hits=req.high_risk_hits,
+    )
 
-        # Strong negation conflict (semantic inversion)
-        if req_wo_not == stmt_wo_not and (req_has_not != stmt_has_not):
-            hits.append(a)
+
+def _naive_matches(
+    req: _RequestFeatures, anchors: list[TruthAnchor], index: AnchorIndex | None = None
+) -> tuple[list[TruthAnchor], list[MatchEvidence]]:
+    # Only anchors sharing a term (or the not-stripped text) with the request can
+    # hit, so score those candidates instead of every anchor. Positions keep the
+    # caller's anchor ordering.
+    if index is None:
+        index = anchor_index
+    positions: dict[str, list[int]] = {}
+    for i, a in enumerate(anchors):
+        positions.setdefault(index.key_for(a), []).append(i)
+
+    negation_keys, token_overlap, bigram_keys = index.candidates(
+        req.tokens, req.match_bigrams, req.wo_not
+    )
+
+    hit_kinds: dict[int, tuple[str, CompiledAnchor]] = {}
+
+    for key in negation_keys | token_overlap.keys() | bigram_keys:
+        anchor_positions = positions.get(key)
+        if not anchor_positions:
             continue
+        stmt = index.get(anchors[anchor_positions[0]])
+
+        kind: str | None = None
+
+        # Strong negation conflict (semantic inversion)
+        if key in negation_keys and (req.has_not != stmt.has_not):
+            kind = "negation"
 
         # Safe-intent carveout: if it's a lawful lockout request and not explicitly high-risk,
         # don't treat car break-in/bypass anchors as conflicts.
-        if safe_lockout and not has_high_risk:
-            if ("breaking into cars" in stmt_norm) or ("bypassing locks" in stmt_norm) or ("break into" in stmt_norm):
-                continue
+        elif req.safe_lockout and not req.high_risk_hits and (
+            ("breaking into cars" in stmt.norm) or ("bypassing locks" in stmt.norm) or ("break into" in stmt.norm)
+        ):
+            continue
 
-        stmt_tokens = _meaningful_tokens(stmt_norm)
-        stmt_token_set = set(stmt_tokens)
-        stmt_bigrams = _bigrams(stmt_tokens)
+        elif key in bigram_keys:
+            kind = "bigram"
+        elif token_overlap.get(key, 0) >= 2:
+            kind = "token"
 
-        token_overlap = len(req_token_set & stmt_token_set)
-        bigram_overlap = len(req_bigrams & stmt_bigrams)
+        if kind is not None:
+            for i in anchor_positions:
+                hit_kinds[i] = (kind, stmt)
 
-        if bigram_overlap >= 1 or token_overlap >= 2:
-            hits.append(a)
+    hits: list[TruthAnchor] = []
+    evidence: list[MatchEvidence] = []
+    for i in sorted(hit_kinds):
+        kind, stmt = hit_kinds[i]
+        hits.append(anchors[i])
+        evidence.append(_evidence(req, stmt, kind))
 
     # FIX 7: access .active and .scope directly instead of via getattr for consistency
-    if refund_hit and max_amt > 100:
-        for a in anchors:
-            if a.active and a.scope == "payments.refunds":
-                if a not in hits:
-                    hits.append(a)
+    if req.refund_over_threshold:
+        refund_positions: list[int] = []
+        for key in index.keys_with_scope("payments.refunds"):
+            refund_positions.extend(positions.get(key, ()))
+        for i in sorted(refund_positions):
+            a = anchors[i]
+            if a.active and a.scope == "payments.refunds" and i not in hit_kinds:
+                hits.append(a)
+                evidence.append(_evidence(req, index.get(a), "refund_rule"))
+    return hits, evidence
+
+
+def naive_conflicts(request_summary: str, anchors: list[TruthAnchor]) -> list[TruthAnchor]:
+    hits, _evidence_list = _naive_matches(_request_features(request_summary), anchors)
     return hits
 
 
-def _build_explanations(request_summary: str, conflicts: list[TruthAnchor]) -> list[str]:
+def _render_explanations(conflicts: list[TruthAnchor], evidence: list[MatchEvidence]) -> list[str]:
     """
     Create plain-English per-anchor explanations for why each anchor was flagged.
     Adds explicit high-risk intent explanations for known patterns.
     """
-
-    req_norm = _norm(request_summary)
-    req_has_not = _has_not(req_norm)
-    req_wo_not = _strip_not(req_norm)
-
     explanations: list[str] = []
 
-    high_risk_phrases = {
-        "break into", "break in", "bypass", "lockpick", "pick lock",
-        "hotwire", "slim jim", "jimmy", "forced entry", "steal", "theft",
-    }
-
-    high_risk_hits = [p for p in high_risk_phrases if p in req_norm]
-
-    filler = {"a", "an", "the", "to", "and", "or", "of", "in", "on", "for"}
-    stop = filler | {"i", "you", "we", "it", "is", "are", "be", "will", "not"}
-
-    for a in conflicts:
-        stmt_norm = _norm(a.statement)
-        stmt_has_not = _has_not(stmt_norm)
-        stmt_wo_not = _strip_not(stmt_norm)
-
+    for a, ev in zip(conflicts, evidence):
         header = f'Anchor L{a.level} ({a.scope}): "{a.statement}"'
 
         # Strong negation conflict
-        if req_wo_not == stmt_wo_not and (req_has_not != stmt_has_not):
+        if ev.negated:
             explanations.append(
                 f"{header} - triggered because the request and anchor match after removing 'not', "
                 f"but one is negated and the other isn't (semantic inversion)."
@@ -259,34 +316,23 @@ def _build_explanations(request_summary: str, conflicts: list[TruthAnchor]) -> l
             continue
 
         # High-risk intent explanation (preferred when detected)
-        if high_risk_hits:
+        if ev.high_risk_hits:
             explanations.append(
                 f"{header} - triggered because the request contains high-risk intent phrasing: "
-                f"{', '.join(high_risk_hits)}."
+                f"{', '.join(ev.high_risk_hits)}."
             )
             continue
 
         # Keyword overlap explanation
-        req_tokens = _meaningful_tokens(req_norm)
-        req_token_set = set(req_tokens)
-        req_bigrams = _bigrams(req_tokens)
-
-        stmt_tokens = _meaningful_tokens(stmt_norm)
-        stmt_token_set = set(stmt_tokens)
-        stmt_bigrams = _bigrams(stmt_tokens)
-
-        matched_tokens = sorted(req_token_set & stmt_token_set)
-        matched_bigrams = sorted(req_bigrams & stmt_bigrams)
-
-        if matched_bigrams:
+        if ev.matched_bigrams:
             explanations.append(
                 f"{header} - triggered because the request matches a meaningful phrase: "
-                f"{', '.join(matched_bigrams)}."
+                f"{', '.join(ev.matched_bigrams)}."
             )
-        elif matched_tokens:
+        elif ev.matched_tokens:
             explanations.append(
                 f"{header} - triggered because the request shares multiple meaningful keywords: "
-                f"{', '.join(matched_tokens)}."
+                f"{', '.join(ev.matched_tokens)}."
             )
         else:
             explanations.append(
@@ -297,153 +343,562 @@ def _build_explanations(request_summary: str, conflicts: list[TruthAnchor]) -> l
     return explanations
 
 
-def _detect_conflicts(request_text: str, anchors: list[TruthAnchor]) -> tuple[list[TruthAnchor], dict]:
+def _build_explanations(request_summary: str, conflicts: list[TruthAnchor]) -> list[str]:
+    """Explanations for conflicts found without match evidence at hand."""
+    req = _request_features(request_summary)
+    evidence = [_evidence(req, anchor_index.get(a), "rule") for a in conflicts]
+    return _render_explanations(conflicts, evidence)
+
+
+# Naive hits of these kinds are trusted outright by the cascade matcher; a
+# result made only of loose keyword ("token") hits, or no hits, is borderline.
+_DECISIVE_KINDS = frozenset({"negation", "bigram", "refund_rule"})
+
+
+def _cascade_candidates(
+    req: _RequestFeatures, anchors: list[TruthAnchor], limit: int, index: AnchorIndex | None = None
+) -> list[TruthAnchor]:
+    """
+    Anchors worth embedding for a borderline request: all of them when the set
+    is small, otherwise those sharing the most terms with the request.
+    """
+    if len(anchors) <= limit:
+        return anchors
+    if index is None:
+        index = anchor_index
+    _negation_keys, token_overlap, bigram_keys = index.candidates(
+        req.tokens, req.match_bigrams, req.wo_not
+    )
+    scored: list[tuple[int, int]] = []
+    for i, a in enumerate(anchors):
+        key = index.key_for(a)
+        overlap = token_overlap.get(key, 0) + (1 if key in bigram_keys else 0)
+        if overlap:
+            scored.append((overlap, i))
+    scored.sort(key=lambda x: (-x[0], x[1]))
+    return [anchors[i] for i in sorted(i for _overlap, i in scored[:limit])]
+
+
+def _cascade_matches(
+    request_text: str,
+    req: _RequestFeatures,
+    anchors: list[TruthAnchor],
+    threshold: float,
+    index: AnchorIndex | None = None,
+    store: AnchorEmbeddingStore | None = None,
+) -> tuple[list[TruthAnchor], list[MatchEvidence], list[tuple[TruthAnchor, float]], dict]:
+    """
+    Naive first; embedding only over a bounded candidate set, and only when the
+    naive result is borderline. Embedding hits are added to the naive ones.
+    """
+    if index is None:
+        index = anchor_index
+    started = time.perf_counter()
+    conflicts, evidence = _naive_matches(req, anchors, index)
+    naive_ms = (time.perf_counter() - started) * 1000
+    info: dict = {
+        "stage": "naive",
+        "reason": None,
+        "candidate_count": 0,
+        "timings_ms": {"naive": round(naive_ms, 3), "embedding": None},
+    }
+
+    if any(ev.kind in _DECISIVE_KINDS for ev in evidence):
+        info["reason"] = "naive_decisive"
+        return conflicts, evidence, [], info
+
+    limit = int(os.getenv("SW_CASCADE_MAX_CANDIDATES", "256"))
+    candidates = _cascade_candidates(req, anchors, limit, index)
+    info["candidate_count"] = len(candidates)
+    if not candidates:
+        info["reason"] = "no_candidates"
+        return conflicts, evidence, [], info
+
+    started = time.perf_counter()
+    try:
+        scored = find_conflicts_embedding(request_text, candidates, threshold=threshold, index=index, store=store)
+    except ImportError:
+        info["reason"] = "embedding_unavailable"
+        return conflicts, evidence, [], info
+    info["timings_ms"]["embedding"] = round((time.perf_counter() - started) * 1000, 3)
+    info["stage"] = "embedding"
+    info["reason"] = "naive_borderline" if conflicts else "naive_empty"
+
+    seen = {a.id for a in conflicts}
+    for a, _score in scored:
+        if a.id not in seen:
+            seen.add(a.id)
+            conflicts.append(a)
+            evidence.append(_evidence(req, index.get(a), "embedding"))
+    return conflicts, evidence, scored, info
+
+
+def _detect_conflicts(
+    request_text: str,
+    anchors: list[TruthAnchor],
+    index: AnchorIndex | None = None,
+    store: AnchorEmbeddingStore | None = None,
+) -> tuple[list[TruthAnchor], dict, list[MatchEvidence]]:
+    """
+    Match a request against `anchors` with the SW_MATCHER matcher. `index`
+    defaults to the shared anchor_index and `store` to the shared embedding
+    store; pass private ones for anchors that are not the live set
+    (counterfactual patches reuse live anchor IDs and must not be persisted).
+    """
+    if index is None:
+        index = anchor_index
     matcher_requested = os.getenv("SW_MATCHER", "naive").lower()
     matcher_used = matcher_requested
     embedding_threshold = 0.50
     fallback_used = False
     fallback_reason: str | None = None
     matched_scores: list[dict] = []
+    cascade: dict | None = None
+
+    req = _request_features(request_text)
 
-    if matcher_requested == "embedding":
+    if matcher_requested == "cascade":
+        conflicts, evidence, scored, cascade = _cascade_matches(
+            request_text, req, anchors, embedding_threshold, index, store
+        )
+        matched_scores = [{"anchor_id": a.id, "score": float(s)} for (a, s) in scored]
+        matcher_used = "cascade" if cascade["stage"] == "embedding" else "naive"
+        if cascade["reason"] == "embedding_unavailable":
+            fallback_used = True
+            fallback_reason = "embedding_unavailable"
+    elif matcher_requested == "embedding":
         scored = find_conflicts_embedding(
             request_text,
             anchors,
             threshold=embedding_threshold,
+            index=index,
+            store=store,
         )
         conflicts = [a for (a, _score) in scored]
+        evidence = [_evidence(req, index.get(a), "embedding") for a in conflicts]
         matched_scores = [{"anchor_id": a.id, "score": float(s)} for (a, s) in scored]
 
         if not conflicts:
             fallback_used = True
             fallback_reason = "embedding_no_matches"
             matcher_used = "naive_fallback"
-            conflicts = naive_conflicts(request_text, anchors)
+            conflicts, evidence = _naive_matches(req, anchors, index)
     else:
-        conflicts = naive_conflicts(request_text, anchors)
+        conflicts, evidence = _naive_matches(req, anchors, index)
 
     match_debug = {
         "evaluated_anchor_count": len(anchors),
         "conflicted_ids": [a.id for a in conflicts],
         "matcher_requested": matcher_requested,
         "matcher_used": matcher_used,
-        "embedding_threshold": embedding_threshold if matcher_requested == "embedding" else None,
+        "embedding_threshold": embedding_threshold if matcher_requested in ("embedding", "cascade") else None,
         "fallback_used": fallback_used,
         "fallback_reason": fallback_reason,
         "matched_scores": matched_scores,
     }
-    return conflicts, match_debug
+    if cascade is not None:
+        match_debug["cascade"] = cascade
+    return conflicts, match_debug, evidence
 
 
-@router.post("/evaluate", response_model=GateEvaluateOut, response_model_exclude_none=True)
-def evaluate(payload: GateEvaluateIn, db: Session = Depends(get_db), tenant: Tenant = Depends(get_tenant)):
+@dataclass(frozen=True)
+class _Evaluation:
+    """Steps 1-3 of evaluate; everything a cached repeat of the request can reuse."""
+
+    conflicted_ids: tuple[int, ...]
+    warnings: tuple[str, ...]
+    warning_anchors: tuple[AnchorOut, ...]
+    explanations: tuple[str, ...]
+    max_level: int
+    decision: GateDecision
+    match_debug: dict
+
+
+def _evaluate_request(db: Session, payload: GateEvaluateIn, tenant_id: int) -> _Evaluation:
     # 1) Load active anchors
-    stmt_all = select(TruthAnchor).where(TruthAnchor.active == True)  # noqa: E712
+    stmt_all = visible_anchors_stmt(tenant_id)
     active_anchors = list(db.scalars(stmt_all).all())
+    return _match_and_decide(payload, active_anchors)
 
-    # 2) Run conflict detection (with audit-safe matcher logging)
-    conflicts, match_debug = _detect_conflicts(payload.request_summary, active_anchors)
 
-    explanations_list = _build_explanations(payload.request_summary, conflicts)
-    explanation_text = " | ".join(explanations_list)
+def _match_and_decide(payload: GateEvaluateIn, active_anchors: list[TruthAnchor]) -> _Evaluation:
+    """Steps 2-3: CPU only, no database access (the async router runs it in a worker thread)."""
+    # 2) Run conflict detection (with audit-safe matcher logging)
+    conflicts, match_debug, evidence = _detect_conflicts(payload.request_summary, active_anchors)
 
-    conflicted_ids = [a.id for a in conflicts]
-    warnings = [a.statement for a in conflicts]
-    warning_anchors = conflicts
-    max_level = max((a.level for a in conflicts), default=0)
-    l3_count = sum(1 for a in conflicts if a.level >= 3)
+    explanations_list = _render_explanations(conflicts, evidence)
 
     # 3) Run decision logic
-    decision = decide(
+    decision = _decide_conflicts(payload.request_summary, payload.arousal, payload.dominance, conflicts)
+
+    return _Evaluation(
+        conflicted_ids=tuple(a.id for a in conflicts),
+        warnings=tuple(a.statement for a in conflicts),
+        # FIX 2: convert ORM objects to AnchorOut schema models
+        warning_anchors=tuple(AnchorOut.model_validate(a, from_attributes=True) for a in conflicts),
+        explanations=tuple(explanations_list),
+        max_level=max((a.level for a in conflicts), default=0),
+        decision=decision,
+        match_debug=match_debug,
+    )
+
+
+def _decide_conflicts(request_text: str, arousal, dominance, conflicts: list[TruthAnchor]) -> GateDecision:
+    """The gate decision for a request's conflicts (shared with counterfactual replays)."""
+    return decide(
         state=UserState(
-            arousal=_norm_state(payload.arousal),
-            dominance=_norm_state(payload.dominance),
-            request=payload.request_summary,
+            arousal=_norm_state(arousal),
+            dominance=_norm_state(dominance),
+            request=request_text,
         ),
-        conflicted_anchor_ids=conflicted_ids,
-        max_level_conflict=max_level,
-        l3_count=l3_count,
+        conflicted_anchor_ids=[a.id for a in conflicts],
+        max_level_conflict=max((a.level for a in conflicts), default=0),
+        l3_count=sum(1 for a in conflicts if a.level >= 3),
+    )
+
+
+def _evaluate_cache_key(payload: GateEvaluateIn, tenant_id: int, generation: int) -> tuple:
+    return (
+        tenant_id,
+        payload.profile_id,
+        _norm(payload.request_summary),
+        _norm_state(payload.arousal),
+        _norm_state(payload.dominance),
+        os.getenv("SW_MATCHER", "naive").lower(),
+        generation,
+    )
+
+
+def _trace_record(
+    payload: GateEvaluateIn,
+    result: _Evaluation,
+    cache_hit: bool,
+    generation: int,
+    policy: TracePolicy | None = None,
+) -> TraceRecord:
+    """Steps 4-5: the gate log and decision trace rows for one evaluation."""
+    decision = result.decision
+    conflicted_ids = list(result.conflicted_ids)
+    explanation_text = " | ".join(result.explanations)
+    match_debug = {**result.match_debug, "cache_hit": cache_hit}
+    request_normalized = _norm(payload.request_summary)
+    tier, sample_rate = (policy or TracePolicy.from_env()).tier_for(
+        decision.decision, decision.would_block, request_normalized
     )
 
     # 4) Prepare log row
-    log = GateLog(
+    now = datetime.now(timezone.utc)
+    log_values = dict(
+        created_at=now,
         request_summary=payload.request_summary,
-        arousal=payload.arousal,
-        dominance=payload.dominance,
+        arousal=_enum_value(payload.arousal),
+        dominance=_enum_value(payload.dominance),
         decision=decision.decision,
         reason=decision.reason,
-        conflicted_anchor_ids=",".join(str(i) for i in conflicted_ids),
+        conflicted_anchor_ids=legacy_id_list(conflicted_ids),
         interpretation=explanation_text,
     )
 
-    try:
-        db.add(log)
-        db.flush()  # assigns log.id without committing yet
-
-        # 5) Create DecisionTrace
-        match_debug["conflicted_ids"] = conflicted_ids
-        match_debug["max_level_conflict"] = max_level
-
-        trace = DecisionTrace(
-            policy_profile_id=None,
-            request_text=payload.request_summary,
-            request_normalized=_norm(payload.request_summary),
-            arousal=payload.arousal,
-            dominance=payload.dominance,
-            decision=decision.decision,
-            reason=decision.reason,
-            explanation=explanation_text,
-            match_debug_json=json.dumps(match_debug, ensure_ascii=False),
-        )
-
-        db.add(trace)
-        db.flush()  # assigns trace.id
-
-        # 6) Snapshot ALL anchors considered + mark which ones conflicted
-        stmt_all_now = select(TruthAnchor).where(TruthAnchor.active == True)  # noqa: E712
-        anchors_now = list(db.scalars(stmt_all_now).all())
-
-        for a in anchors_now:
-            snap = DecisionTraceAnchor(
-                trace_id=trace.id,
+    # 5) Prepare DecisionTrace
+    match_debug["conflicted_ids"] = conflicted_ids
+    match_debug["max_level_conflict"] = result.max_level
+    if tier == TIER_COMPACT:
+        match_debug = compact_match_debug(match_debug)
+
+    trace_values = dict(
+        created_at=now,
+        policy_profile_id=None,
+        request_text=payload.request_summary,
+        request_normalized=request_normalized,
+        arousal=_enum_value(payload.arousal),
+        dominance=_enum_value(payload.dominance),
+        decision=decision.decision,
+        reason=decision.reason,
+        explanation=explanation_text,
+        match_debug_json=json.dumps(match_debug, ensure_ascii=False),
+        anchor_generation=generation,
+        trace_tier=tier,
+        trace_sample_rate=sample_rate,
+    )
+    return TraceRecord(log=log_values, trace=trace_values, log_anchors=link_rows(result.warning_anchors))
+
+
+def _trace_policy(profile: PolicyProfile | None, tenant: Tenant) -> TracePolicy:
+    if profile is not None and profile.tenant_id not in (None, tenant.id):
+        profile = None
+    return resolve_trace_policy(tenant, profile)
+
+
+def _snapshot_anchors(
+    db: Session, record: TraceRecord, conflicted_ids: tuple[int, ...], tenant_id: int, generation: int
+) -> None:
+    _snapshot_anchors_many(db, [(record, conflicted_ids)], tenant_id, generation)
+
+
+def _snapshot_anchors_many(
+    db: Session, items: list[tuple[TraceRecord, tuple[int, ...]]], tenant_id: int, generation: int
+) -> None:
+    # 6) Reference the anchor set considered by manifest; snapshot the conflicted anchors
+    manifest_hash = ensure_manifest(db, tenant_id, generation)
+    for record, _ids in items:
+        record.trace["manifest_hash"] = manifest_hash
+        record.log["tenant_id"] = record.trace["tenant_id"] = tenant_id
+
+    # Compact traces keep no anchor rows (app.trace_policy)
+    items = [(record, ids) for record, ids in items if record.trace.get("trace_tier") != TIER_COMPACT]
+    wanted = {i for _record, ids in items for i in ids}
+    if not wanted:
+        return
+    matched_now = list(db.scalars(select(TruthAnchor).where(TruthAnchor.id.in_(wanted))))
+    for record, ids in items:
+        for a in matched_now:
+            if a.id not in ids:
+                continue
+            record.anchors.append(dict(
                 anchor_id=a.id,
                 anchor_hash=a.stable_hash(),
                 statement_snapshot=a.statement,
                 scope_snapshot=a.scope,
                 level_snapshot=a.level,
                 active_snapshot=a.active,
-                matched=(a.id in conflicted_ids),
+                matched=True,
                 match_note="conflict",
-            )
-            db.add(snap)
+            ))
 
-        db.commit()
+
+def _evaluate_out(record: TraceRecord, result: _Evaluation, generation: int) -> GateEvaluateOut:
+    return GateEvaluateOut(log_id=record.log["id"], trace_id=record.trace["id"], **_evaluate_fields(result, generation))
+
+
+def _evaluate_fields(result: _Evaluation, generation: int) -> dict:
+    """The GateEvaluateOut fields other than log_id/trace_id."""
+    decision = result.decision
+    return dict(
+        decision=decision.decision,
+        reason=decision.reason,
+        conflicted_anchor_ids=list(result.conflicted_ids),
+        interpretation=decision.interpretation,
+        suggestion=decision.suggestion,
+        explanations=list(result.explanations),
+        next_actions=decision.next_actions,
+        # FIX 1: use _ethos_refs_for() instead of hardcoded value
+        ethos_refs=_ethos_refs_for(decision.decision, result.max_level),
+        warnings=list(result.warnings),
+        warning_anchors=list(result.warning_anchors),
+        anchor_generation=generation,
+    )
+
+
+@router.post("/evaluate", response_model=GateEvaluateOut, response_model_exclude_none=True)
+def evaluate(
+    payload: GateEvaluateIn,
+    response: Response,
+    db: Session = Depends(get_db),
+    tenant: Tenant = Depends(get_tenant),
+):
+    # Read before the anchors so a result is never filed under a newer generation
+    # than the anchors it was computed from.
+    generation = current_anchor_generation(db, tenant.id)
+
+    # 1-3) Match and decide, or reuse an identical earlier evaluation
+    cache_key = _evaluate_cache_key(payload, tenant.id, generation)
+    result = decision_cache.get(cache_key)
+    cache_hit = result is not None
+    if result is None:
+        result = _evaluate_request(db, payload, tenant.id)
+        decision_cache.put(cache_key, result)
+
+    # 4-5) Log and trace rows, at the tier the trace policy picks
+    profile = db.get(PolicyProfile, payload.profile_id) if payload.profile_id is not None else None
+    record = _trace_record(payload, result, cache_hit, generation, _trace_policy(profile, tenant))
+
+    try:
+        # 6) Manifest and anchor snapshots
+        _snapshot_anchors(db, record, result.conflicted_ids, tenant.id, generation)
+
+        if trace_writer_enabled():
+            db.commit()  # the manifest, if this generation's was new
+            try:
+                get_trace_writer().submit(record)
+            except TraceAckTimeout as e:
+                raise HTTPException(status_code=503, detail=str(e)) from e
+        else:
+            write_records(db, [record])
+            db.commit()
 
     except Exception:
         db.rollback()
         raise
 
-    return GateEvaluateOut(
+    response.headers["ETag"] = anchor_generation_etag(generation)
+    return _evaluate_out(record, result, generation)
+
+
+# Items per /evaluate/batch request.
+BATCH_MAX_ITEMS = int(os.getenv("SW_EVALUATE_BATCH_MAX", "100"))
+
+
+def _check_batch_size(items: list) -> None:
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"Batch has {len(items)} items; the limit is {BATCH_MAX_ITEMS}"
+        )
+
+
+def _cached_results(items: list[GateEvaluateIn], tenant_id: int, generation: int) -> tuple[list, list]:
+    """Decision-cache keys and hits (None for a miss) for each batch item."""
+    keys = [_evaluate_cache_key(item, tenant_id, generation) for item in items]
+    return keys, [decision_cache.get(k) for k in keys]
+
+
+def _match_batch(
+    items: list[GateEvaluateIn], keys: list, cached: list, active_anchors: list[TruthAnchor]
+) -> list[tuple[_Evaluation, bool]]:
+    """
+    Steps 2-3 for every cache miss against one anchor set, in item order, so a
+    repeat later in the batch is a cache hit just as a repeated call would be.
+    """
+    results = []
+    for item, key, result in zip(items, keys, cached):
+        if result is None:
+            result = decision_cache.get(key)  # filled by an earlier item
+        cache_hit = result is not None
+        if result is None:
+            result = _match_and_decide(item, active_anchors)
+            decision_cache.put(key, result)
+        results.append((result, cache_hit))
+    return results
+
+
+def _reserve_ids(records: list[TraceRecord]) -> None:
+    """
+    In group mode, give the records log and trace IDs from the writer's
+    blocks. Call it before the transaction writes anything: on SQLite,
+    reserving a block waits for the write lock that transaction would hold.
+    """
+    if trace_writer_enabled():
+        writer = get_trace_writer()
+        for record in records:
+            writer.assign_ids(record)
+
+
+def _write_batch(db: Session, records: list[TraceRecord]) -> None:
+    """All of a batch's rows in one transaction, IDs already reserved; the caller commits or rolls back."""
+    write_records(db, records)
+
+
+@router.post("/evaluate/batch", response_model=GateEvaluateBatchOut, response_model_exclude_none=True)
+def evaluate_batch(
+    payload: GateEvaluateBatchIn,
+    response: Response,
+    db: Session = Depends(get_db),
+    tenant: Tenant = Depends(get_tenant),
+):
+    """
+    Evaluate several requests against one anchor generation. Each item's
+    result is what /evaluate would have returned for it. The batch is all or
+    nothing: an invalid item rejects the request (422) and a failed write
+    rolls back every item's log and trace.
+    """
+    _check_batch_size(payload.items)
+    generation = current_anchor_generation(db, tenant.id)
+
+    keys, cached = _cached_results(payload.items, tenant.id, generation)
+    anchors = list(db.scalars(visible_anchors_stmt(tenant.id)).all()) if None in cached else []
+    results = _match_batch(payload.items, keys, cached, anchors)
+
+    profile_ids = {item.profile_id for item in payload.items if item.profile_id is not None}
+    policies = {pid: _trace_policy(db.get(PolicyProfile, pid), tenant) for pid in profile_ids}
+    policies[None] = _trace_policy(None, tenant)
+    records = [
+        _trace_record(item, result, hit, generation, policies[item.profile_id])
+        for item, (result, hit) in zip(payload.items, results)
+    ]
+    _reserve_ids(records)
+    try:
+        _snapshot_anchors_many(
+            db, [(rec, result.conflicted_ids) for rec, (result, _hit) in zip(records, results)], tenant.id, generation
+        )
+        _write_batch(db, records)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    response.headers["ETag"] = anchor_generation_etag(generation)
+    return GateEvaluateBatchOut(
+        items=[_evaluate_out(rec, result, generation) for rec, (result, _hit) in zip(records, results)],
+        anchor_generation=generation,
+    )
+
+
+def _profile_enforcement_mode(profile: PolicyProfile | None, profile_id: int | None, tenant_id: int) -> str | None:
+    if profile_id is None:
+        return None
+    if profile is None or profile.tenant_id not in (None, tenant_id):
+        raise HTTPException(status_code=404, detail="Policy profile not found")
+    return profile.enforcement_mode
+
+
+def _check_out(result: _Evaluation, enforcement_mode: str | None, generation: int) -> GateCheckOut:
+    decision = result.decision
+    if enforcement_mode is not None:
+        decision = apply_enforcement_mode(decision, enforcement_mode, result.max_level)
+    return GateCheckOut(
         decision=decision.decision,
         reason=decision.reason,
-        conflicted_anchor_ids=conflicted_ids,
-        log_id=log.id,
-        trace_id=trace.id,
+        conflicted_anchor_ids=list(result.conflicted_ids),
+        max_level_conflict=result.max_level,
+        would_block=decision.would_block,
         interpretation=decision.interpretation,
         suggestion=decision.suggestion,
-        explanations=explanations_list,
         next_actions=decision.next_actions,
-        # FIX 1: use _ethos_refs_for() instead of hardcoded value
-        ethos_refs=_ethos_refs_for(decision.decision, max_level),
-        warnings=warnings,
-        # FIX 2: convert ORM objects to AnchorOut schema models
-        warning_anchors=[AnchorOut.model_validate(a, from_attributes=True) for a in warning_anchors],
+        enforcement_mode=enforcement_mode,
+        anchor_generation=generation,
     )
 
 
-@router.post("/reframe", response_model=GateReframeOut)
-def reframe(payload: GateReframeIn, db: Session = Depends(get_db), tenant: Tenant = Depends(get_tenant)):
-    parent = db.get(GateLog, payload.log_id)
+def _finish_check(response: Response, started: float, generation: int) -> None:
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    check_budget.record(elapsed_ms)
+    response.headers["ETag"] = anchor_generation_etag(generation)
+    response.headers["X-SignalWeaver-Auditable"] = "false"
+    response.headers["Server-Timing"] = f"check;dur={elapsed_ms:.2f}"
+
+
+@router.post("/check", response_model=GateCheckOut)
+def check(
+    payload: GateEvaluateIn,
+    response: Response,
+    db: Session = Depends(get_db),
+    tenant: Tenant = Depends(get_tenant),
+):
+    """
+    "Would this be allowed?" without side effects: the same matching and
+    decision as /evaluate, plus the enforcement mode of payload.profile_id
+    if given, but nothing is written (no gate log, trace or manifest). The
+    result is NOT auditable and cannot be replayed; call /evaluate before
+    acting on it. Shares the decision cache with /evaluate; latency is
+    tracked against SW_CHECK_BUDGET_MS on /health/check.
+    """
+    started = time.perf_counter()
+    generation = current_anchor_generation(db, tenant.id)
+    cache_key = _evaluate_cache_key(payload, tenant.id, generation)
+    result = decision_cache.get(cache_key)
+    if result is None:
+        result = _evaluate_request(db, payload, tenant.id)
+        decision_cache.put(cache_key, result)
+
+    profile = db.get(PolicyProfile, payload.profile_id) if payload.profile_id is not None else None
+    mode = _profile_enforcement_mode(profile, payload.profile_id, tenant.id)
+    db.rollback()  # end the read transaction; nothing was written
+
+    out = _check_out(result, mode, generation)
+    _finish_check(response, started, generation)
+    return out
+
+
+def _check_reframe_parent(parent: GateLog | None) -> GateLog:
     if parent is None:
         raise HTTPException(status_code=404, detail="gate log not found")
     if parent.decision == "refuse":
@@ -451,7 +906,21 @@ def reframe(payload: GateReframeIn, db: Session = Depends(get_db), tenant: Tenan
             status_code=422,
             detail="Refused decisions cannot be reframed. The intent must change, not the wording.",
         )
+    return parent
 
+
+@dataclass(frozen=True)
+class _Reframe:
+    reframed: str
+    arousal: str
+    dominance: str
+    conflicts: list[TruthAnchor]
+    evidence: list[MatchEvidence]
+    decision: GateDecision
+
+
+def _reframe_decision(payload: GateReframeIn, parent: GateLog, active_anchors: list[TruthAnchor]) -> _Reframe:
+    """Re-run matching and the decision for a reframed request; CPU only."""
     # Simple MVP "reframe": treat new_intent as the new request summary
     reframed = payload.new_intent.strip()
 
@@ -463,14 +932,9 @@ def reframe(payload: GateReframeIn, db: Session = Depends(get_db), tenant: Tenan
     arousal = _norm_state(arousal_raw)
     dominance = _norm_state(dominance_raw)
 
-    # Re-run conflict detection on the reframed text
-    stmt_all = select(TruthAnchor).where(TruthAnchor.active == True)  # noqa: E712
-    active_anchors = list(db.scalars(stmt_all).all())
-
     # Run conflict detection with the reframed request
-    conflicts, _match_debug = _detect_conflicts(reframed, active_anchors)
+    conflicts, _match_debug, evidence = _detect_conflicts(reframed, active_anchors)
     conflicted_ids = [a.id for a in conflicts]
-    warnings = [a.statement for a in conflicts]
     max_level = max((a.level for a in conflicts), default=0)
     l3_count = sum(1 for a in conflicts if a.level >= 3)
 
@@ -485,65 +949,96 @@ def reframe(payload: GateReframeIn, db: Session = Depends(get_db), tenant: Tenan
         max_level_conflict=max_level,
         l3_count=l3_count,
     )
+    return _Reframe(reframed, arousal, dominance, conflicts, evidence, decision)
 
-    # Write a new log entry for the reframed attempt
-    log = GateLog(
-        request_summary=reframed,
-        arousal=arousal,
-        dominance=dominance,
-        decision=decision.decision,
-        reason=decision.reason,
-        conflicted_anchor_ids=",".join(str(i) for i in conflicted_ids),
+
+def _reframe_log_id() -> Optional[int]:
+    # In group mode an autoincrement ID could be one the writer has already
+    # reserved for a queued record, so take it from the writer's blocks too.
+    return get_trace_writer().next_log_id() if trace_writer_enabled() else None
+
+
+def _reframe_log(parent: GateLog, r: _Reframe, tenant_id: int, log_id: Optional[int] = None) -> GateLog:
+    # A new log entry for the reframed attempt
+    return GateLog(
+        id=log_id,
+        request_summary=r.reframed,
+        arousal=r.arousal,
+        dominance=r.dominance,
+        decision=r.decision.decision,
+        reason=r.decision.reason,
+        conflicted_anchor_ids=legacy_id_list(a.id for a in r.conflicts),
         user_choice="reframe_from:" + str(parent.id),
+        tenant_id=tenant_id,
+        anchors=[GateLogAnchor(**row) for row in link_rows(r.conflicts)],
     )
 
-    db.add(log)
-    db.commit()
-    db.refresh(log)
 
+def _reframe_out(parent: GateLog, r: _Reframe, log: GateLog) -> GateReframeOut:
+    decision = r.decision
     warning_anchor_out = [
-        AnchorOut.model_validate(a, from_attributes=True) for a in conflicts
+        AnchorOut.model_validate(a, from_attributes=True) for a in r.conflicts
     ]
 
     # Only include explanations when not proceed (keeps responses tidy)
     explanations: Optional[List[str]] = None
     if decision.decision != "proceed":
-        explanations = _build_explanations(reframed, conflicts)
+        explanations = _render_explanations(r.conflicts, r.evidence)
 
     return GateReframeOut(
         parent_log_id=parent.id,
-        reframed_request=reframed,
+        reframed_request=r.reframed,
         decision=decision.decision,
         reason=decision.reason,
         interpretation=getattr(decision, "interpretation", ""),
         suggestion=getattr(decision, "suggestion", ""),
         explanations=explanations,
         next_actions=getattr(decision, "next_actions", []),
-        conflicted_anchor_ids=conflicted_ids,
-        warnings=warnings,
+        conflicted_anchor_ids=[a.id for a in r.conflicts],
+        warnings=[a.statement for a in r.conflicts],
         warning_anchors=warning_anchor_out,
         log_id=log.id,
     )
 
 
-@router.get("/replay/{trace_id}", response_model=ReplayOut)
-def replay(trace_id: int, db: Session = Depends(get_db), tenant: Tenant = Depends(get_tenant)):
-    trace = db.get(DecisionTrace, trace_id)
-    if not trace:
-        raise HTTPException(status_code=404, detail="Trace not found")
+@router.post("/reframe", response_model=GateReframeOut)
+def reframe(payload: GateReframeIn, db: Session = Depends(get_db), tenant: Tenant = Depends(get_tenant)):
+    parent = _check_reframe_parent(db.get(GateLog, payload.log_id))
 
-    # Load original trace anchor snapshot rows (the ordered policy set used)
-    original_rows = list(trace.anchors)
-    anchor_ids = [r.anchor_id for r in original_rows]
+    # Re-run conflict detection on the reframed text
+    active_anchors = list(db.scalars(visible_anchors_stmt(tenant.id)).all())
+    result = _reframe_decision(payload, parent, active_anchors)
 
-    # Load current anchors for those ids
-    current_anchors = (
-        db.execute(select(TruthAnchor).where(TruthAnchor.id.in_(anchor_ids)))
-        .scalars()
-        .all()
-    )
-    current_by_id = {a.id: a for a in current_anchors}
+    log = _reframe_log(parent, result, tenant.id, _reframe_log_id())
+    db.add(log)
+    db.flush()
+    count_logs(db, [log])
+    db.commit()
+    db.refresh(log)
+
+    return _reframe_out(parent, result, log)
+
+
+def _replay_rows(db: Session, trace: DecisionTrace) -> list:
+    # Load original trace anchor snapshot rows (the ordered policy set used):
+    # from the manifest, or from per-trace rows on traces written before manifests
+    original_rows = load_manifest(db, trace.manifest_hash) if trace.manifest_hash else None
+    if original_rows is None:
+        original_rows = list(trace.anchors)
+    return original_rows
 
+
+@dataclass
+class _ReplayResult:
+    drift: list[str]
+    decision_now: str
+    reason_now: str
+    explanation_now: str
+
+
+def _replay_compare(trace: DecisionTrace, original_rows: list, current_by_id: dict[int, TruthAnchor]) -> _ReplayResult:
+    """Drift check and re-decision against the current anchors; CPU only."""
+    anchor_ids = [r.anchor_id for r in original_rows]
     drift: list[str] = []
 
     # Drift check: missing, changed hash, or active flip
@@ -581,7 +1076,7 @@ def replay(trace_id: int, db: Session = Depends(get_db), tenant: Tenant = Depend
     anchors_ordered_now = [current_by_id[i] for i in anchor_ids if i in current_by_id]
 
     # FIX 3: use _detect_conflicts() so SW_MATCHER env var is respected during replay
-    conflicts, _replay_match_debug = _detect_conflicts(request_text, anchors_ordered_now)
+    conflicts, _replay_match_debug, evidence = _detect_conflicts(request_text, anchors_ordered_now)
     conflicted_ids = [a.id for a in conflicts]
     max_level = max((a.level for a in conflicts), default=0)
     l3_count = sum(1 for a in conflicts if a.level >= 3)
@@ -606,23 +1101,19 @@ def replay(trace_id: int, db: Session = Depends(get_db), tenant: Tenant = Depend
             return obj[name]
         return default
 
-    decision_now = _get(result, "decision", "")
-    reason_now = _get(result, "reason", "")
-
     # FIX 4: re-build explanation from current conflicts so same_explanation is meaningful
-    explanations_now = _build_explanations(request_text, conflicts)
-    explanation_now = " | ".join(explanations_now)
-
-    # Detect newly added active anchors not present in original trace
-    all_active_ids = set(
-        db.execute(
-            select(TruthAnchor.id).where(TruthAnchor.active == True)  # noqa: E712
-        ).scalars().all()
+    explanations_now = _render_explanations(conflicts, evidence)
+
+    return _ReplayResult(
+        drift=drift,
+        decision_now=_get(result, "decision", ""),
+        reason_now=_get(result, "reason", ""),
+        explanation_now=" | ".join(explanations_now),
     )
 
-    original_ids = set(anchor_ids)
-    new_ids = all_active_ids - original_ids
 
+def _replay_out(trace: DecisionTrace, r: _ReplayResult, new_ids: set[int]) -> ReplayOut:
+    drift = list(r.drift)
     if new_ids:
         drift.append(f"{len(new_ids)} new active anchors added since trace (not replayed)")
 
@@ -635,36 +1126,54 @@ def replay(trace_id: int, db: Session = Depends(get_db), tenant: Tenant = Depend
 
     return ReplayOut(
         trace_id=trace.id,
-        same_decision=(decision_now == trace.decision),
-        same_reason=(reason_now == trace.reason),
+        same_decision=(r.decision_now == trace.decision),
+        same_reason=(r.reason_now == trace.reason),
         # FIX 4: actually compare explanations instead of hardcoding True
-        same_explanation=(explanation_now == (trace.explanation or "")),
+        same_explanation=(r.explanation_now == (trace.explanation or "")),
         anchor_drift=drift,
         decision_before=trace.decision,
-        decision_now=decision_now,
+        decision_now=r.decision_now,
         reason_before=trace.reason,
-        reason_now=reason_now,
-        explanation=explanation_now,
+        reason_now=r.reason_now,
+        explanation=r.explanation_now,
         match_debug=match_debug,
+        trace_tier=trace.trace_tier or "full",
     )
 
 
-@router.get("/logs", response_model=GateLogListOut)
-def list_gate_logs(
-    limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
-    decision: str | None = Query(
-        default=None, description="Optional filter: proceed|gate|refuse"
-    ),
-    since: datetime | None = Query(
-        default=None,
-        description="Optional filter: ISO timestamp (e.g. 2026-02-06T18:00:00)",
-    ),
-    db: Session = Depends(get_db),
-):
-    """
-    List gate logs, newest-first, with optional filters.
-    """
+@router.get("/replay/{trace_id}", response_model=ReplayOut)
+def replay(trace_id: int, db: Session = Depends(get_db), tenant: Tenant = Depends(get_tenant)):
+    trace = db.get(DecisionTrace, trace_id)
+    if not trace:
+        raise HTTPException(status_code=404, detail="Trace not found")
+
+    original_rows = _replay_rows(db, trace)
+    anchor_ids = [r.anchor_id for r in original_rows]
+
+    # Load current anchors for those ids
+    current_anchors = (
+        db.execute(select(TruthAnchor).where(TruthAnchor.id.in_(anchor_ids)))
+        .scalars()
+        .all()
+    )
+    result = _replay_compare(trace, original_rows, {a.id: a for a in current_anchors})
+
+    # Detect newly added active anchors not present in original trace. If the
+    # anchor-set generation hasn't moved since the trace, nothing was added.
+    new_ids: set[int] = set()
+    if trace.anchor_generation is None or trace.anchor_generation != current_anchor_generation(db, tenant.id):
+        all_active_ids = set(
+            db.execute(
+                visible_anchors_stmt(tenant.id).with_only_columns(TruthAnchor.id)
+            ).scalars().all()
+        )
+        new_ids = all_active_ids - set(anchor_ids)
+
+    return _replay_out(trace, result, new_ids)
+
+
+def _logs_statements(limit: int, offset: int, decision: str | None, since: datetime | None):
+    """(count, page) statements for the gate log listing."""
     base_where = []
 
     if decision is not None:
@@ -681,15 +1190,18 @@ def list_gate_logs(
     count_stmt = select(func.count()).select_from(GateLog)
     if base_where:
         count_stmt = count_stmt.where(*base_where)
-    total = db.scalar(count_stmt) or 0
 
     stmt = select(GateLog)
     if base_where:
         stmt = stmt.where(*base_where)
 
     stmt = stmt.order_by(GateLog.id.desc()).limit(limit).offset(offset)
-    rows = list(db.scalars(stmt).all())
+    return count_stmt, stmt
+
 
+def _logs_out(
+    rows: list[GateLog], anchor_ids: dict[int, list[int]], total: int, limit: int, offset: int
+) -> GateLogListOut:
     items = []
     for r in rows:
         items.append(
@@ -701,7 +1213,7 @@ def list_gate_logs(
                 dominance=r.dominance,
                 decision=r.decision,
                 reason=r.reason,
-                conflicted_anchor_ids=parse_id_list(r.conflicted_anchor_ids),
+                conflicted_anchor_ids=anchor_ids[r.id],
                 user_choice=r.user_choice,
             )
         )
@@ -712,3 +1224,25 @@ def list_gate_logs(
         limit=limit,
         offset=offset,
     )
+
+
+@router.get("/logs", response_model=GateLogListOut)
+def list_gate_logs(
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    decision: str | None = Query(
+        default=None, description="Optional filter: proceed|gate|refuse"
+    ),
+    since: datetime | None = Query(
+        default=None,
+        description="Optional filter: ISO timestamp (e.g. 2026-02-06T18:00:00)",
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    List gate logs, newest-first, with optional filters.
+    """
+    count_stmt, stmt = _logs_statements(limit, offset, decision, since)
+    total = db.scalar(count_stmt) or 0
+    rows = list(db.scalars(stmt).all())
+    return _logs_out(rows, anchor_ids_by_log(db, rows), total, limit, offset)
@@ -0,0 +1,274 @@
+"""
+Async variant of the gate routes (/evaluate, /reframe, /replay, /logs),
+mounted instead of app.api.gate when SW_DB_ASYNC=1.
+
+Database work goes through an AsyncSession. Matching and decisions run in
+worker threads via run_cpu(). Request handling, responses and trace rows are
+the same as the sync routes, which share the helpers in app.api.gate and
+remain the default.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.anchor_generation import anchor_generation_etag, current_anchor_generation, visible_anchors_stmt
+from app.api.gate import (
+    _cached_results,
+    _check_batch_size,
+    _check_out,
+    _check_reframe_parent,
+    _evaluate_cache_key,
+    _evaluate_out,
+    _finish_check,
+    _logs_out,
+    _logs_statements,
+    _match_and_decide,
+    _match_batch,
+    _profile_enforcement_mode,
+    _reframe_decision,
+    _reframe_log,
+    _reframe_log_id,
+    _reframe_out,
+    _replay_compare,
+    _replay_out,
+    _replay_rows,
+    _reserve_ids,
+    _snapshot_anchors,
+    _snapshot_anchors_many,
+    _trace_policy,
+    _trace_record,
+    _write_batch,
+)
+from app.anchor_counters import count_logs
+from app.auth import get_tenant_async
+from app.concurrency import run_blocking, run_cpu
+from app.db_async import get_async_db
+from app.decision_cache import decision_cache
+from app.gate_log_anchors import anchor_ids_by_log
+from app.models import DecisionTrace, GateLog, PolicyProfile, Tenant, TruthAnchor
+from app.schemas import (
+    GateEvaluateBatchIn,
+    GateEvaluateBatchOut,
+    GateCheckOut,
+    GateEvaluateIn,
+    GateEvaluateOut,
+    GateLogListOut,
+    GateReframeIn,
+    GateReframeOut,
+    ReplayOut,
+)
+from app.security import rate_limit, verify_api_key
+from app.trace_writer import TraceAckTimeout, get_trace_writer, trace_writer_enabled, write_records
+
+
+async def _rl(request: Request):
+    rate_limit(request, limit=60, window_s=60)
+
+
+router = APIRouter(
+    dependencies=[Depends(verify_api_key), Depends(_rl)],
+)
+
+
+@router.post("/evaluate", response_model=GateEvaluateOut, response_model_exclude_none=True)
+async def evaluate(
+    payload: GateEvaluateIn,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    tenant: Tenant = Depends(get_tenant_async),
+):
+    generation = await db.run_sync(current_anchor_generation, tenant.id)
+
+    cache_key = _evaluate_cache_key(payload, tenant.id, generation)
+    result = decision_cache.get(cache_key)
+    cache_hit = result is not None
+    if result is None:
+        anchors = list((await db.scalars(visible_anchors_stmt(tenant.id))).all())
+        # Hand the connection back to the pool while matching runs.
+        await db.commit()
+        result = await run_cpu(_match_and_decide, payload, anchors)
+        decision_cache.put(cache_key, result)
+
+    profile = await db.get(PolicyProfile, payload.profile_id) if payload.profile_id is not None else None
+    record = _trace_record(payload, result, cache_hit, generation, _trace_policy(profile, tenant))
+
+    try:
+        await db.run_sync(_snapshot_anchors, record, result.conflicted_ids, tenant.id, generation)
+
+        if trace_writer_enabled():
+            await db.commit()
+            writer = get_trace_writer()
+            try:
+                committed = await run_blocking(writer.enqueue, record)
+                if committed is not None:
+                    # Shielded: giving up on the wait must not cancel the writer's Future.
+                    waiter = asyncio.shield(asyncio.wrap_future(committed))
+                    try:
+                        await asyncio.wait_for(waiter, writer.ack_timeout_s)
+                    except asyncio.TimeoutError:
+                        raise TraceAckTimeout(writer.ack_timeout_s) from None
+            except TraceAckTimeout as e:
+                raise HTTPException(status_code=503, detail=str(e)) from e
+        else:
+            # Commit the reads first so the write transaction starts with its
+            # INSERT: on SQLite that waits for the lock instead of failing a
+            # read-to-write upgrade with "database is locked".
+            await db.commit()
+            await db.run_sync(write_records, [record])
+            await db.commit()
+
+    except Exception:
+        await db.rollback()
+        raise
+
+    response.headers["ETag"] = anchor_generation_etag(generation)
+    return _evaluate_out(record, result, generation)
+
+
+@router.post("/evaluate/batch", response_model=GateEvaluateBatchOut, response_model_exclude_none=True)
+async def evaluate_batch(
+    payload: GateEvaluateBatchIn,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    tenant: Tenant = Depends(get_tenant_async),
+):
+    """All or nothing, like the sync route."""
+    _check_batch_size(payload.items)
+    generation = await db.run_sync(current_anchor_generation, tenant.id)
+
+    keys, cached = _cached_results(payload.items, tenant.id, generation)
+    anchors = list((await db.scalars(visible_anchors_stmt(tenant.id))).all()) if None in cached else []
+    await db.commit()
+    results = await run_cpu(_match_batch, payload.items, keys, cached, anchors)
+
+    policies = {None: _trace_policy(None, tenant)}
+    for pid in {item.profile_id for item in payload.items if item.profile_id is not None}:
+        policies[pid] = _trace_policy(await db.get(PolicyProfile, pid), tenant)
+    records = [
+        _trace_record(item, result, hit, generation, policies[item.profile_id])
+        for item, (result, hit) in zip(payload.items, results)
+    ]
+    await run_blocking(_reserve_ids, records)
+    try:
+        await db.run_sync(
+            _snapshot_anchors_many,
+            [(rec, result.conflicted_ids) for rec, (result, _hit) in zip(records, results)],
+            tenant.id,
+            generation,
+        )
+        # See evaluate: start the write transaction with its INSERT.
+        await db.commit()
+        await db.run_sync(_write_batch, records)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    response.headers["ETag"] = anchor_generation_etag(generation)
+    return GateEvaluateBatchOut(
+        items=[_evaluate_out(rec, result, generation) for rec, (result, _hit) in zip(records, results)],
+        anchor_generation=generation,
+    )
+
+
+@router.post("/check", response_model=GateCheckOut)
+async def check(
+    payload: GateEvaluateIn,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    tenant: Tenant = Depends(get_tenant_async),
+):
+    """Side-effect free and not auditable, like the sync route."""
+    started = time.perf_counter()
+    generation = await db.run_sync(current_anchor_generation, tenant.id)
+    cache_key = _evaluate_cache_key(payload, tenant.id, generation)
+    result = decision_cache.get(cache_key)
+    anchors = None
+    if result is None:
+        anchors = list((await db.scalars(visible_anchors_stmt(tenant.id))).all())
+
+    profile = await db.get(PolicyProfile, payload.profile_id) if payload.profile_id is not None else None
+    mode = _profile_enforcement_mode(profile, payload.profile_id, tenant.id)
+    # Ends the read transaction (nothing was written); rollback() would
+    # expire the anchors before matching reads them.
+    await db.commit()
+
+    if result is None:
+        result = await run_cpu(_match_and_decide, payload, anchors)
+        decision_cache.put(cache_key, result)
+
+    out = _check_out(result, mode, generation)
+    _finish_check(response, started, generation)
+    return out
+
+
+@router.post("/reframe", response_model=GateReframeOut)
+async def reframe(
+    payload: GateReframeIn, db: AsyncSession = Depends(get_async_db), tenant: Tenant = Depends(get_tenant_async)
+):
+    parent = _check_reframe_parent(await db.get(GateLog, payload.log_id))
+
+    active_anchors = list((await db.scalars(visible_anchors_stmt(tenant.id))).all())
+    await db.commit()
+    result = await run_cpu(_reframe_decision, payload, parent, active_anchors)
+
+    log = _reframe_log(parent, result, tenant.id, await run_blocking(_reframe_log_id))
+    db.add(log)
+    await db.flush()
+    await db.run_sync(count_logs, [log])
+    await db.commit()
+
+    return _reframe_out(parent, result, log)
+
+
+@router.get("/replay/{trace_id}", response_model=ReplayOut)
+async def replay(trace_id: int, db: AsyncSession = Depends(get_async_db), tenant: Tenant = Depends(get_tenant_async)):
+    trace = await db.get(DecisionTrace, trace_id)
+    if not trace:
+        raise HTTPException(status_code=404, detail="Trace not found")
+
+    original_rows = await db.run_sync(_replay_rows, trace)
+    anchor_ids = [r.anchor_id for r in original_rows]
+    current_anchors = (await db.scalars(select(TruthAnchor).where(TruthAnchor.id.in_(anchor_ids)))).all()
+
+    new_ids: set[int] = set()
+    if trace.anchor_generation is None or trace.anchor_generation != await db.run_sync(
+        current_anchor_generation, tenant.id
+    ):
+        all_active_ids = set(
+            (await db.scalars(visible_anchors_stmt(tenant.id).with_only_columns(TruthAnchor.id))).all()
+        )
+        new_ids = all_active_ids - set(anchor_ids)
+    await db.commit()
+
+    result = await run_cpu(_replay_compare, trace, original_rows, {a.id: a for a in current_anchors})
+    return _replay_out(trace, result, new_ids)
+
+
+@router.get("/logs", response_model=GateLogListOut)
+async def list_gate_logs(
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    decision: str | None = Query(
+        default=None, description="Optional filter: proceed|gate|refuse"
+    ),
+    since: datetime | None = Query(
+        default=None,
+        description="Optional filter: ISO timestamp (e.g. 2026-02-06T18:00:00)",
+    ),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    List gate logs, newest-first, with optional filters.
+    """
+    count_stmt, stmt = _logs_statements(limit, offset, decision, since)
+    total = await db.scalar(count_stmt) or 0
+    rows = list((await db.scalars(stmt)).all())
+    anchor_ids = await db.run_sync(anchor_ids_by_log, rows)
+    await db.commit()
+    return _logs_out(rows, anchor_ids, total, limit, offset)
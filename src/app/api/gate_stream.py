@@ -0,0 +1,233 @@
+"""
+POST /gate/evaluate/stream: bulk offline scoring over NDJSON.
+
+The request body is one GateEvaluateIn JSON object per line. The response
+streams one line per input line, in order, while the upload is still being
+read. Each response line is the /gate/evaluate output plus its 1-based input
+`line`, or {"line": n, "error": "..."} for a line that isn't a valid request
+or is longer than MAX_LINE_BYTES (1 MiB). Lines are read, scored and written
+a chunk at a time: at most `batch_size` lines, and fewer once they conflict
+with MAX_CHUNK_CONFLICTS anchors between them, since each conflict is a
+trace-anchor row and a warning the chunk holds until it is written. Memory
+stays flat whatever the upload's size. A client that disconnects mid-upload
+just ends the stream.
+
+Every line is scored against the anchor set loaded when the stream starts,
+with the same matcher and decision logic as /gate/evaluate (the decision
+cache is bypassed). persist=batch (default) writes each chunk's logs and
+traces in one transaction before its lines are sent; chunks already sent
+stay committed if a later one fails, and the stream then ends with an
+{"error": ...} line. persist=none writes nothing and returns no
+log_id/trace_id.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import AsyncIterator, Literal
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.requests import ClientDisconnect
+
+from app.anchor_generation import anchor_generation_etag, current_anchor_generation, visible_anchors_stmt
+from app.api.gate import (
+    _evaluate_fields,
+    _match_and_decide,
+    _rl,
+    _reserve_ids,
+    _snapshot_anchors_many,
+    _trace_policy,
+    _trace_record,
+    _write_batch,
+)
+from app.auth import get_tenant
+from app.concurrency import run_blocking
+from app.db import get_db
+from app.models import PolicyProfile, Tenant
+from app.schemas import GateEvaluateIn, GateEvaluateStreamOut
+from app.security import verify_api_key
+from app.trace_policy import TracePolicy
+
+# Longest accepted input line; a longer one gets an error line and is not buffered.
+MAX_LINE_BYTES = 1024 * 1024
+# Most conflicted anchors, summed over its lines, that one chunk holds.
+MAX_CHUNK_CONFLICTS = 10000
+
+router = APIRouter(
+    dependencies=[Depends(verify_api_key), Depends(_rl)],
+)
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse without its disconnect listener, which would consume
+    the request body this response is still reading. A disconnect surfaces
+    as ClientDisconnect from request.stream() instead, which ends body().
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+class _StreamAborted(Exception):
+    def __init__(self, line: int, error: str) -> None:
+        super().__init__(error)
+        self.line = line
+        self.error = error
+
+
+class _StreamScorer:
+    """Scores NDJSON chunks on its own session (FastAPI closes get_db before streaming)."""
+
+    def __init__(self, session_factory: sessionmaker, tenant: Tenant, persist: bool) -> None:
+        self.tenant = tenant
+        self.tenant_id = tenant.id
+        self.persist = persist
+        self.line_no = 0
+        self._db: Session = session_factory()
+        self._policies: dict[int | None, TracePolicy] = {None: _trace_policy(None, tenant)}
+        self.generation = current_anchor_generation(self._db, self.tenant_id)
+        self.anchors = list(self._db.scalars(visible_anchors_stmt(self.tenant_id)).all())
+        # Keep the loaded anchors usable without holding a read transaction
+        # (on SQLite that would block writers) for the whole upload.
+        self._db.expunge_all()
+        self._db.commit()
+
+    def score(self, lines: list[bytes | None], limit: int) -> tuple[bytes, list[bytes | None]]:
+        """
+        Score, write and answer up to `limit` of `lines` as one chunk, ending it
+        early at MAX_CHUNK_CONFLICTS; returns the response and the lines left.
+        """
+        entries = []
+        taken = conflicts = 0
+        for raw in lines[:limit]:
+            if conflicts >= MAX_CHUNK_CONFLICTS:
+                break
+            taken += 1
+            self.line_no += 1
+            if raw is None:
+                entries.append({"line": self.line_no, "error": f"line longer than {MAX_LINE_BYTES} bytes"})
+                continue
+            if not raw.strip():
+                continue
+            try:
+                payload = GateEvaluateIn.model_validate_json(raw)
+            except ValidationError as e:
+                entries.append({"line": self.line_no, "error": _validation_message(e)})
+                continue
+            result = _match_and_decide(payload, self.anchors)
+            conflicts += len(result.conflicted_ids)
+            record = _trace_record(payload, result, False, self.generation, self._policy(payload.profile_id))
+            entries.append((self.line_no, record, result))
+
+        scored = [e for e in entries if isinstance(e, tuple)]
+        if self.persist and scored:
+            _reserve_ids([record for _n, record, _result in scored])
+            try:
+                _snapshot_anchors_many(
+                    self._db, [(record, result.conflicted_ids) for _n, record, result in scored],
+                    self.tenant_id, self.generation,
+                )
+                _write_batch(self._db, [record for _n, record, _result in scored])
+                self._db.commit()
+            except Exception as e:
+                self._db.rollback()
+                raise _StreamAborted(scored[0][0], f"write failed: {e}") from e
+
+        out = []
+        for entry in entries:
+            if isinstance(entry, dict):
+                out.append(json.dumps(entry))
+                continue
+            n, record, result = entry
+            item = GateEvaluateStreamOut(
+                line=n,
+                log_id=record.log.get("id"),
+                trace_id=record.trace.get("id"),
+                **_evaluate_fields(result, self.generation),
+            )
+            out.append(item.model_dump_json(exclude_none=True))
+        return "".join(line + "\n" for line in out).encode("utf-8"), lines[taken:]
+
+    def _policy(self, profile_id: int | None) -> TracePolicy:
+        if profile_id not in self._policies:
+            self._policies[profile_id] = _trace_policy(self._db.get(PolicyProfile, profile_id), self.tenant)
+        return self._policies[profile_id]
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc'])) or 'body'}: {err['msg']}" for err in e.errors())
+
+
+async def _ndjson_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[list[bytes | None]]:
+    """
+    The complete lines received so far, as they arrive; a final unterminated
+    line counts. Only each new chunk is split, and only the unterminated
+    line is carried over. A line longer than MAX_LINE_BYTES comes out as
+    None, and no more of it is kept than that.
+    """
+    partial = bytearray()
+    overlong = False
+    async for chunk in chunks:
+        lines: list[bytes | None] = chunk.split(b"\n")
+        tail = lines.pop()
+        if lines:
+            # The first piece ends the line carried over from earlier chunks.
+            if overlong or len(partial) + len(lines[0]) > MAX_LINE_BYTES:
+                lines[0] = None
+            elif partial:
+                lines[0] = bytes(partial + lines[0])
+            partial.clear()
+            overlong = False
+            lines[1:] = [None if len(line) > MAX_LINE_BYTES else line for line in lines[1:]]
+        if not overlong:
+            if len(partial) + len(tail) > MAX_LINE_BYTES:
+                partial.clear()
+                overlong = True
+            else:
+                partial += tail
+        if lines:
+            yield lines
+    if overlong:
+        yield [None]
+    elif partial.strip():
+        yield [bytes(partial)]
+
+
+@router.post("/evaluate/stream", response_class=StreamingResponse)
+async def evaluate_stream(
+    request: Request,
+    persist: Literal["batch", "none"] = Query("batch", description="batch: write traces per chunk; none: score only"),
+    batch_size: int = Query(500, ge=1, le=5000, description="Most lines scored and written per transaction"),
+    db: Session = Depends(get_db),
+    tenant: Tenant = Depends(get_tenant),
+):
+    session_factory = sessionmaker(bind=db.get_bind(), autoflush=False)
+    scorer = await run_blocking(_StreamScorer, session_factory, tenant, persist == "batch")
+
+    async def body() -> AsyncIterator[bytes]:
+        try:
+            async for lines in _ndjson_chunks(request.stream()):
+                while lines:
+                    out, lines = await run_blocking(scorer.score, lines, batch_size)
+                    yield out
+        except _StreamAborted as e:
+            yield (json.dumps({"line": e.line, "error": e.error}) + "\n").encode("utf-8")
+        except ClientDisconnect:
+            pass  # nobody left to answer; chunks already written stay committed
+        finally:
+            await run_blocking(scorer.close)
+
+    return _DuplexStreamingResponse(
+        body(),
+        media_type="application/x-ndjson",
+        headers={"ETag": anchor_generation_etag(scorer.generation)},
+    )
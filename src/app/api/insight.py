@@ -0,0 +1,545 @@
+import json
+import os
+from datetime import datetime, timezone
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import case, exists, select, func
+from pydantic import BaseModel, Field
+from app.anchor_generation import current_anchor_generation, visible_anchors_stmt
+from app.counterfactual import count_traces, patch_anchors, run as counterfactual_run, select_traces
+from app.dependencies import get_db
+from app.auth import get_tenant
+from app.models import Tenant
+from app.models import AnchorCounter, DecisionRollup, TruthAnchor
+from app.anchor_counters import TOTALS
+from app.decision_rollups import BUCKETS, bucket_start
+from app.report_cache import report_cache, report_pool
+from typing import List
+
+router = APIRouter()
+
+# Most buckets one /timeseries call may span.
+TIMESERIES_MAX_POINTS = int(os.getenv("SW_TIMESERIES_MAX_POINTS", "10000"))
+
+
+def _is_smoke_test_statement(statement: str | None) -> bool:
+    if not statement:
+        return False
+
+    text = statement.lower()
+    smoke_markers = [
+        "smoke test",
+        "smoke wall",
+        "smoke overflow",
+        "smoke vault",
+        "smoke locker",
+        "flubnort",
+        "zorbix",
+    ]
+    return any(marker in text for marker in smoke_markers)
+
+
+def _clean_statement_text(statement: str | None) -> str:
+    if not statement:
+        return ""
+
+    text = str(statement)
+
+    replacements = {
+        "\u00c2\u00a3": "\u00a3",   # Â£
+        "\u00e2\u20ac\u2122": "'",  # â€™
+        "\u00e2\u20ac\u0153": "\u201c",  # â€œ
+        "\u00e2\u20ac\u009d": "\u201d",  # â€
+    }
+
+    for bad, good in replacements.items():
+        text = text.replace(bad, good)
+
+    return text.strip()
+
+
+class DecisionSummary(BaseModel):
+    total_decisions: int
+    proceed_count: int
+    gate_count: int
+    refuse_count: int
+    proceed_pct: float
+    gate_pct: float
+    refuse_pct: float
+    total_overrides: int
+    override_rate: float
+
+
+@router.get("/summary", response_model=DecisionSummary)
+def summary(db: Session = Depends(get_db), tenant: Tenant = Depends(get_tenant)):
+    # Read from the tenant's totals rows of app.anchor_counters. Every
+    # evaluation keeps its trace row whatever its app.trace_policy tier, so
+    # plain counts need no sampling weights
+    rows = db.execute(
+        select(
+            AnchorCounter.decision,
+            func.sum(AnchorCounter.traces).label("n"),
+            func.sum(AnchorCounter.logs).label("logs"),
+            func.sum(AnchorCounter.overrides).label("overrides"),
+        )
+        .where(AnchorCounter.tenant_id == tenant.id, AnchorCounter.anchor_id == TOTALS)
+        .group_by(AnchorCounter.decision)
+    ).all()
+
+    counts = {r.decision: r.n for r in rows}
+    total = sum(counts.values())
+    proceed = counts.get("proceed", 0)
+    gate = counts.get("gate", 0)
+    refuse = counts.get("refuse", 0)
+
+    def pct(n: int) -> float:
+        return round((n / total) * 100, 1) if total > 0 else 0.0
+
+    gate_logs_total = sum(r.logs for r in rows if r.decision == "gate")
+
+    overrides = sum(r.overrides for r in rows)
+
+    override_rate = round((overrides / gate_logs_total) * 100, 1) if gate_logs_total > 0 else 0.0
+
+    return DecisionSummary(
+        total_decisions=total,
+        proceed_count=proceed,
+        gate_count=gate,
+        refuse_count=refuse,
+        proceed_pct=pct(proceed),
+        gate_pct=pct(gate),
+        refuse_pct=pct(refuse),
+        total_overrides=overrides,
+        override_rate=override_rate,
+    )
+
+
+class AnchorOverrideRate(BaseModel):
+    anchor_id: int
+    statement: str
+    total_gates: int
+    overrides: int
+    override_rate: float
+
+
+@router.get("/override-rate", response_model=list[AnchorOverrideRate])
+def override_rate(db: Session = Depends(get_db), tenant: Tenant = Depends(get_tenant)):
+
+    # Per anchor: gated logs and acknowledged overrides it took part in
+    total_gates = func.sum(case((AnchorCounter.decision == "gate", AnchorCounter.logs), else_=0))
+    overrides = func.sum(AnchorCounter.overrides)
+    rows = db.execute(
+        select(
+            AnchorCounter.anchor_id,
+            TruthAnchor.statement,
+            total_gates.label("total_gates"),
+            overrides.label("overrides"),
+        )
+        .outerjoin(TruthAnchor, TruthAnchor.id == AnchorCounter.anchor_id)
+        .where(AnchorCounter.tenant_id == tenant.id, AnchorCounter.anchor_id != TOTALS)
+        .group_by(AnchorCounter.anchor_id, TruthAnchor.statement)
+        .having(total_gates >= 3)
+        .order_by(AnchorCounter.anchor_id)
+    ).all()
+
+    grouped = {}
+
+    for row in rows:
+        statement = _clean_statement_text(
+            row.statement if row.statement is not None else "(missing anchor)"
+        )
+
+        if _is_smoke_test_statement(statement):
+            continue
+
+        key = statement.strip()
+
+        if key not in grouped:
+            grouped[key] = {
+                "anchor_id": row.anchor_id,
+                "statement": statement,
+                "total_gates": 0,
+                "overrides": 0,
+            }
+
+        grouped[key]["total_gates"] += row.total_gates
+        grouped[key]["overrides"] += row.overrides
+
+    result = []
+
+    for item in grouped.values():
+        total_gates = item["total_gates"]
+        ov = item["overrides"]
+        rate = round((ov / total_gates) * 100, 1) if total_gates > 0 else 0.0
+
+        result.append(
+            AnchorOverrideRate(
+                anchor_id=item["anchor_id"],
+                statement=item["statement"],
+                total_gates=total_gates,
+                overrides=ov,
+                override_rate=rate,
+            )
+        )
+
+    result.sort(key=lambda x: x.override_rate, reverse=True)
+    return result
+
+
+class DeadAnchor(BaseModel):
+    anchor_id: int
+    statement: str
+
+
+@router.get("/dead-anchors", response_model=list[DeadAnchor])
+def dead_anchors(db: Session = Depends(get_db), tenant: Tenant = Depends(get_tenant)):
+
+    # The tenant's (and shared) anchors none of its gate logs ever conflicted with
+    anchors = db.execute(
+        select(TruthAnchor.id, TruthAnchor.statement)
+        .where(
+            (TruthAnchor.tenant_id == tenant.id) | (TruthAnchor.tenant_id == None),  # noqa: E711
+            ~exists().where(
+                AnchorCounter.tenant_id == tenant.id,
+                AnchorCounter.anchor_id == TruthAnchor.id,
+                AnchorCounter.logs > 0,
+            ),
+        )
+        .order_by(TruthAnchor.id)
+    ).all()
+
+    grouped = {}
+
+    for a in anchors:
+        if _is_smoke_test_statement(a.statement):
+            continue
+
+        clean_statement = _clean_statement_text(a.statement)
+        key = clean_statement
+
+        if key not in grouped:
+            grouped[key] = {
+                "anchor_id": a.id,
+                "statement": clean_statement,
+            }
+
+    result = []
+
+    for item in grouped.values():
+        result.append(
+            DeadAnchor(
+                anchor_id=item["anchor_id"],
+                statement=item["statement"],
+            )
+        )
+
+    result.sort(key=lambda x: x.statement.lower())
+    return result
+
+
+class ParticipationAnchor(BaseModel):
+    anchor_id: int
+    current_statement: str
+    appearances: int
+
+
+@router.get("/participation", response_model=list[ParticipationAnchor])
+@router.get("/drift", response_model=list[ParticipationAnchor])
+def participation(db: Session = Depends(get_db), tenant: Tenant = Depends(get_tenant)):
+
+    appearances = func.sum(AnchorCounter.logs)
+    rows = db.execute(
+        select(TruthAnchor.id, TruthAnchor.statement, appearances.label("appearances"))
+        .join(AnchorCounter, AnchorCounter.anchor_id == TruthAnchor.id)
+        .where(AnchorCounter.tenant_id == tenant.id)
+        .group_by(TruthAnchor.id, TruthAnchor.statement)
+        .having(appearances > 0)
+        .order_by(TruthAnchor.id)
+    ).all()
+
+    grouped = {}
+
+    for a in rows:
+        if _is_smoke_test_statement(a.statement):
+            continue
+
+        clean_statement = _clean_statement_text(a.statement)
+        key = clean_statement
+
+        if key not in grouped:
+            grouped[key] = {
+                "anchor_id": a.id,
+                "current_statement": clean_statement,
+                "appearances": 0,
+            }
+
+        grouped[key]["appearances"] += a.appearances
+
+    result = []
+
+    for item in grouped.values():
+        result.append(
+            ParticipationAnchor(
+                anchor_id=item["anchor_id"],
+                current_statement=item["current_statement"],
+                appearances=item["appearances"],
+            )
+        )
+
+    result.sort(key=lambda x: x.appearances, reverse=True)
+    return result
+
+
+class TimeseriesPoint(BaseModel):
+    bucket_start: datetime
+    total: int
+    proceed: int
+    gate: int
+    refuse: int
+    would_block: int
+    gate_pct: float
+    refuse_pct: float
+    would_block_pct: float
+
+
+class Timeseries(BaseModel):
+    bucket: str
+    start: datetime
+    end: datetime
+    points: list[TimeseriesPoint]
+
+
+def _utc_naive(at: datetime) -> datetime:
+    return at.astimezone(timezone.utc).replace(tzinfo=None) if at.tzinfo is not None else at
+
+
+@router.get("/timeseries", response_model=Timeseries)
+def timeseries(
+    bucket: Literal["minute", "hour", "day"] = "hour",
+    start: datetime | None = Query(default=None, alias="from", description="ISO timestamp, UTC if naive"),
+    end: datetime | None = Query(default=None, alias="to", description="ISO timestamp (exclusive); default now"),
+    profile_id: int | None = None,
+    db: Session = Depends(get_db),
+    tenant: Tenant = Depends(get_tenant),
+):
+    """The tenant's decisions per bucket from decision_rollups; empty buckets are returned as zeros."""
+    step = BUCKETS[bucket]
+    end = _utc_naive(end) if end is not None else datetime.now(timezone.utc).replace(tzinfo=None)
+    start = bucket_start(_utc_naive(start) if start is not None else end - 60 * step, bucket)
+    if start >= end:
+        raise HTTPException(status_code=422, detail="from must be before to")
+    if (end - start) / step > TIMESERIES_MAX_POINTS:
+        raise HTTPException(
+            status_code=422, detail=f"Range spans more than {TIMESERIES_MAX_POINTS} {bucket} buckets"
+        )
+
+    stmt = (
+        select(
+            DecisionRollup.bucket_start,
+            DecisionRollup.decision,
+            func.sum(DecisionRollup.decisions).label("n"),
+            func.sum(DecisionRollup.would_block).label("would_block"),
+        )
+        .where(
+            DecisionRollup.granularity == bucket,
+            DecisionRollup.tenant_id == tenant.id,
+            DecisionRollup.bucket_start >= start,
+            DecisionRollup.bucket_start < end,
+        )
+        .group_by(DecisionRollup.bucket_start, DecisionRollup.decision)
+    )
+    if profile_id is not None:
+        stmt = stmt.where(DecisionRollup.profile_id == profile_id)
+
+    counts: dict = {}
+    for row in db.execute(stmt):
+        c = counts.setdefault(row.bucket_start, {"proceed": 0, "gate": 0, "refuse": 0, "would_block": 0})
+        c[row.decision] = c.get(row.decision, 0) + row.n
+        c["would_block"] += row.would_block
+
+    def pct(n: int, total: int) -> float:
+        return round((n / total) * 100, 1) if total > 0 else 0.0
+
+    points = []
+    at = start
+    while at < end:
+        c = counts.get(at, {})
+        total = c.get("proceed", 0) + c.get("gate", 0) + c.get("refuse", 0)
+        points.append(
+            TimeseriesPoint(
+                bucket_start=at,
+                total=total,
+                proceed=c.get("proceed", 0),
+                gate=c.get("gate", 0),
+                refuse=c.get("refuse", 0),
+                would_block=c.get("would_block", 0),
+                gate_pct=pct(c.get("gate", 0), total),
+                refuse_pct=pct(c.get("refuse", 0), total),
+                would_block_pct=pct(c.get("would_block", 0), total),
+            )
+        )
+        at += step
+
+    return Timeseries(bucket=bucket, start=start, end=end, points=points)
+
+
+class InsightReport(BaseModel):
+    summary: DecisionSummary
+    override_rate: list[AnchorOverrideRate]
+    dead_anchors: list[DeadAnchor]
+    participation: list[ParticipationAnchor]
+
+
+class ProposedAnchorChange(BaseModel):
+    anchor_id: int
+    new_statement: str
+
+
+class ProposedLevelChange(BaseModel):
+    anchor_id: int
+    level: int = Field(ge=1, le=3)
+
+
+class ProposedAnchor(BaseModel):
+    level: int = Field(ge=1, le=3)
+    statement: str = Field(min_length=1)
+    scope: str = "global"
+
+
+class CounterfactualIn(BaseModel):
+    trace_ids: List[int]
+    proposed_changes: List[ProposedAnchorChange]
+    level_changes: List[ProposedLevelChange] = []
+    archived_anchor_ids: List[int] = []
+    added_anchors: List[ProposedAnchor] = []
+
+
+class CounterfactualOut(BaseModel):
+    trace_id: int
+    original_decision: str
+    counterfactual_decision: str
+    changed: bool
+
+
+class CounterfactualStreamIn(BaseModel):
+    """A change set, and which traces to replay: trace_ids, or all matching the filters."""
+
+    proposed_changes: List[ProposedAnchorChange] = []
+    level_changes: List[ProposedLevelChange] = []
+    archived_anchor_ids: List[int] = []
+    added_anchors: List[ProposedAnchor] = []
+    trace_ids: List[int] | None = None
+    since: datetime | None = None
+    until: datetime | None = None
+    decision: Literal["proceed", "gate", "refuse"] | None = None
+    limit: int | None = Field(default=None, ge=1)
+    only_changed: bool = False
+
+
+def _patched_anchor_set(db: Session, tenant: Tenant, payload) -> list:
+    """The tenant's visible anchors with the payload's changes applied (404 on an unknown anchor ID)."""
+    live = db.scalars(visible_anchors_stmt(tenant.id)).all()
+    referenced = (
+        {c.anchor_id for c in payload.proposed_changes}
+        | {c.anchor_id for c in payload.level_changes}
+        | set(payload.archived_anchor_ids)
+    )
+    unknown = referenced - {a.id for a in live}
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Anchor not found: {sorted(unknown)}")
+    return patch_anchors(
+        live,
+        statements={c.anchor_id: c.new_statement for c in payload.proposed_changes},
+        levels={c.anchor_id: c.level for c in payload.level_changes},
+        archived=payload.archived_anchor_ids,
+        added=[(a.level, a.statement, a.scope) for a in payload.added_anchors],
+    )
+
+
+@router.post("/counterfactual", response_model=list[CounterfactualOut])
+def counterfactual(payload: CounterfactualIn, db: Session = Depends(get_db), tenant: Tenant = Depends(get_tenant)):
+    # Build patched copies — never mutate live session objects
+    patched_anchors = _patched_anchor_set(db, tenant, payload)
+    stmt = select_traces(tenant.id, trace_ids=payload.trace_ids)
+    events = counterfactual_run(db, patched_anchors, stmt, total=len(payload.trace_ids), workers=0)
+    return [
+        CounterfactualOut(**{k: v for k, v in e.items() if k != "type"})
+        for e in events
+        if e["type"] == "result"
+    ]
+
+
+@router.post("/counterfactual/stream", response_class=StreamingResponse)
+def counterfactual_stream(
+    payload: CounterfactualStreamIn, db: Session = Depends(get_db), tenant: Tenant = Depends(get_tenant)
+):
+    """NDJSON: a result line per replayed trace, progress lines, then a summary (app.counterfactual)."""
+    patched_anchors = _patched_anchor_set(db, tenant, payload)
+    stmt = select_traces(
+        tenant.id,
+        trace_ids=payload.trace_ids,
+        since=payload.since,
+        until=payload.until,
+        decision=payload.decision,
+        limit=payload.limit,
+    )
+    total = count_traces(db, stmt)
+    session_factory = sessionmaker(bind=db.get_bind(), autoflush=False)
+
+    def body():
+        # The request's session is closed once streaming starts.
+        with session_factory() as session:
+            for event in counterfactual_run(session, patched_anchors, stmt, total, only_changed=payload.only_changed):
+                yield (json.dumps(event) + "\n").encode("utf-8")
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+def _report_watermark(db: Session, tenant: Tenant) -> tuple:
+    """
+    Changes whenever a log, trace or anchor change the tenant's report reads
+    is written: its counter totals (bumped with every log and trace it
+    writes) and the generation of the anchors it sees.
+    """
+    totals = db.execute(
+        select(func.sum(AnchorCounter.logs), func.sum(AnchorCounter.traces))
+        .where(AnchorCounter.tenant_id == tenant.id, AnchorCounter.anchor_id == TOTALS)
+    ).one()
+    return (*totals, current_anchor_generation(db, tenant.id))
+
+
+def _sub_report(session_factory, fn, tenant: Tenant):
+    with session_factory() as db:
+        return fn(db, tenant)
+
+
+def _compute_report(session_factory, tenant: Tenant) -> InsightReport:
+    # The four sub-reports run concurrently, each on its own connection
+    summary_data, override_data, dead_anchor_data, participation_data = [
+        future.result()
+        for future in [
+            report_pool.submit(_sub_report, session_factory, fn, tenant)
+            for fn in (summary, override_rate, dead_anchors, participation)
+        ]
+    ]
+
+    return InsightReport(
+        summary=summary_data,
+        override_rate=override_data,
+        dead_anchors=dead_anchor_data,
+        participation=participation_data,
+    )
+
+
+@router.get("/report", response_model=InsightReport)
+def report(response: Response, db: Session = Depends(get_db), tenant: Tenant = Depends(get_tenant)):
+    """The tenant's four sub-reports, cached until its watermark moves; see app.report_cache."""
+    watermark = _report_watermark(db, tenant)
+    db.commit()
+    session_factory = sessionmaker(bind=db.get_bind(), autoflush=False)
+    result, status = report_cache.get(tenant.id, watermark, lambda: _compute_report(session_factory, tenant))
+    response.headers["X-SignalWeaver-Cache"] = status
+    return result
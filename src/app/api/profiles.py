@@ -5,6 +5,8 @@ from fastapi import Request
 from sqlalchemy import delete
 from app.security import verify_api_key, rate_limit
 from app.db import get_db
+from app.anchor_generation import bump_anchor_generation
+from app.decision_cache import decision_cache
 from app.auth import get_tenant
 from app.models import Tenant
 from app.models import PolicyProfile, PolicyProfileAnchor, TruthAnchor
@@ -47,6 +49,7 @@ def create_profile(payload: PolicyProfileCreate, db: Session = Depends(get_db),
         description=payload.description,
         is_default=payload.is_default or False,
         enforcement_mode=payload.enforcement_mode.value,
+        trace_proceed_sample_rate=payload.trace_proceed_sample_rate,
     )
 
     db.add(profile)
@@ -102,6 +105,9 @@ def update_profile(
     if payload.enforcement_mode is not None:
         profile.enforcement_mode = payload.enforcement_mode.value
 
+    if payload.trace_proceed_sample_rate is not None:
+        profile.trace_proceed_sample_rate = payload.trace_proceed_sample_rate
+
     if payload.is_default is not None and payload.is_default:
         for prof in db.scalars(
             select(PolicyProfile).where(PolicyProfile.is_default == True)  # noqa: E712
@@ -129,7 +135,9 @@ def delete_profile(profile_id: int, db: Session = Depends(get_db)):
         )
 
     db.delete(profile)
+    bump_anchor_generation(db, profile.tenant_id)
     db.commit()
+    decision_cache.invalidate()
 
 
 @router.get("/{profile_id}/anchors", response_model=ProfileAnchorsOut)
@@ -174,7 +182,9 @@ def set_profile_anchors(
     for anchor_id in payload.anchor_ids:
         db.add(PolicyProfileAnchor(profile_id=profile_id, anchor_id=anchor_id))
 
+    bump_anchor_generation(db, profile.tenant_id)
     db.commit()
+    decision_cache.invalidate()
     db.refresh(profile)
     anchor_ids = [a.id for a in profile.anchors]
     return ProfileAnchorsOut(profile_id=profile_id, anchor_ids=anchor_ids)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func
+from sqlalchemy import case, select, func
 from app.security import verify_api_key, rate_limit
 from app.db import get_db
 from app.models import DecisionTrace, DecisionTraceAnchor, TruthAnchor
@@ -17,6 +17,12 @@ router = APIRouter(
 )
 
 
+def _trace_weight():
+    """How many traces a DecisionTrace row stands for: 1, or 1/rate for sampled ones."""
+    rate = DecisionTrace.trace_sample_rate
+    return case((rate > 0, 1.0 / rate), else_=1.0)
+
+
 @router.get("/shadow-summary", response_model=ShadowSummaryOut)
 def shadow_summary(db: Session = Depends(get_db)):
 
@@ -25,23 +31,25 @@ def shadow_summary(db: Session = Depends(get_db)):
         select(func.count()).select_from(DecisionTrace)
     ) or 0
 
-    # Total where an L3 anchor was matched
-    total_l3_conflicts = db.scalar(
-        select(func.count(DecisionTraceAnchor.id.distinct()))
-        .where(
-            DecisionTraceAnchor.matched == True,  # noqa: E712
-            DecisionTraceAnchor.level_snapshot == 3,
+    # Conflicts counted over trace-anchor rows, each weighted by its trace's
+    # sampling (app.trace_policy): a sampled trace stands for 1/rate traces
+    def weighted_conflicts(level: int) -> int:
+        total = db.scalar(
+            select(func.coalesce(func.sum(_trace_weight()), 0))
+            .select_from(DecisionTraceAnchor)
+            .join(DecisionTrace, DecisionTrace.id == DecisionTraceAnchor.trace_id)
+            .where(
+                DecisionTraceAnchor.matched == True,  # noqa: E712
+                DecisionTraceAnchor.level_snapshot == level,
+            )
         )
-    ) or 0
+        return round(total or 0)
+
+    # Total where an L3 anchor was matched
+    total_l3_conflicts = weighted_conflicts(3)
 
     # Total where an L2 anchor was matched
-    total_l2_conflicts = db.scalar(
-        select(func.count(DecisionTraceAnchor.id.distinct()))
-        .where(
-            DecisionTraceAnchor.matched == True,  # noqa: E712
-            DecisionTraceAnchor.level_snapshot == 2,
-        )
-    ) or 0
+    total_l2_conflicts = weighted_conflicts(2)
 
     # Total shadow hypothetical blocks
     total_would_block = db.scalar(
@@ -57,29 +65,35 @@ def shadow_summary(db: Session = Depends(get_db)):
         .where(DecisionTrace.override_reason != "")
     ) or 0
 
-    # Top triggered anchors by frequency
+    # Top triggered anchors by (sampling-weighted) frequency
+    trigger_count = func.sum(_trace_weight())
     rows = db.execute(
         select(
             DecisionTraceAnchor.anchor_id,
             TruthAnchor.statement,
             TruthAnchor.level,
             TruthAnchor.scope,
-            func.count(DecisionTraceAnchor.id).label("trigger_count"),
+            trigger_count.label("trigger_count"),
         )
         .join(TruthAnchor, TruthAnchor.id == DecisionTraceAnchor.anchor_id)
+        .join(DecisionTrace, DecisionTrace.id == DecisionTraceAnchor.trace_id)
         .where(DecisionTraceAnchor.matched == True)  # noqa: E712
-        .group_by(DecisionTraceAnchor.anchor_id)
-        .order_by(func.count(DecisionTraceAnchor.id).desc())
+        .group_by(DecisionTraceAnchor.anchor_id, TruthAnchor.statement, TruthAnchor.level, TruthAnchor.scope)
+        .order_by(trigger_count.desc())
         .limit(10)
     ).all()
 
+    traces_by_tier = dict(
+        db.execute(select(DecisionTrace.trace_tier, func.count()).group_by(DecisionTrace.trace_tier)).all()
+    )
+
     top_triggered_anchors = [
         {
             "anchor_id": r.anchor_id,
             "statement": r.statement,
             "level": r.level,
             "scope": r.scope,
-            "trigger_count": r.trigger_count,
+            "trigger_count": round(r.trigger_count),
         }
         for r in rows
     ]
@@ -91,4 +105,5 @@ def shadow_summary(db: Session = Depends(get_db)):
         total_would_block=total_would_block,
         total_overrides=total_overrides,
         top_triggered_anchors=top_triggered_anchors,
+        traces_by_tier=traces_by_tier,
     )
\ No newline at end of file
@@ -1,8 +1,10 @@
 ﻿import secrets
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import select
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.dependencies import get_db
 from app.models import Tenant
@@ -14,12 +16,15 @@ router = APIRouter()
 
 class TenantCreateIn(BaseModel):
     name: str
+    # Share of low-risk proceeds fully traced; None = SW_TRACE_PROCEED_SAMPLE_RATE
+    trace_proceed_sample_rate: Optional[float] = Field(default=None, ge=0, le=1)
 
 
 class TenantOut(BaseModel):
     id: int
     name: str
     active: bool
+    trace_proceed_sample_rate: Optional[float] = None
 
 
 class TenantCreatedOut(BaseModel):
@@ -35,7 +40,9 @@ def create_tenant(payload: TenantCreateIn, db: Session = Depends(get_db)):
         raise HTTPException(status_code=409, detail="Tenant name already exists")
 
     raw_key, hashed = generate_api_key()
-    tenant = Tenant(name=payload.name, api_key_hash=hashed)
+    tenant = Tenant(
+        name=payload.name, api_key_hash=hashed, trace_proceed_sample_rate=payload.trace_proceed_sample_rate
+    )
     db.add(tenant)
     db.commit()
     db.refresh(tenant)
@@ -46,4 +53,7 @@ def create_tenant(payload: TenantCreateIn, db: Session = Depends(get_db)):
 @router.get("/", response_model=list[TenantOut])
 def list_tenants(db: Session = Depends(get_db)):
     rows = db.execute(select(Tenant).order_by(Tenant.id)).scalars().all()
-    return [TenantOut(id=r.id, name=r.name, active=r.active) for r in rows]
+    return [
+        TenantOut(id=r.id, name=r.name, active=r.active, trace_proceed_sample_rate=r.trace_proceed_sample_rate)
+        for r in rows
+    ]
@@ -4,9 +4,11 @@ import secrets
 from fastapi import Depends, HTTPException, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.dependencies import get_db
+from app.db_async import get_async_db
 from app.models import Tenant
 
 
@@ -40,3 +42,23 @@ def get_tenant(
         raise HTTPException(status_code=401, detail="Invalid or inactive API key")
 
     return tenant
+
+
+async def get_tenant_async(
+    credentials: HTTPAuthorizationCredentials | None = Security(bearer_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> Tenant:
+    """get_tenant() for the async routers."""
+    if not credentials:
+        raise HTTPException(status_code=401, detail="Missing authorization header")
+
+    key_hash = _hash_key(credentials.credentials)
+    tenant = await db.scalar(
+        select(Tenant)
+        .where(Tenant.api_key_hash == key_hash)
+        .where(Tenant.active == True)  # noqa: E712
+    )
+    if not tenant:
+        raise HTTPException(status_code=401, detail="Invalid or inactive API key")
+
+    return tenant
@@ -0,0 +1,38 @@
+"""
+Worker-thread offloading for the async routers.
+
+Matching, embedding and decision logic are CPU-bound and must not run on the
+event loop. run_cpu() moves them to a worker thread, at most
+SW_ASYNC_CPU_THREADS (default 8) at a time. Requests beyond that wait on the
+limiter without holding a thread, so thousands can be in flight.
+run_blocking() is for short blocking calls such as spool fsyncs; it shares
+AnyIO's default thread limiter.
+"""
+
+from __future__ import annotations
+
+import os
+from functools import partial
+from typing import Callable, TypeVar
+
+import anyio
+import anyio.to_thread
+
+T = TypeVar("T")
+
+_cpu_limiter: anyio.CapacityLimiter | None = None
+
+
+def cpu_limiter() -> anyio.CapacityLimiter:
+    global _cpu_limiter
+    if _cpu_limiter is None:
+        _cpu_limiter = anyio.CapacityLimiter(max(1, int(os.getenv("SW_ASYNC_CPU_THREADS", "8"))))
+    return _cpu_limiter
+
+
+async def run_cpu(fn: Callable[..., T], *args, **kwargs) -> T:
+    return await anyio.to_thread.run_sync(partial(fn, *args, **kwargs), limiter=cpu_limiter())
+
+
+async def run_blocking(fn: Callable[..., T], *args, **kwargs) -> T:
+    return await anyio.to_thread.run_sync(partial(fn, *args, **kwargs))
@@ -0,0 +1,263 @@
+"""
+Counterfactual replays: how would past decision traces have been decided
+under a changed anchor set?
+
+patch_anchors() applies a change set (statement edits, level changes,
+archivals, new anchors) to a tenant's live anchors; run() replays the
+selected traces against the result and yields events, one per NDJSON line
+of POST /insight/counterfactual/stream:
+
+    {"type": "result", "trace_id": 7, "original_decision": "proceed", "counterfactual_decision": "gate", "changed": true}
+    {"type": "progress", "evaluated": 1000, "changed": 12, "total": 250000}
+    {"type": "summary", "evaluated": 250000, "changed": 12, "unchanged": 249988, "transitions": {"proceed->gate": 12}}
+
+Patched anchors keep their live IDs, so they are matched against a private
+AnchorIndex, compiled once per process, never against the shared one live
+requests use. With an embedding matcher their vectors likewise live in a
+private, in-memory AnchorEmbeddingStore: copied from the shared store where
+it has them, and otherwise encoded once in the requesting process and handed
+to the workers. Proposed statements never reach the shared store or its files.
+Replays of at least SW_COUNTERFACTUAL_MIN_PARALLEL traces
+(default 5000) are sharded SW_COUNTERFACTUAL_CHUNK traces (default 1000) at a
+time across SW_COUNTERFACTUAL_WORKERS spawned processes (default: the CPU
+count, or 0 on a single CPU; 0 always replays in-process). Traces are
+streamed from the database and at most two chunks per worker are in flight,
+so memory stays flat however many traces are replayed.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.anchor_index import AnchorIndex
+from app.api.gate import _decide_conflicts, _detect_conflicts
+from app.db import stream
+from app.embedding_matcher import AnchorEmbeddingStore, _tolerate_missing_backend, embedding_enabled, embedding_store
+from app.models import DecisionTrace, TruthAnchor
+
+_CPUS = os.cpu_count() or 1
+WORKERS = int(os.getenv("SW_COUNTERFACTUAL_WORKERS", str(_CPUS if _CPUS > 1 else 0)))
+CHUNK = int(os.getenv("SW_COUNTERFACTUAL_CHUNK", "1000"))
+MIN_PARALLEL = int(os.getenv("SW_COUNTERFACTUAL_MIN_PARALLEL", "5000"))
+
+
+@dataclass(frozen=True)
+class _PatchedAnchor:
+    """A live anchor with proposed changes applied; never written back."""
+
+    id: int
+    level: int
+    statement: str
+    scope: str
+    active: bool = True
+
+    # TruthAnchor's hash over the same fields, so an unchanged anchor compiles to the same key.
+    stable_hash = TruthAnchor.stable_hash
+
+
+def patch_anchors(
+    live: Iterable,
+    statements: dict[int, str] | None = None,
+    levels: dict[int, int] | None = None,
+    archived: Iterable[int] = (),
+    added: Iterable[tuple[int, str, str]] = (),
+) -> list[_PatchedAnchor]:
+    """
+    The live anchors with new statements and levels applied by anchor ID and
+    archived IDs left out, followed by the `added` (level, statement, scope)
+    anchors under IDs -1, -2, ... that no stored anchor can have.
+    """
+    statements = statements or {}
+    levels = levels or {}
+    archived = set(archived)
+    patched = [
+        _PatchedAnchor(
+            id=a.id,
+            level=levels.get(a.id, a.level),
+            statement=statements.get(a.id, a.statement),
+            scope=a.scope,
+        )
+        for a in live
+        if a.id not in archived
+    ]
+    for i, (level, statement, scope) in enumerate(added, start=1):
+        patched.append(_PatchedAnchor(id=-i, level=level, statement=statement, scope=scope))
+    return patched
+
+
+def select_traces(
+    tenant_id: int,
+    trace_ids: list[int] | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    decision: str | None = None,
+    limit: int | None = None,
+):
+    """
+    (id, request_text, arousal, dominance, decision) of the tenant's traces
+    (and those written before traces recorded a tenant), oldest first.
+    """
+    stmt = select(
+        DecisionTrace.id,
+        DecisionTrace.request_text,
+        DecisionTrace.arousal,
+        DecisionTrace.dominance,
+        DecisionTrace.decision,
+    ).where((DecisionTrace.tenant_id == tenant_id) | (DecisionTrace.tenant_id == None))  # noqa: E711
+    if trace_ids is not None:
+        stmt = stmt.where(DecisionTrace.id.in_(trace_ids))
+    if since is not None:
+        stmt = stmt.where(DecisionTrace.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(DecisionTrace.created_at < until)
+    if decision is not None:
+        stmt = stmt.where(DecisionTrace.decision == decision)
+    stmt = stmt.order_by(DecisionTrace.id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def count_traces(db: Session, stmt) -> int:
+    return db.scalar(select(func.count()).select_from(stmt.subquery())) or 0
+
+
+def _index(anchors: list[_PatchedAnchor]) -> AnchorIndex:
+    index = AnchorIndex()
+    for a in anchors:
+        index.add(a)
+    return index
+
+
+def _embeddings(anchors: list[_PatchedAnchor], index: AnchorIndex) -> AnchorEmbeddingStore:
+    """A private store holding the patched anchors' vectors, if the matcher uses embeddings."""
+    store = AnchorEmbeddingStore(persist=False)
+    if embedding_enabled() and anchors:
+        with _tolerate_missing_backend():
+            store.put(*embedding_store.vectors([index.key_for(a) for a in anchors]))
+            store.lookup(anchors, index)  # encodes the proposed statements, in memory only
+    return store
+
+
+_Compiled = tuple[list[_PatchedAnchor], AnchorIndex, AnchorEmbeddingStore]
+
+
+def _compile(anchors: list[_PatchedAnchor]) -> _Compiled:
+    index = _index(anchors)
+    return anchors, index, _embeddings(anchors, index)
+
+
+def _replay(
+    rows, anchors: list[_PatchedAnchor], index: AnchorIndex, store: AnchorEmbeddingStore
+) -> list[tuple[int, str, str]]:
+    """(trace_id, original_decision, counterfactual_decision) per trace row."""
+    out = []
+    for trace_id, request_text, arousal, dominance, original in rows:
+        conflicts, _debug, _evidence = _detect_conflicts(request_text, anchors, index, store)
+        out.append((trace_id, original, _decide_conflicts(request_text, arousal, dominance, conflicts).decision))
+    return out
+
+
+_worker: _Compiled | None = None
+
+
+def _init_worker(anchors: list[_PatchedAnchor], keys: list[str], vectors) -> None:
+    global _worker
+    store = AnchorEmbeddingStore(persist=False)
+    store.put(keys, vectors)
+    _worker = (anchors, _index(anchors), store)
+
+
+def _replay_chunk(rows: list[tuple]) -> list[tuple[int, str, str]]:
+    return _replay(rows, *_worker)
+
+
+def _chunks(rows, size: int) -> Iterator[list[tuple]]:
+    rows = iter(rows)
+    while chunk := [tuple(r) for r in islice(rows, size)]:
+        yield chunk
+
+
+def _replay_parallel(chunks: Iterator[list[tuple]], anchors: list[_PatchedAnchor], workers: int):
+    keys, vectors = [], None
+    if embedding_enabled():
+        # Encode here, once, rather than in every worker.
+        index = _index(anchors)
+        keys, vectors = _embeddings(anchors, index).vectors([index.key_for(a) for a in anchors])
+    # spawn, not fork: the server process has live threads and pooled connections.
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(anchors, keys, vectors),
+    ) as pool:
+        pending: deque = deque()
+        try:
+            for chunk in chunks:
+                pending.append(pool.submit(_replay_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:  # the caller stopped reading
+                future.cancel()
+
+
+def run(
+    db: Session,
+    anchors: list[_PatchedAnchor],
+    stmt,
+    total: int,
+    only_changed: bool = False,
+    workers: int | None = None,
+    chunk_size: int | None = None,
+) -> Iterator[dict]:
+    """
+    Replay the traces `stmt` (from select_traces()) selects against `anchors`:
+    result events in trace order, a progress event per chunk, then a summary
+    with the number of flips per "original->counterfactual" transition.
+    """
+    workers = WORKERS if workers is None else workers
+    chunks = _chunks(stream(db, stmt), chunk_size or CHUNK)
+    if workers > 0 and total >= MIN_PARALLEL:
+        batches = _replay_parallel(chunks, anchors, workers)
+    else:
+        compiled = _compile(anchors)
+        batches = (_replay(chunk, *compiled) for chunk in chunks)
+
+    evaluated = changed = 0
+    transitions: Counter = Counter()
+    for batch in batches:
+        for trace_id, original, decision in batch:
+            evaluated += 1
+            flipped = decision != original
+            if flipped:
+                changed += 1
+                transitions[f"{original}->{decision}"] += 1
+            if flipped or not only_changed:
+                yield {
+                    "type": "result",
+                    "trace_id": trace_id,
+                    "original_decision": original,
+                    "counterfactual_decision": decision,
+                    "changed": flipped,
+                }
+        yield {"type": "progress", "evaluated": evaluated, "changed": changed, "total": total}
+    yield {
+        "type": "summary",
+        "evaluated": evaluated,
+        "changed": changed,
+        "unchanged": evaluated - changed,
+        "transitions": dict(sorted(transitions.items())),
+    }
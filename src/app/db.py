@@ -2,20 +2,56 @@ from pathlib import Path
 import os
 from typing import Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import case, create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, Session
 
+from app.db_profiles import StorageProfile, storage_profile
+
 # Always resolve DB to an absolute path so cwd doesn't change where data is stored.
 BASE_DIR = Path(__file__).resolve().parents[2]  # .../backend/src
 DEFAULT_DB_PATH = BASE_DIR / "signalweaver.db"
 
 DB_PATH = Path(os.getenv("SIGNALWEAVER_DB", str(DEFAULT_DB_PATH))).resolve()
-DATABASE_URL = f"sqlite:///{DB_PATH.as_posix()}"
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},  # needed for SQLite + FastAPI
-)
+# Pragmas and pool sizing; see app/db_profiles.py.
+DB_PROFILE = storage_profile(os.getenv("SW_DB_PROFILE", "default"))
+
+# Any SQLAlchemy URL (e.g. postgresql+psycopg2://user:pw@host/db) replaces the
+# SQLite file, so several API replicas can share one database.
+DATABASE_URL = os.getenv("SIGNALWEAVER_DATABASE_URL") or DB_PROFILE.url(DB_PATH.as_posix())
+IS_SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+
+# Rows fetched per round trip when streaming large result sets (server-side
+# cursors on PostgreSQL).
+STREAM_YIELD_PER = int(os.getenv("SW_DB_YIELD_PER", "1000"))
+
+
+def engine_options(url: str, profile: StorageProfile) -> dict:
+    """create_engine() keyword arguments for `url` under `profile`."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {
+            "connect_args": {"check_same_thread": False},  # needed for SQLite + FastAPI
+            **profile.engine_kwargs(),
+        }
+    # Server databases: a QueuePool sized per process. Total connections are
+    # roughly replicas * workers * (pool_size + max_overflow).
+    pool_size = 10 if profile.pool_size is None else profile.pool_size
+    max_overflow = 20 if profile.max_overflow is None else profile.max_overflow
+    return {
+        "pool_size": int(os.getenv("SW_DB_POOL_SIZE", pool_size)),
+        "max_overflow": int(os.getenv("SW_DB_MAX_OVERFLOW", max_overflow)),
+        "pool_timeout": float(os.getenv("SW_DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("SW_DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+        # Rows per multi-VALUES INSERT in executemany (psycopg2 execute_values style).
+        "insertmanyvalues_page_size": int(os.getenv("SW_DB_INSERT_PAGE_SIZE", "1000")),
+    }
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, DB_PROFILE))
+DB_PROFILE.install(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -28,3 +64,39 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def stream(db: Session, stmt, yield_per: int = STREAM_YIELD_PER):
+    """
+    Execute `stmt` for iteration over a large result, fetching `yield_per`
+    rows at a time. On PostgreSQL this uses a server-side cursor, so the
+    whole result is never held in memory.
+    """
+    return db.execute(stmt, execution_options={"yield_per": yield_per})
+
+
+def upsert_add(db: Session, table, keys: list[str], rows: list[dict], latest: tuple[str, ...] = ()) -> None:
+    """
+    INSERT rows, or on a key conflict add their other columns to the existing
+    row's; columns in `latest` keep the later of the two values instead.
+    Rows are applied in key order so concurrent writers lock them in the
+    same order (no deadlocks on PostgreSQL). SQLite and PostgreSQL only.
+    """
+    if not rows:
+        return
+    dialect = db.connection().dialect.name
+    stmt = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(table)
+    excluded = stmt.excluded
+    updates = {}
+    for name in rows[0]:
+        if name in keys:
+            continue
+        column = table.c[name]
+        if name in latest:
+            updates[name] = case(
+                (column.is_(None), excluded[name]),
+                (excluded[name] > column, excluded[name]),
+                else_=column,
+            )
+        else:
+            updates[name] = column + excluded[name]
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c[k] for k in keys], set_=updates)
+    db.execute(stmt, sorted(rows, key=lambda row: tuple(row[k] for k in keys)))
@@ -0,0 +1,77 @@
+"""
+Async database access for the async routers (SW_DB_ASYNC=1).
+
+The async engine points at the same database as app.db with an async driver
+swapped in: sqlite -> sqlite+aiosqlite, postgresql -> postgresql+asyncpg.
+SW_ASYNC_DATABASE_URL overrides the derived URL. Both drivers are optional
+and only imported when the engine is first used. Pool sizing and storage
+profile PRAGMAs are the same as for the sync engine.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import AsyncGenerator
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.db import DATABASE_URL, DB_PROFILE, engine_options
+
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+_lock = threading.Lock()
+_engine: AsyncEngine | None = None
+_session_factory: async_sessionmaker[AsyncSession] | None = None
+
+
+def async_db_enabled() -> bool:
+    return os.getenv("SW_DB_ASYNC", "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+def async_database_url(url: str) -> str:
+    """`url` with its driver replaced by the async one for the same backend."""
+    parsed = make_url(url)
+    if parsed.get_dialect().is_async:
+        return url
+    driver = _ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver known for {parsed.get_backend_name()!r}; set SW_ASYNC_DATABASE_URL")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def get_async_engine() -> AsyncEngine:
+    global _engine, _session_factory
+    with _lock:
+        if _engine is None:
+            url = os.getenv("SW_ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+            options = engine_options(url, DB_PROFILE)
+            if make_url(url).get_backend_name() == "sqlite":
+                # aiosqlite defaults to NullPool (a connection and thread per
+                # session); pool like the sync engine to bound writers.
+                options.setdefault("pool_size", 5)
+                options.setdefault("max_overflow", 10)
+                options["poolclass"] = AsyncAdaptedQueuePool
+            _engine = create_async_engine(url, **options)
+            DB_PROFILE.install(_engine.sync_engine)
+            # expire_on_commit=False: routes commit early to hand the pooled
+            # connection back, then keep reading the loaded rows.
+            _session_factory = async_sessionmaker(_engine, expire_on_commit=False, autoflush=False)
+        return _engine
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    get_async_engine()
+    async with _session_factory() as db:
+        yield db
+
+
+async def dispose_async_engine() -> None:
+    """Close pooled connections; aiosqlite's per-connection threads otherwise keep the process alive."""
+    global _engine, _session_factory
+    with _lock:
+        engine, _engine, _session_factory = _engine, None, None
+    if engine is not None:
+        await engine.dispose()
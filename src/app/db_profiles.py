@@ -0,0 +1,129 @@
+"""
+Named SQLite storage profiles, selected with SW_DB_PROFILE.
+
+    default             SQLite's own defaults (rollback journal, no mmap)
+    throughput          WAL, synchronous=NORMAL, large page cache and mmap;
+                        a commit survives a process crash but not necessarily
+                        power loss
+    durable             WAL, synchronous=FULL; every commit is fsynced
+    readonly-analytics  read-only connections (query_only) with a very large
+                        cache and mmap, for report/insight workers pointed at
+                        a live database
+
+Pragmas are applied to every new connection through an engine "connect"
+event, and each profile brings its own connection-pool sizing. With
+SIGNALWEAVER_DATABASE_URL pointing at PostgreSQL only the pool sizing and
+read-only flag carry over.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_MiB = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class StorageProfile:
+    name: str
+    # PRAGMA name -> value, applied in order on connect.
+    pragmas: tuple[tuple[str, str], ...] = ()
+    read_only: bool = False
+    # None keeps SQLAlchemy's pool defaults.
+    pool_size: int | None = None
+    max_overflow: int | None = None
+
+    def url(self, sqlite_path: str) -> str:
+        if self.read_only:
+            return f"sqlite:///file:{sqlite_path}?mode=ro&uri=true"
+        return f"sqlite:///{sqlite_path}"
+
+    def engine_kwargs(self) -> dict:
+        if self.pool_size is None:
+            return {}
+        return {"pool_size": self.pool_size, "max_overflow": self.max_overflow}
+
+    def install(self, engine: Engine) -> None:
+        if engine.dialect.name != "sqlite":
+            # Pragmas are SQLite-only; elsewhere a profile only sizes the pool
+            # and, if read-only, makes every session read-only.
+            if self.read_only:
+                event.listen(engine, "connect", _read_only_session)
+            return
+        if not self.pragmas:
+            return
+
+        @event.listens_for(engine, "connect")
+        def _apply_pragmas(dbapi_connection, _record) -> None:
+            cursor = dbapi_connection.cursor()
+            try:
+                for name, value in self.pragmas:
+                    cursor.execute(f"PRAGMA {name}={value}")
+            finally:
+                cursor.close()
+
+
+def _read_only_session(dbapi_connection, _record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY")
+    finally:
+        cursor.close()
+    # SET is transactional on PostgreSQL; commit so the pool's reset keeps it.
+    dbapi_connection.commit()
+
+
+PROFILES: dict[str, StorageProfile] = {
+    "default": StorageProfile(name="default"),
+    "throughput": StorageProfile(
+        name="throughput",
+        pragmas=(
+            ("journal_mode", "WAL"),
+            ("synchronous", "NORMAL"),
+            ("busy_timeout", "5000"),
+            ("cache_size", "-65536"),  # KiB, i.e. 64 MiB
+            ("mmap_size", str(256 * _MiB)),
+            ("temp_store", "MEMORY"),
+        ),
+        pool_size=16,
+        max_overflow=16,
+    ),
+    "durable": StorageProfile(
+        name="durable",
+        pragmas=(
+            ("journal_mode", "WAL"),
+            ("synchronous", "FULL"),
+            ("busy_timeout", "15000"),
+            ("cache_size", "-16384"),
+            ("mmap_size", str(64 * _MiB)),
+            ("temp_store", "DEFAULT"),
+        ),
+        pool_size=5,
+        max_overflow=10,
+    ),
+    "readonly-analytics": StorageProfile(
+        name="readonly-analytics",
+        pragmas=(
+            ("query_only", "ON"),
+            ("busy_timeout", "5000"),
+            ("cache_size", "-262144"),
+            ("mmap_size", str(1024 * _MiB)),
+            ("temp_store", "MEMORY"),
+        ),
+        read_only=True,
+        pool_size=16,
+        max_overflow=32,
+    ),
+}
+
+
+def storage_profile(name: str) -> StorageProfile:
+    try:
+        return PROFILES[name.strip().lower()]
+    except KeyError:
+        raise ValueError(
+            f"Unknown SW_DB_PROFILE {name!r}; expected one of: {', '.join(PROFILES)}"
+        ) from None
@@ -0,0 +1,81 @@
+"""
+Bounded LRU/TTL cache of gate evaluation results.
+
+Evaluation is deterministic in (request, state, anchors, matcher), so a
+repeated request can reuse the matching, explanations and decision of an
+earlier one. Callers put the persisted anchor-set generation
+(app.anchor_generation) in the key, so entries go stale on any anchor change
+made by any worker; invalidate() also drops local entries straight away.
+
+Off by default; enable with SW_DECISION_CACHE_SIZE (entries) and tune
+SW_DECISION_CACHE_TTL_S (seconds).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class DecisionCache:
+    def __init__(self, max_entries: int = 0, ttl_s: float = 60.0) -> None:
+        self.max_entries = max(0, max_entries)
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "DecisionCache":
+        return cls(
+            max_entries=int(os.getenv("SW_DECISION_CACHE_SIZE", "0")),
+            ttl_s=float(os.getenv("SW_DECISION_CACHE_TTL_S", "60")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+decision_cache = DecisionCache.from_env()
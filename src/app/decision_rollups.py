@@ -0,0 +1,97 @@
+"""
+Time-bucketed decision rollups (decision_rollups) behind /insight/timeseries.
+
+Every decision trace is counted in its minute, hour and day bucket (UTC),
+per tenant, profile, decision, reason and enforcement mode, together with
+how many of them would have blocked. roll_up() is called by write_records()
+in the transaction that writes the traces, so a chart never needs to touch
+decision_traces. Gate logs without a trace (reframes) are not decisions
+here.
+
+rebuild() recomputes the rollups by streaming decision_traces once
+(rebuild_counters.py runs it after the insight counters).
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.db import stream, upsert_add
+from app.models import DecisionRollup, DecisionTrace
+
+BUCKETS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+_KEYS = ["granularity", "tenant_id", "bucket_start", "profile_id", "decision", "reason", "enforcement_mode"]
+
+
+def bucket_start(at: datetime, granularity: str) -> datetime:
+    """Start of the bucket holding `at`, as naive UTC like the stored columns."""
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    if granularity == "minute":
+        return at.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _count(counts: dict, trace: dict) -> None:
+    created_at = trace.get("created_at") or datetime.now(timezone.utc)
+    key = (
+        trace.get("tenant_id") or 0,
+        trace.get("policy_profile_id") or 0,
+        trace["decision"],
+        trace.get("reason") or "",
+        trace.get("enforcement_mode_snapshot") or "hard",  # the column default
+    )
+    would_block = int(bool(trace.get("would_block")))
+    for granularity in BUCKETS:
+        c = counts[(granularity, bucket_start(created_at, granularity), *key)]
+        c[0] += 1
+        c[1] += would_block
+
+
+def _rows(counts: dict) -> list[dict]:
+    return [
+        {**dict(zip(_KEYS, (g, t, b, p, d, r, m))), "decisions": n, "would_block": wb}
+        for (g, b, t, p, d, r, m), (n, wb) in counts.items()
+    ]
+
+
+def roll_up(db: Session, records) -> None:
+    """Add the traces of TraceRecords being written to their buckets."""
+    counts: dict = defaultdict(lambda: [0, 0])
+    for r in records:
+        _count(counts, r.trace)
+    upsert_add(db, DecisionRollup.__table__, _KEYS, _rows(counts))
+
+
+def rebuild(db: Session) -> int:
+    """Recompute all rollups from decision_traces; returns rows written."""
+    counts: dict = defaultdict(lambda: [0, 0])
+    columns = (
+        DecisionTrace.created_at,
+        DecisionTrace.tenant_id,
+        DecisionTrace.policy_profile_id,
+        DecisionTrace.decision,
+        DecisionTrace.reason,
+        DecisionTrace.enforcement_mode_snapshot,
+        DecisionTrace.would_block,
+    )
+    for row in stream(db, select(*columns)):
+        _count(counts, row._asdict())
+
+    rows = _rows(counts)
+    db.execute(delete(DecisionRollup))
+    if rows:
+        db.execute(DecisionRollup.__table__.insert(), rows)
+    db.commit()
+    return len(rows)
@@ -0,0 +1,115 @@
+"""
+Dynamic micro-batching for request embeddings.
+
+Concurrent /gate/evaluate threads each need one request vector. Rather than
+each calling the model on a single string, callers enqueue their text and a
+single worker thread encodes whatever has queued up — waiting at most
+SW_EMBED_BATCH_WAIT_MS for company, capped at SW_EMBED_BATCH_MAX texts — in
+one encode() call, then hands each caller its own vector. A caller gives up
+after SW_EMBED_TIMEOUT_S (default 30) seconds with a TimeoutError.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List
+
+
+class EmbeddingBatcher:
+    def __init__(
+        self,
+        encode: Callable[[List[str]], object],
+        max_wait_ms: float = 2.0,
+        max_batch: int = 32,
+        timeout_s: float = 30.0,
+    ) -> None:
+        self._encode = encode
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.timeout_s = timeout_s
+        self._queue: "queue.Queue[tuple[str, Future, float]]" = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._max_batch_seen = 0
+        self._wait_total_s = 0.0
+        self._wait_max_s = 0.0
+
+    def encode_one(self, text: str):
+        self._ensure_worker()
+        fut: Future = Future()
+        self._queue.put((text, fut, time.perf_counter()))
+        return fut.result(timeout=self.timeout_s)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "max_batch_size": self._max_batch_seen,
+                "mean_queue_wait_ms": round(self._wait_total_s / self._items * 1000, 3) if self._items else 0.0,
+                "max_queue_wait_ms": round(self._wait_max_s * 1000, 3),
+                "queue_depth": self._queue.qsize(),
+                "max_wait_ms": self.max_wait_s * 1000,
+                "max_batch": self.max_batch,
+            }
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="sw-embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait_s
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch: list) -> None:
+        started = time.perf_counter()
+        waits = [started - enqueued for _text, _fut, enqueued in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._max_batch_seen = max(self._max_batch_seen, len(batch))
+            self._wait_total_s += sum(waits)
+            self._wait_max_s = max(self._wait_max_s, max(waits))
+
+        try:
+            vectors = self._encode([text for text, _fut, _t in batch])
+            if len(vectors) != len(batch):
+                raise RuntimeError(f"encoder returned {len(vectors)} vectors for {len(batch)} texts")
+        except BaseException as e:  # hand the failure to every waiting caller
+            for _text, fut, _t in batch:
+                fut.set_exception(e)
+            return
+        for (_text, fut, _t), vec in zip(batch, vectors):
+            fut.set_result(vec)
+
+
+def batcher_from_env(encode: Callable[[List[str]], object]) -> EmbeddingBatcher:
+    return EmbeddingBatcher(
+        encode,
+        max_wait_ms=float(os.getenv("SW_EMBED_BATCH_WAIT_MS", "2")),
+        max_batch=int(os.getenv("SW_EMBED_BATCH_MAX", "32")),
+        timeout_s=float(os.getenv("SW_EMBED_TIMEOUT_S", "30")),
+    )
@@ -1,64 +1,494 @@
-from typing import List, Tuple
+import logging
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 # Lazy imports — only loaded when SW_MATCHER=embedding is active.
 # sentence_transformers requires PyTorch and is optional; naive matching is the default.
 _model = None
 _np = None
-_cosine_similarity = None
 
 MODEL_NAME = "all-MiniLM-L6-v2"
 
+logger = logging.getLogger(__name__)
+
+
+def _load_numpy():
+    global _np
+    if _np is None:
+        import numpy as np
+        _np = np
+    return _np
+
 
 def _load_model():
-    global _model, _np, _cosine_similarity
+    global _model
     if _model is not None:
         return
     try:
-        import numpy as np
+        _load_numpy()
         from sentence_transformers import SentenceTransformer
-        from sklearn.metrics.pairwise import cosine_similarity as _cs
-        _np = np
-        _cosine_similarity = _cs
         _model = SentenceTransformer(MODEL_NAME)
     except ImportError as e:
         raise ImportError(
-            "SW_MATCHER=embedding requires sentence-transformers and scikit-learn. "
-            "Install them or switch back to SW_MATCHER=naive (the default)."
+            "SW_MATCHER=embedding requires sentence-transformers. "
+            "Install it or switch back to SW_MATCHER=naive (the default)."
         ) from e
 
 
+def embedding_enabled() -> bool:
+    """True when the configured matcher scores anchor embeddings (embedding or cascade)."""
+    return os.getenv("SW_MATCHER", "naive").lower() in ("embedding", "cascade")
+
+
 def compute_embeddings(texts: List[str]):
     _load_model()
     # normalize_embeddings=True makes cosine similarity stable and fast
     return _model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
 
 
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def request_batcher():
+    """Process-wide micro-batcher for request vectors (see app.embedding_batcher)."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                from app.embedding_batcher import batcher_from_env
+                # Late-bound so the encoder can be swapped (tests, model reload).
+                _batcher = batcher_from_env(lambda texts: compute_embeddings(texts))
+    return _batcher
+
+
+def encode_request(text: str):
+    return request_batcher().encode_one(text)
+
+
+def batcher_stats() -> dict:
+    """Batch-size / queue-wait counters; empty until the first embedding request."""
+    return _batcher.stats() if _batcher is not None else {}
+
+
+def _default_store_path() -> Path:
+    # Imported here so the matcher stays usable without the app's DB settings.
+    from app.db import DB_PATH
+    return DB_PATH.with_name(DB_PATH.stem + ".embeddings.npz")
+
+
+# Append-log records: an op byte and the key length, then the key; an add
+# is followed by the vector's dimension and float32 values.
+_LOG_RECORD = struct.Struct("<cH")
+_LOG_DIM = struct.Struct("<I")
+_ADD = b"A"
+_DISCARD = b"D"
+
+
+def _log_header() -> bytes:
+    return f"SWEMBLOG1 {MODEL_NAME}\n".encode("ascii")
+
+
+def _read_log(data: bytes):
+    """(ops, end) for an append log: (op, key, vector | None) up to the last whole record."""
+    np = _load_numpy()
+    pos = len(_log_header())
+    ops = []
+    while pos + _LOG_RECORD.size <= len(data):
+        op, key_len = _LOG_RECORD.unpack_from(data, pos)
+        p = pos + _LOG_RECORD.size + key_len
+        if p > len(data) or op not in (_ADD, _DISCARD):
+            break
+        key = data[pos + _LOG_RECORD.size:p].decode("ascii")
+        vec = None
+        if op == _ADD:
+            if p + _LOG_DIM.size > len(data):
+                break
+            (dim,) = _LOG_DIM.unpack_from(data, p)
+            p += _LOG_DIM.size
+            if p + 4 * dim > len(data):
+                break
+            vec = np.frombuffer(data, dtype=np.float32, count=dim, offset=p)
+            p += 4 * dim
+        ops.append((op, key, vec))
+        pos = p
+    return ops, pos
+
+
+def _log_record(op: bytes, key: str, vec=None) -> bytes:
+    raw = key.encode("ascii")
+    out = _LOG_RECORD.pack(op, len(raw)) + raw
+    if vec is not None:
+        out += _LOG_DIM.pack(len(vec)) + vec.astype("<f4", copy=False).tobytes()
+    return out
+
+
+class AnchorEmbeddingStore:
+    """
+    Anchor embeddings keyed by TruthAnchor.stable_hash().
+
+    Vectors live in one contiguous, L2-normalised float32 matrix so a request
+    is scored with a single matrix-vector product. Statements are encoded once
+    (on anchor create, or on first sight) and persisted next to the SQLite DB
+    so restarts don't re-encode the policy set: an .npz snapshot plus an
+    append log (.npz.log) of the rows added and discarded since. Once the log
+    holds SW_EMBEDDING_CHECKPOINT_ROWS records (default 4096) or a quarter of
+    the live rows, whichever is more, a background thread folds it into a new
+    snapshot. The matrix grows by doubling, so adding an anchor copies
+    neither the matrix nor the file. The files are a cache: a row lost to a
+    crash is encoded again on first sight.
+
+    With SW_EMBEDDING_INDEX=ivf and enough anchors, an IVF index (app.ann_index)
+    is kept alongside the matrix and updated as rows are added; discarded rows
+    stay in the matrix as tombstones until they outnumber live rows, at which
+    point the matrix is compacted and the index retrained.
+
+    With persist=False the store is private and in-memory: it reads no files,
+    writes none, and starts empty (counterfactual replays seed it with
+    vectors() from the shared store and put()).
+    """
+
+    def __init__(self, path: Optional[Path] = None, *, persist: bool = True) -> None:
+        self._path = path
+        self._persist = persist
+        self._lock = threading.Lock()
+        self._loaded = False
+        # (matrix, keys, row_by_key, ann) swapped as one tuple so readers always
+        # see rows that line up with the matrix they score against. keys holds
+        # None for tombstoned rows.
+        self._state: Tuple[object, List[Optional[str]], Dict[str, int], object] = (None, [], {}, None)
+        # matrix is a view of the first len(keys) rows of _buf; rows past it are
+        # free capacity that readers never index.
+        self._buf = None
+        self._log_ready = False
+        self._log_records = 0
+        self._checkpointing = False
+        self._checkpoint_lock = threading.Lock()
+        self.checkpoint_rows = int(os.getenv("SW_EMBEDDING_CHECKPOINT_ROWS", "4096"))
+
+    @property
+    def path(self) -> Path:
+        if self._path is None:
+            self._path = _default_store_path()
+        return self._path
+
+    @property
+    def log_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".log")
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._state[2])
+
+    def lookup(self, anchors: List, index=None):
+        """Return (matrix, rows, ann) for `anchors`, encoding any statement not seen before."""
+        from app.anchor_index import anchor_index
+
+        if index is None:
+            index = anchor_index
+        self._ensure_loaded()
+        keys = [index.key_for(a) for a in anchors]
+
+        row_by_key = self._state[2]
+        missing: Dict[str, str] = {}
+        for a, key in zip(anchors, keys):
+            if key not in row_by_key:
+                missing.setdefault(key, a.statement)
+        if missing:
+            self._add(list(missing.keys()), list(missing.values()))
+
+        matrix, _keys, row_by_key, ann = self._state
+        rows = [row_by_key.get(k) for k in keys]
+        if None in rows:
+            # A concurrent discard() dropped one of our keys; encode it again.
+            return self.lookup(anchors, index)
+        return matrix, rows, ann
+
+    def add(self, anchor) -> None:
+        self.lookup([anchor])
+
+    def vectors(self, keys: List[str]):
+        """(keys held, their rows) for those of `keys` already in the store; encodes nothing."""
+        self._ensure_loaded()
+        matrix, _keys, row_by_key, _ann = self._state
+        held = [k for k in dict.fromkeys(keys) if k in row_by_key]
+        return held, (matrix[[row_by_key[k] for k in held]] if held else None)
+
+    def put(self, keys: List[str], vectors) -> None:
+        """Add rows encoded elsewhere (see vectors())."""
+        if keys:
+            self._ensure_loaded()
+            self._add(keys, None, vectors)
+
+    def discard(self, key: str) -> None:
+        self._ensure_loaded()
+        with self._lock:
+            matrix, keys, row_by_key, ann = self._state
+            row = row_by_key.get(key)
+            if row is None:
+                return
+            keys = list(keys)
+            keys[row] = None
+            row_by_key = dict(row_by_key)
+            del row_by_key[key]
+            self._state = (matrix, keys, row_by_key, ann)
+            if len(keys) >= 2 * max(len(row_by_key), 1):
+                self._compact()
+            self._append_log([_log_record(_DISCARD, key)])
+
+    def checkpoint(self) -> None:
+        """Write the current rows as the .npz snapshot and drop the log records it covers."""
+        if not self._persist:
+            return
+        with self._checkpoint_lock:
+            self._checkpoint()
+
+    def _checkpoint(self) -> None:
+        with self._lock:
+            state, logged, offset = self._state, self._log_records, self._log_size()
+        self._write_snapshot(state)
+        with self._lock:
+            tail = b""
+            if self._log_ready:
+                with open(self.log_path, "rb") as fh:
+                    fh.seek(offset)
+                    tail = fh.read()
+            tmp = self.log_path.with_name(self.log_path.name + ".tmp")
+            with open(tmp, "wb") as fh:
+                fh.write(_log_header() + tail)
+            # Snapshot first: replaying a log over a newer snapshot gives the same rows.
+            os.replace(self.path.with_name(self.path.name + ".tmp"), self.path)
+            os.replace(tmp, self.log_path)
+            self._log_ready = True
+            self._log_records -= logged
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            np = _load_numpy()
+            keys: List[Optional[str]] = []
+            blocks = []
+            if self._persist and self.path.exists():
+                with np.load(self.path, allow_pickle=False) as data:
+                    if str(data["model"]) == MODEL_NAME and len(data["keys"]):
+                        blocks.append(np.asarray(data["matrix"], dtype=np.float32))
+                        keys = [str(k) for k in data["keys"]]
+            row_by_key = {k: i for i, k in enumerate(keys)}
+
+            if self._persist and self.log_path.exists():
+                data = self.log_path.read_bytes()
+                if data.startswith(_log_header()):
+                    ops, end = _read_log(data)
+                    if end < len(data):  # a torn last record from a crash mid-append
+                        with open(self.log_path, "r+b") as fh:
+                            fh.truncate(end)
+                    for op, key, vec in ops:
+                        row = row_by_key.pop(key, None)
+                        if row is not None:
+                            keys[row] = None
+                        if op == _ADD:
+                            row_by_key[key] = len(keys)
+                            keys.append(key)
+                            blocks.append(vec[None, :])
+                    self._log_ready = True
+                    self._log_records = len(ops)
+
+            if row_by_key:
+                matrix = np.ascontiguousarray(np.vstack(blocks), dtype=np.float32)
+                self._buf = matrix
+                self._state = (matrix, keys, row_by_key, None)
+                if len(keys) >= 2 * len(row_by_key):
+                    self._compact()
+                else:
+                    self._retrain_ann()
+            self._loaded = True
+
+    def _add(self, keys: List[str], statements: Optional[List[str]], vecs=None) -> None:
+        np = _load_numpy()
+        if vecs is None:
+            vecs = compute_embeddings(statements)
+        vecs = np.asarray(vecs, dtype=np.float32)
+        with self._lock:
+            matrix, all_keys, row_by_key, ann = self._state
+            fresh = [i for i, k in enumerate(keys) if k not in row_by_key]
+            if not fresh:
+                return
+            block = vecs[fresh]
+            start = len(all_keys)
+            matrix = self._grow(block, start)
+            all_keys = all_keys + [keys[i] for i in fresh]
+            row_by_key = dict(row_by_key)
+            for offset, i in enumerate(fresh):
+                row_by_key[keys[i]] = start + offset
+
+            if ann is not None and len(row_by_key) <= 2 * ann.trained_size:
+                ann = ann.add(np.arange(start, len(all_keys)), block)
+                self._state = (matrix, all_keys, row_by_key, ann)
+            else:
+                self._state = (matrix, all_keys, row_by_key, ann)
+                self._retrain_ann()
+            self._append_log([_log_record(_ADD, keys[i], vecs[i]) for i in fresh])
+
+    def _grow(self, block, start: int):
+        """The matrix with `block` appended at row `start`, reusing spare capacity."""
+        np = _load_numpy()
+        end = start + len(block)
+        if self._buf is None or end > len(self._buf) or self._buf.shape[1] != block.shape[1]:
+            buf = np.empty((max(end, 2 * start, 64), block.shape[1]), dtype=np.float32)
+            if start:
+                buf[:start] = self._state[0][:start]
+            self._buf = buf
+        self._buf[start:end] = block
+        return self._buf[:end]
+
+    def _compact(self) -> None:
+        np = _load_numpy()
+        matrix, keys, row_by_key, _ann = self._state
+        live = [i for i, k in enumerate(keys) if k is not None]
+        if not live:
+            self._buf = None
+            self._state = (None, [], {}, None)
+            return
+        keys = [keys[i] for i in live]
+        self._buf = np.ascontiguousarray(matrix[live])
+        self._state = (self._buf, keys, {k: i for i, k in enumerate(keys)}, None)
+        self._retrain_ann()
+
+    def _retrain_ann(self) -> None:
+        matrix, keys, row_by_key, _ann = self._state
+        ann = None
+        from app.ann_index import AnnSettings
+
+        settings = AnnSettings.from_env()
+        if settings.enabled and len(row_by_key) >= settings.min_anchors:
+            np = _load_numpy()
+            from app.ann_index import IVFIndex
+
+            rows = np.fromiter(sorted(row_by_key.values()), dtype=np.int64)
+            ann = IVFIndex.train(matrix, rows, settings.nlist, settings.nprobe)
+        self._state = (matrix, keys, row_by_key, ann)
+
+    def _log_size(self) -> int:
+        return self.log_path.stat().st_size if self._log_ready else 0
+
+    def _append_log(self, records: List[bytes]) -> None:
+        """Persist records (caller holds the lock), scheduling a checkpoint once the log is long."""
+        if not self._persist:
+            return
+        if not self._log_ready:
+            # Missing, or written for another model: start over.
+            with open(self.log_path, "wb") as fh:
+                fh.write(_log_header())
+            self._log_ready = True
+            self._log_records = 0
+        with open(self.log_path, "ab") as fh:
+            fh.write(b"".join(records))
+        self._log_records += len(records)
+        if not self._checkpointing and self._log_records >= max(self.checkpoint_rows, len(self._state[2]) // 4):
+            self._checkpointing = True
+            threading.Thread(target=self._background_checkpoint, name="sw-embedding-checkpoint", daemon=True).start()
+
+    def _background_checkpoint(self) -> None:
+        try:
+            self.checkpoint()
+        except Exception:
+            logger.exception("embedding store checkpoint failed")
+        finally:
+            self._checkpointing = False
+
+    def _write_snapshot(self, state) -> None:
+        np = _load_numpy()
+        matrix, keys, _row_by_key, _ann = state
+        live = [i for i, k in enumerate(keys) if k is not None]
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as fh:
+            np.savez(
+                fh,
+                model=np.array(MODEL_NAME),
+                keys=np.array([keys[i] for i in live], dtype=str),
+                matrix=matrix[live] if live else np.zeros((0, 0), dtype=np.float32),
+            )
+
+
+embedding_store = AnchorEmbeddingStore()
+
+
+def store_anchor(anchor) -> None:
+    """Encode a new anchor ahead of its first request, if the matcher uses embeddings."""
+    if embedding_enabled():
+        with _tolerate_missing_backend():
+            embedding_store.add(anchor)
+
+
+def forget_anchor(key: str) -> None:
+    """Drop an archived anchor's vector (by its stable_hash()), if the matcher uses embeddings."""
+    if embedding_enabled():
+        with _tolerate_missing_backend():
+            embedding_store.discard(key)
+
+
+@contextmanager
+def _tolerate_missing_backend():
+    # The cascade matcher falls back to naive matching without the model, so
+    # anchor writes must not fail on it either; SW_MATCHER=embedding can't.
+    try:
+        yield
+    except ImportError:
+        if os.getenv("SW_MATCHER", "naive").lower() != "cascade":
+            raise
+
+
+def _ann_worthwhile(subset: int, stored: int) -> bool:
+    """The IVF index for all stored anchors, or subsets too big to score exactly."""
+    from app.ann_index import AnnSettings
+
+    return subset >= stored or subset >= AnnSettings.from_env().min_anchors
+
+
 def find_conflicts_embedding(
     request_summary: str,
     anchors: List,
     threshold: float = 0.60,
+    index=None,
+    store: Optional[AnchorEmbeddingStore] = None,
 ) -> List[Tuple[object, float]]:
     """
     Returns list of (anchor, similarity_score) above threshold, sorted by score desc.
-    `anchors` are TruthAnchor ORM objects (must have .statement).
+    `anchors` are TruthAnchor ORM objects (must have .statement); `index` is the
+    AnchorIndex that keys them (default: the shared anchor_index) and `store`
+    the AnchorEmbeddingStore holding their vectors (default: embedding_store).
     """
     if not anchors:
         return []
+    if store is None:
+        store = embedding_store
 
-    anchor_texts = [a.statement for a in anchors]
-    texts = [request_summary] + anchor_texts
-
-    embeddings = compute_embeddings(texts)
-
-    request_vec = embeddings[0].reshape(1, -1)  # type: ignore[union-attr]
-    anchor_vecs = embeddings[1:]
-
-    sims = _cosine_similarity(request_vec, anchor_vecs)[0]
+    matrix, rows, ann = store.lookup(anchors, index)
+    request_vec = encode_request(request_summary)
 
     out: List[Tuple[object, float]] = []
-    for anchor, score in zip(anchors, sims):
-        if float(score) >= threshold:
-            out.append((anchor, float(score)))
+    if ann is None or not _ann_worthwhile(len(rows), len(store)):
+        # Score just the caller's rows: a cascade candidate set is a few hundred
+        # of possibly 500k anchors, and scoring it exactly keeps full recall.
+        sims = matrix[rows] @ request_vec
+        for anchor, score in zip(anchors, sims):
+            if float(score) >= threshold:
+                out.append((anchor, float(score)))
+    else:
+        # Approximate candidate set, exact scores: only probed rows are scored.
+        hit_rows, hit_scores = ann.search(matrix, request_vec, threshold)
+        score_by_row = dict(zip(hit_rows.tolist(), hit_scores.tolist()))
+        for anchor, row in zip(anchors, rows):
+            score = score_by_row.get(row)
+            if score is not None:
+                out.append((anchor, float(score)))
 
     out.sort(key=lambda x: x[1], reverse=True)
-    return out
\ No newline at end of file
+    return out
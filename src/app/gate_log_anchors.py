@@ -0,0 +1,101 @@
+"""
+Gate log to anchor links (gate_log_anchors).
+
+Every gate log's conflicted anchors are written as gate_log_anchors rows in
+the same transaction as the log, so insight queries can GROUP BY anchor in
+SQL. GateLog.conflicted_anchor_ids is still filled for older readers, but
+only with as many whole IDs as fit its String(256).
+
+Logs written before the table existed are linked by backfill(), which
+migrate.py runs: it walks gate_logs in ID order, SW_BACKFILL_CHUNK logs
+(default 1000) per transaction, so it can run while the app is serving and
+resumes where it left off. Until a log is backfilled, anchor_ids_by_log()
+falls back to its comma-joined column.
+"""
+
+from __future__ import annotations
+
+import os
+
+from sqlalchemy import exists, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import GateLog, GateLogAnchor, TruthAnchor
+from app.schemas import parse_id_list
+
+BACKFILL_CHUNK = int(os.getenv("SW_BACKFILL_CHUNK", "1000"))
+
+_LEGACY_MAX = GateLog.__table__.c.conflicted_anchor_ids.type.length
+
+
+def legacy_id_list(ids) -> str:
+    """conflicted_anchor_ids for a log: the IDs comma-joined, cut at a whole ID to fit."""
+    out = ""
+    for i in ids:
+        part = str(i) if not out else f",{i}"
+        if len(out) + len(part) > _LEGACY_MAX:
+            break
+        out += part
+    return out
+
+
+def link_rows(anchors) -> list[dict]:
+    """gate_log_anchors values (without log_id) for conflicted anchors with id and level."""
+    seen: set[int] = set()
+    rows = []
+    for a in anchors:
+        if a.id not in seen:
+            seen.add(a.id)
+            rows.append({"anchor_id": a.id, "level": a.level})
+    return rows
+
+
+def anchor_ids_by_log(db: Session, logs: list[GateLog]) -> dict[int, list[int]]:
+    """Conflicted anchor IDs per log, from gate_log_anchors (or the legacy column if not backfilled)."""
+    found: dict[int, list[int]] = {}
+    if logs:
+        rows = db.execute(
+            select(GateLogAnchor.log_id, GateLogAnchor.anchor_id)
+            .where(GateLogAnchor.log_id.in_([log.id for log in logs]))
+            .order_by(GateLogAnchor.log_id, GateLogAnchor.anchor_id)
+        )
+        for log_id, anchor_id in rows:
+            found.setdefault(log_id, []).append(anchor_id)
+    return {log.id: found.get(log.id) or parse_id_list(log.conflicted_anchor_ids) for log in logs}
+
+
+def backfill(db: Session, chunk_size: int = BACKFILL_CHUNK) -> int:
+    """
+    Link logs that have conflicted_anchor_ids but no gate_log_anchors rows,
+    committing after each chunk. Returns the number of rows inserted.
+    """
+    inserted = 0
+    last_id = 0
+    while True:
+        logs = db.execute(
+            select(GateLog.id, GateLog.conflicted_anchor_ids)
+            .where(
+                GateLog.id > last_id,
+                GateLog.conflicted_anchor_ids != "",
+                ~exists().where(GateLogAnchor.log_id == GateLog.id),
+            )
+            .order_by(GateLog.id)
+            .limit(chunk_size)
+        ).all()
+        if not logs:
+            db.commit()
+            return inserted
+        last_id = logs[-1].id
+
+        ids_by_log = {log.id: list(dict.fromkeys(parse_id_list(log.conflicted_anchor_ids))) for log in logs}
+        wanted = {i for ids in ids_by_log.values() for i in ids}
+        levels = dict(db.execute(select(TruthAnchor.id, TruthAnchor.level).where(TruthAnchor.id.in_(wanted))).all())
+        rows = [
+            {"log_id": log_id, "anchor_id": anchor_id, "level": levels.get(anchor_id)}
+            for log_id, ids in ids_by_log.items()
+            for anchor_id in ids
+        ]
+        if rows:
+            db.execute(insert(GateLogAnchor.__table__), rows)
+            inserted += len(rows)
+        db.commit()
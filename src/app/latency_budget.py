@@ -0,0 +1,59 @@
+"""
+Rolling latency percentiles against a budget, for the /gate/check fast path.
+
+record() keeps the last `window` durations; stats() reports p50/p99 over
+them and how many requests ever went over the budget. Exposed on
+/health/check. Tune with SW_CHECK_BUDGET_MS (default 25) and
+SW_CHECK_WINDOW (default 2048 samples).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import deque
+
+
+class LatencyBudget:
+    def __init__(self, budget_ms: float = 25.0, window: int = 2048) -> None:
+        self.budget_ms = budget_ms
+        self._lock = threading.Lock()
+        self._samples: deque[float] = deque(maxlen=max(1, window))
+        self.count = 0
+        self.over_budget = 0
+
+    @classmethod
+    def from_env(cls) -> "LatencyBudget":
+        return cls(
+            budget_ms=float(os.getenv("SW_CHECK_BUDGET_MS", "25")),
+            window=int(os.getenv("SW_CHECK_WINDOW", "2048")),
+        )
+
+    def record(self, elapsed_ms: float) -> bool:
+        """Add a sample; returns False when it was over budget."""
+        within = elapsed_ms <= self.budget_ms
+        with self._lock:
+            self._samples.append(elapsed_ms)
+            self.count += 1
+            self.over_budget += int(not within)
+        return within
+
+    def percentile(self, q: float) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+    def stats(self) -> dict:
+        return {
+            "budget_ms": self.budget_ms,
+            "count": self.count,
+            "over_budget": self.over_budget,
+            "p50_ms": round(self.percentile(0.50), 3),
+            "p99_ms": round(self.percentile(0.99), 3),
+            "p99_within_budget": self.percentile(0.99) <= self.budget_ms,
+        }
+
+
+check_budget = LatencyBudget.from_env()
@@ -5,17 +5,22 @@ from fastapi.responses import HTMLResponse
 from app.routers.ethos import router as ethos_router
 from app.api.profiles import router as profiles_router
 from app.api.reports import router as reports_router
+from app.api.insight import router as insight_router
 
-from app.db import engine
+from app.db import DB_PROFILE, engine
 from app.models import Base
-from app.api.anchors import router as anchors_router
 from app.api.tenants import router as tenants_router
-from app.api.gate import router as gate_router
+from app.api.gate_stream import router as gate_stream_router
+from app.db_async import async_db_enabled, dispose_async_engine
+from app.embedding_matcher import batcher_stats
+from app.latency_budget import check_budget
+from app.trace_writer import writer_stats
 
 app = FastAPI(title="SignalWeaver MVP")
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Create tables (read-only workers rely on a writer having done it)
+if not DB_PROFILE.read_only:
+    Base.metadata.create_all(bind=engine)
 
 
 @app.get("/health")
@@ -23,6 +28,21 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/health/embedding")
+def embedding_health():
+    return {"batcher": batcher_stats()}
+
+
+@app.get("/health/check")
+def check_health():
+    return {"check": check_budget.stats()}
+
+
+@app.get("/health/trace-writer")
+def trace_writer_health():
+    return {"writer": writer_stats()}
+
+
 @app.get("/")
 def root():
     return {
@@ -39,9 +59,22 @@ def tester():
     return html_path.read_text(encoding="utf-8")
 
 
+# SW_DB_ASYNC=1 serves the anchor and gate routes from AsyncSession-based
+# handlers; the sync ones stay the default (and are what the tests exercise).
+if async_db_enabled():
+    from app.api.anchors_async import router as anchors_router
+    from app.api.gate_async import router as gate_router
+
+    app.add_event_handler("shutdown", dispose_async_engine)
+else:
+    from app.api.anchors import router as anchors_router
+    from app.api.gate import router as gate_router
+
 app.include_router(tenants_router, prefix="/tenants", tags=["tenants"])
 app.include_router(anchors_router, prefix="/anchors", tags=["anchors"])
 app.include_router(gate_router, prefix="/gate", tags=["gate"])
+app.include_router(gate_stream_router, prefix="/gate", tags=["gate"])
 app.include_router(profiles_router, prefix="/profiles", tags=["profiles"])
 app.include_router(reports_router, prefix="/reports", tags=["reports"])
+app.include_router(insight_router, prefix="/insight", tags=["insight"])
 app.include_router(ethos_router, tags=["ethos"])
\ No newline at end of file
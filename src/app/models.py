@@ -6,16 +6,36 @@ from sqlalchemy import (
     String,
     Boolean,
     DateTime,
+    Float,
     Text,
     ForeignKey,
     UniqueConstraint,
+    Index,
 )
+from sqlalchemy.types import TypeDecorator
 
 
 class Base(DeclarativeBase):
     pass
 
 
+class UTCDateTime(TypeDecorator):
+    """
+    Naive-UTC DateTime. Aware values (the column defaults use
+    datetime.now(timezone.utc)) are converted to UTC and stripped on the way
+    in, rather than left to the driver: asyncpg rejects them and psycopg2
+    would shift them by the server's time zone.
+    """
+
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
 # ============================================================
 # Tenants (auth + isolation)
 # ============================================================
@@ -27,9 +47,11 @@ class Tenant(Base):
     name: Mapped[str] = mapped_column(String(128), unique=True, index=True)
     api_key_hash: Mapped[str] = mapped_column(String(64), unique=True, index=True)
     active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # Share of low-risk proceeds fully traced (app.trace_policy); NULL = SW_TRACE_PROCEED_SAMPLE_RATE
+    trace_proceed_sample_rate: Mapped[float | None] = mapped_column(Float, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(
-        DateTime,
+        UTCDateTime,
         default=lambda: datetime.now(timezone.utc),
     )
 
@@ -54,7 +76,7 @@ class TruthAnchor(Base):
     )
 
     created_at: Mapped[datetime] = mapped_column(
-        DateTime,
+        UTCDateTime,
         default=lambda: datetime.now(timezone.utc),
     )
 
@@ -73,6 +95,28 @@ class TruthAnchor(Base):
         return hashlib.sha256(payload).hexdigest()
 
 
+class AnchorSetGeneration(Base):
+    """
+    Monotonic version of a tenant's anchor set, bumped in the same
+    transaction as any change to it. tenant_id 0 versions the shared
+    anchors (TruthAnchor.tenant_id NULL) that every tenant sees.
+    """
+
+    __tablename__ = "anchor_set_generations"
+
+    tenant_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    generation: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class IdAllocation(Base):
+    """Next unreserved ID per table, for writers that reserve IDs in blocks."""
+
+    __tablename__ = "id_allocations"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    next_id: Mapped[int] = mapped_column(Integer)
+
+
 # ============================================================
 # Gate Logs
 # ============================================================
@@ -83,7 +127,7 @@ class GateLog(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
     created_at: Mapped[datetime] = mapped_column(
-        DateTime,
+        UTCDateTime,
         default=lambda: datetime.now(timezone.utc),
     )
 
@@ -98,9 +142,84 @@ class GateLog(Base):
     decision: Mapped[str] = mapped_column(String(16))  # proceed/gate/refuse
     reason: Mapped[str] = mapped_column(String(64), default="")
 
+    # Evaluating tenant; NULL on logs written before it was recorded
+    tenant_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    # Legacy comma-joined list, cut to fit; gate_log_anchors holds every ID
     conflicted_anchor_ids: Mapped[str] = mapped_column(String(256), default="")
     user_choice: Mapped[str] = mapped_column(String(16), default="")
 
+    anchors: Mapped[list["GateLogAnchor"]] = relationship(
+        back_populates="log",
+        cascade="all, delete-orphan",
+        order_by="GateLogAnchor.anchor_id",
+    )
+
+
+class GateLogAnchor(Base):
+    """
+    One conflicted anchor of a gate log, written with the log. anchor_id has
+    no foreign key: like the log itself, it outlives the anchor. level is
+    the anchor's level at decision time (its level at backfill time for
+    rows backfilled from conflicted_anchor_ids; NULL if it was gone by then).
+    """
+
+    __tablename__ = "gate_log_anchors"
+
+    log_id: Mapped[int] = mapped_column(
+        ForeignKey("gate_logs.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    anchor_id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    level: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    log: Mapped["GateLog"] = relationship(back_populates="anchors")
+
+
+class AnchorCounter(Base):
+    """
+    Running insight totals per (tenant, anchor, decision), kept by
+    app.anchor_counters in the same transaction as the gate logs and traces
+    they count. anchor_id 0 holds the tenant's totals over all logs; traces
+    are only counted there. tenant_id 0 is logs with no recorded tenant.
+    """
+
+    __tablename__ = "anchor_counters"
+
+    tenant_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    anchor_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    decision: Mapped[str] = mapped_column(String(16), primary_key=True)
+
+    logs: Mapped[int] = mapped_column(Integer, default=0)
+    traces: Mapped[int] = mapped_column(Integer, default=0)
+    overrides: Mapped[int] = mapped_column(Integer, default=0)  # reason proceed_acknowledged
+    last_hit_at: Mapped[datetime | None] = mapped_column(UTCDateTime, nullable=True)
+
+
+class DecisionRollup(Base):
+    """
+    Decision traces counted per time bucket (minute, hour or day, by UTC
+    start) and per tenant, profile, decision, reason and enforcement mode;
+    kept by app.decision_rollups. tenant_id/profile_id 0 mean none recorded.
+    """
+
+    __tablename__ = "decision_rollups"
+
+    granularity: Mapped[str] = mapped_column(String(8), primary_key=True)
+    tenant_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    bucket_start: Mapped[datetime] = mapped_column(UTCDateTime, primary_key=True)
+    profile_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    decision: Mapped[str] = mapped_column(String(16), primary_key=True)
+    reason: Mapped[str] = mapped_column(String(64), primary_key=True)
+    enforcement_mode: Mapped[str] = mapped_column(String(16), primary_key=True)
+
+    decisions: Mapped[int] = mapped_column(Integer, default=0)
+    would_block: Mapped[int] = mapped_column(Integer, default=0)
+
+    __table_args__ = (
+        Index("ix_decision_rollups_bucket", "granularity", "bucket_start"),
+    )
+
 
 # ============================================================
 # Policy Profiles
@@ -125,9 +244,11 @@ class PolicyProfile(Base):
     enforcement_mode: Mapped[str] = mapped_column(
         String(16), default="hard", server_default="hard"
     )
+    # Overrides the tenant's trace_proceed_sample_rate for requests using this profile
+    trace_proceed_sample_rate: Mapped[float | None] = mapped_column(Float, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(
-        DateTime,
+        UTCDateTime,
         default=lambda: datetime.now(timezone.utc),
     )
 
@@ -178,6 +299,38 @@ class PolicyProfileAnchor(Base):
     )
 
 
+# ============================================================
+# Anchor versions + manifests (content-addressed trace snapshots)
+# ============================================================
+
+class AnchorVersion(Base):
+    """One anchor state, keyed by TruthAnchor.stable_hash(); written once."""
+
+    __tablename__ = "anchor_versions"
+
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    level: Mapped[int] = mapped_column(Integer)
+    scope: Mapped[str] = mapped_column(String(64))
+    active: Mapped[bool] = mapped_column(Boolean)
+    statement: Mapped[str] = mapped_column(Text)
+
+
+class AnchorManifest(Base):
+    """
+    An ordered anchor set: entries_json is [[anchor_id, version_hash], ...]
+    in anchor_id order, and hash is computed over that list.
+    """
+
+    __tablename__ = "anchor_manifests"
+
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    entries_json: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(
+        UTCDateTime,
+        default=lambda: datetime.now(timezone.utc),
+    )
+
+
 # ============================================================
 # Decision Trace + Replay
 # ============================================================
@@ -187,7 +340,7 @@ class DecisionTrace(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime,
+        UTCDateTime,
         default=lambda: datetime.now(timezone.utc),
     )
 
@@ -208,6 +361,16 @@ class DecisionTrace(Base):
     explanation: Mapped[str] = mapped_column(Text, default="")
 
     match_debug_json: Mapped[str] = mapped_column(Text, default="")
+    anchor_generation: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Evaluating tenant; NULL on traces written before it was recorded
+    tenant_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Anchor set evaluated against; trace anchor rows then hold matched anchors only.
+    # NULL on traces written before manifests, whose rows snapshot every anchor.
+    manifest_hash: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
+    # app.trace_policy: "full" | "sampled" (anchor rows kept, stands for
+    # 1/trace_sample_rate traces) | "compact" (no anchor rows, abridged match_debug)
+    trace_tier: Mapped[str] = mapped_column(String(16), default="full", server_default="full")
+    trace_sample_rate: Mapped[float] = mapped_column(Float, default=1.0, server_default="1")
 
     # Governance Spectrum audit fields
     would_block: Mapped[bool] = mapped_column(Boolean, default=False)
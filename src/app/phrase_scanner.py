@@ -0,0 +1,67 @@
+"""
+Single-pass multi-phrase scanner (Aho-Corasick).
+
+Compiles a fixed phrase set once into a deterministic automaton so that
+finding every phrase contained in a request is one linear pass over the
+text, however many phrases are registered.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Iterable
+
+
+class PhraseScanner:
+    """
+    scan(text) returns exactly {p for p in phrases if p in text}.
+
+    Matching is plain substring containment, same as the `in` checks it
+    replaces; callers normalise the text first.
+    """
+
+    def __init__(self, phrases: Iterable[str]) -> None:
+        self.phrases: tuple[str, ...] = tuple(dict.fromkeys(p for p in phrases if p))
+
+        goto: list[dict[str, int]] = [{}]
+        out: list[frozenset[str]] = [frozenset()]
+
+        for phrase in self.phrases:
+            state = 0
+            for ch in phrase:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    goto.append({})
+                    out.append(frozenset())
+                    nxt = len(goto) - 1
+                    goto[state][ch] = nxt
+                state = nxt
+            out[state] = out[state] | {phrase}
+
+        # Breadth-first pass: fold failure links into a complete transition
+        # table so scan() never has to walk them.
+        fail = [0] * len(goto)
+        delta: list[dict[str, int]] = [dict() for _ in goto]
+        delta[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            out[state] = out[state] | out[fail[state]]
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                queue.append(nxt)
+
+        self._delta = delta
+        self._out = out
+
+    def scan(self, text: str) -> set[str]:
+        delta = self._delta
+        out = self._out
+        found: set[str] = set()
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
@@ -0,0 +1,98 @@
+"""
+Per-tenant cache of the assembled /insight/report.
+
+An entry is keyed by a watermark of everything the tenant's report reads:
+its gate log and trace totals in anchor_counters and the generation of the
+anchors it sees (app.anchor_generation). Writes by other tenants leave it
+alone. While the watermark hasn't moved the cached report
+is returned as is. Once it moves, the report is recomputed before
+answering; with SW_INSIGHT_REPORT_MAX_STALE_S set, an entry younger than
+that is returned straight away instead while one background refresh
+recomputes it (stale-while-revalidate).
+
+Concurrent misses for a tenant compute the report once. Tune the parallel
+sub-reports with SW_INSIGHT_REPORT_WORKERS (default 4).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+HIT = "hit"
+STALE = "stale"
+MISS = "miss"
+
+
+class ReportCache:
+    def __init__(self, max_stale_s: float = 0.0) -> None:
+        self.max_stale_s = max(0.0, max_stale_s)
+        self._lock = threading.Lock()
+        self._entries: dict[Hashable, tuple[Hashable, float, Any]] = {}  # key -> (watermark, computed_at, value)
+        self._computing: dict[Hashable, threading.Lock] = {}
+        self._refreshing: set[Hashable] = set()
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "ReportCache":
+        return cls(max_stale_s=float(os.getenv("SW_INSIGHT_REPORT_MAX_STALE_S", "0")))
+
+    def get(self, key: Hashable, watermark: Hashable, compute: Callable[[], Any]) -> tuple[Any, str]:
+        """(report, HIT | STALE | MISS); compute() must not use the caller's session."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == watermark:
+                self.hits += 1
+                return entry[2], HIT
+            if entry is not None and time.monotonic() - entry[1] <= self.max_stale_s:
+                self.stale += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    threading.Thread(
+                        target=self._refresh, args=(key, watermark, compute), daemon=True
+                    ).start()
+                return entry[2], STALE
+            self.misses += 1
+            computing = self._computing.setdefault(key, threading.Lock())
+
+        with computing:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == watermark:
+                    return entry[2], MISS  # computed by the request we waited for
+            value = compute()
+            self._put(key, watermark, value)
+            return value, MISS
+
+    def _refresh(self, key: Hashable, watermark: Hashable, compute: Callable[[], Any]) -> None:
+        try:
+            self._put(key, watermark, compute())
+        except Exception:
+            logger.exception("insight report refresh failed")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _put(self, key: Hashable, watermark: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (watermark, time.monotonic(), value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+report_cache = ReportCache.from_env()
+
+# Runs the sub-reports of one report concurrently, each on its own session.
+report_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SW_INSIGHT_REPORT_WORKERS", "4")), thread_name_prefix="insight-report"
+)
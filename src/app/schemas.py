@@ -86,6 +86,39 @@ class GateEvaluateOut(BaseModel):
     warning_anchors: List[AnchorOut] = []
     enforcement_mode: Optional[str] = None
     would_block: Optional[bool] = None
+    anchor_generation: Optional[int] = None
+
+
+class GateCheckOut(BaseModel):
+    """/gate/check result. Nothing is logged or traced: not auditable, not replayable."""
+
+    decision: DecisionLiteral
+    reason: str
+    conflicted_anchor_ids: List[int] = []
+    max_level_conflict: int = 0
+    would_block: bool = False
+    interpretation: str = ""
+    suggestion: str = ""
+    next_actions: List[str] = []
+    enforcement_mode: Optional[str] = None
+    anchor_generation: int
+    auditable: Literal[False] = False
+
+
+class GateEvaluateStreamOut(GateEvaluateOut):
+    """One /gate/evaluate/stream result; no IDs when nothing is persisted."""
+
+    line: int
+    log_id: Optional[int] = None
+
+
+class GateEvaluateBatchIn(BaseModel):
+    items: List[GateEvaluateIn] = Field(min_length=1)
+
+
+class GateEvaluateBatchOut(BaseModel):
+    items: List[GateEvaluateOut]
+    anchor_generation: int
 
 
 class GateLogOut(BaseModel):
@@ -149,6 +182,8 @@ class ReplayOut(BaseModel):
 
     explanation: str = ""
     match_debug: Any = None
+    # app.trace_policy tier; match_debug is abridged on compact traces
+    trace_tier: str = "full"
 
 
 class PolicyProfileCreate(BaseModel):
@@ -156,6 +191,7 @@ class PolicyProfileCreate(BaseModel):
     description: Optional[str] = None
     is_default: Optional[bool] = False
     enforcement_mode: EnforcementMode = EnforcementMode.hard
+    trace_proceed_sample_rate: Optional[float] = Field(default=None, ge=0, le=1)
 
 
 class PolicyProfileUpdate(BaseModel):
@@ -163,6 +199,7 @@ class PolicyProfileUpdate(BaseModel):
     description: Optional[str] = None
     is_default: Optional[bool] = None
     enforcement_mode: Optional[EnforcementMode] = None
+    trace_proceed_sample_rate: Optional[float] = Field(default=None, ge=0, le=1)
 
 
 class PolicyProfileOut(BaseModel):
@@ -171,6 +208,7 @@ class PolicyProfileOut(BaseModel):
     description: Optional[str]
     is_default: bool
     enforcement_mode: str
+    trace_proceed_sample_rate: Optional[float] = None
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
@@ -196,4 +234,7 @@ class ShadowSummaryOut(BaseModel):
     total_l2_conflicts: int
     total_would_block: int
     total_overrides: int
-    top_triggered_anchors: List[dict]
\ No newline at end of file
+    top_triggered_anchors: List[dict]
+    # Trace counts per app.trace_policy tier; the conflict and trigger counts
+    # above weight each sampled trace by 1/trace_sample_rate
+    traces_by_tier: dict = Field(default_factory=dict)
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+Trace tiers: how much of each evaluation is kept in decision_traces.
+
+    full      everything (gate/refuse, would_block, and all traffic by default)
+    sampled   a proceed picked by the sample; stored like full, but it stands
+              for 1/trace_sample_rate proceeds, so counts over trace-anchor
+              rows weight it accordingly
+    compact   any other proceed: the gate log and trace row (decision, reason,
+              explanation, manifest) are kept, so it can still be replayed,
+              but there are no trace-anchor rows and match_debug is abridged
+
+The proceed sample rate comes from the request's policy profile, else its
+tenant, else SW_TRACE_PROCEED_SAMPLE_RATE (default 1.0: every proceed fully
+traced). Sampling hashes the normalized request text, so the same request
+always lands in the same tier and replays agree with the original.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from dataclasses import dataclass
+
+TIER_FULL = "full"
+TIER_SAMPLED = "sampled"
+TIER_COMPACT = "compact"
+
+# match_debug keys kept on compact traces
+_COMPACT_DEBUG_KEYS = ("cache_hit", "conflicted_ids", "max_level_conflict", "matcher_used")
+
+
+@dataclass(frozen=True)
+class TracePolicy:
+    proceed_sample_rate: float = 1.0
+
+    @classmethod
+    def from_env(cls) -> "TracePolicy":
+        return cls(proceed_sample_rate=float(os.getenv("SW_TRACE_PROCEED_SAMPLE_RATE", "1")))
+
+    def tier_for(self, decision: str, would_block: bool, request_normalized: str) -> tuple[str, float]:
+        """(tier, sample rate recorded on the trace) for one evaluation."""
+        rate = min(1.0, max(0.0, self.proceed_sample_rate))
+        if decision != "proceed" or would_block or rate >= 1.0:
+            return TIER_FULL, 1.0
+        if rate > 0.0 and in_sample(request_normalized, rate):
+            return TIER_SAMPLED, rate
+        return TIER_COMPACT, rate
+
+
+def in_sample(key: str, rate: float) -> bool:
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") < rate * 2**64
+
+
+def resolve_trace_policy(tenant, profile=None) -> TracePolicy:
+    """The most specific configured rate: profile, then tenant, then the environment."""
+    for owner in (profile, tenant):
+        rate = getattr(owner, "trace_proceed_sample_rate", None)
+        if rate is not None:
+            return TracePolicy(proceed_sample_rate=rate)
+    return TracePolicy.from_env()
+
+
+def compact_match_debug(match_debug: dict) -> dict:
+    return {k: match_debug[k] for k in _COMPACT_DEBUG_KEYS if k in match_debug}
@@ -0,0 +1,702 @@
+"""
+Gate log / decision trace persistence.
+
+write_records() is the one place GateLog (with its gate_log_anchors),
+DecisionTrace and trace-anchor rows are inserted. By default evaluate calls it inline on the request's
+session. With SW_TRACE_WRITER=group, requests instead hand a TraceRecord to
+a single TraceWriter thread that commits records in batches, so concurrent
+requests stop queueing on SQLite's write lock one commit at a time. On
+PostgreSQL, trace-anchor batches of SW_TRACE_COPY_MIN_ROWS (default 100) or
+more are loaded with COPY instead of multi-row INSERTs.
+
+Group mode knobs:
+    SW_TRACE_ACK            commit | enqueue  (default commit)
+                            commit: the request returns once its batch commits
+                            enqueue: the request returns once its record is
+                            spooled; the commit happens shortly after
+    SW_TRACE_ACK_TIMEOUT_S  longest a request waits for queue space or its
+                            commit before it fails with 503 (default 30)
+    SW_TRACE_QUEUE_SIZE     bounded queue; full = requests wait (default 1024)
+    SW_TRACE_BATCH_MAX      records per commit (default 256)
+    SW_TRACE_BATCH_WAIT_MS  how long a batch waits to fill (default 5)
+    SW_TRACE_SPOOL          spool base name (default <db>.trace-spool.jsonl)
+    SW_TRACE_SPOOL_FSYNC    fsync each spooled record (default 1)
+    SW_TRACE_SPOOL_SEGMENT_BYTES  spool segment size before rotating (default 8 MiB)
+    SW_TRACE_ID_BLOCK       IDs reserved per id_allocations round trip (default 1000)
+
+Every record is appended to the spool (and fsynced) before it is queued.
+Each process spools to its own files, <base>.<pid>-<token>.<n>.jsonl, and
+holds an exclusive lock on <base>.<pid>-<token>.lock while it runs. A
+segment is rotated once it reaches SW_TRACE_SPOOL_SEGMENT_BYTES and deleted
+once every record in it has been committed, so the spool stays small under
+sustained load. On start, a writer inserts the records of any spool whose
+lock it can take (its process has died), skipping any that did reach the
+database; spools of live processes are left alone. Records that cannot be
+written at all, live or recovered, go to <base>.rejected.jsonl.
+
+Log and trace IDs are reserved in blocks so they can be returned before the
+insert happens: from the tables' own sequences on PostgreSQL, from
+id_allocations elsewhere. SQLite hands a plain insert max(id) + 1, which can
+fall inside a reserved block, so in group mode every log and trace insert
+takes its ID from the writer, and all workers sharing a database should use
+the same SW_TRACE_WRITER mode. /gate/evaluate/batch and the stream route
+write their records themselves, in one transaction, with IDs from the
+writer's blocks (TraceWriter.assign_ids); reframe's log takes one too
+(TraceWriter.next_log_id).
+"""
+
+from __future__ import annotations
+
+import atexit
+import io
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.anchor_counters import count_records
+from app.decision_rollups import roll_up
+from app.models import DecisionTrace, DecisionTraceAnchor, GateLog, GateLogAnchor, IdAllocation
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# Trace-anchor batches at least this large are loaded with COPY on PostgreSQL.
+COPY_MIN_ROWS = int(os.getenv("SW_TRACE_COPY_MIN_ROWS", "100"))
+
+
+@dataclass
+class TraceRecord:
+    """Column values for one evaluation; log/trace "id" are filled in when assigned."""
+
+    log: dict
+    trace: dict
+    anchors: list[dict] = field(default_factory=list)
+    log_anchors: list[dict] = field(default_factory=list)  # gate_log_anchors, without log_id
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"log": self.log, "trace": self.trace, "anchors": self.anchors, "log_anchors": self.log_anchors},
+            ensure_ascii=False,
+            default=_json_default,
+        )
+
+    @classmethod
+    def from_json(cls, line: str) -> "TraceRecord":
+        data = json.loads(line)
+        for part in (data["log"], data["trace"]):
+            if isinstance(part.get("created_at"), str):
+                part["created_at"] = datetime.fromisoformat(part["created_at"])
+        return cls(
+            log=data["log"], trace=data["trace"], anchors=data["anchors"], log_anchors=data.get("log_anchors", [])
+        )
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"not JSON serialisable: {type(value).__name__}")
+
+
+def write_records(db: Session, records: list[TraceRecord]) -> None:
+    """
+    Insert records with multi-row Core INSERTs (no ORM objects), assigning
+    log and trace IDs where missing, and add them to the insight counters
+    and decision rollups; the caller commits.
+    """
+    _insert_rows(db, GateLog, [r.log for r in records])
+    link_rows = [{**row, "log_id": r.log["id"]} for r in records for row in r.log_anchors]
+    if link_rows:
+        db.execute(insert(GateLogAnchor.__table__), link_rows)
+    _insert_rows(db, DecisionTrace, [r.trace for r in records])
+    count_records(db, records)
+    roll_up(db, records)
+    anchor_rows = [{**row, "trace_id": r.trace["id"]} for r in records for row in r.anchors]
+    if not anchor_rows:
+        return
+    if len(anchor_rows) < COPY_MIN_ROWS or not _copy_rows(db, DecisionTraceAnchor, anchor_rows):
+        db.execute(insert(DecisionTraceAnchor.__table__), anchor_rows)
+
+
+def _insert_rows(db: Session, model, rows: list[dict]) -> None:
+    table = model.__table__
+    with_id = [row for row in rows if row.get("id") is not None]
+    without_id = [row for row in rows if row.get("id") is None]
+    if with_id:
+        db.execute(insert(table), with_id)
+    if without_id:
+        stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+        for row, new_id in zip(without_id, db.execute(stmt, without_id).scalars()):
+            row["id"] = new_id
+
+
+def _copy_rows(db: Session, model, rows: list[dict]) -> bool:
+    """
+    Stream rows into model's table with COPY ... FROM STDIN on
+    PostgreSQL/psycopg2, inside the session's transaction. Returns False,
+    having written nothing, on any other backend or driver.
+    """
+    conn = db.connection()
+    if conn.dialect.name != "postgresql":
+        return False
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if not hasattr(cursor, "copy_expert"):
+            return False
+        columns = [c for c in model.__table__.columns if not c.primary_key]
+        defaults = [c.default.arg if c.default is not None and c.default.is_scalar else None for c in columns]
+        buf = io.StringIO()
+        for row in rows:
+            buf.write("\t".join(_copy_text(row.get(c.name, d)) for c, d in zip(columns, defaults)))
+            buf.write("\n")
+        buf.seek(0)
+        names = ", ".join(c.name for c in columns)
+        cursor.copy_expert(f"COPY {model.__tablename__} ({names}) FROM STDIN", buf)
+        return True
+    finally:
+        cursor.close()
+
+
+def _copy_text(value) -> str:
+    """One field in COPY's text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class IdBlockAllocator:
+    """
+    Hands out IDs for `model` in blocks: on PostgreSQL drawn from the
+    table's own sequence, so plain inserts can never be given one of them;
+    elsewhere reserved in id_allocations.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], model, block_size: int = 1000) -> None:
+        self._session_factory = session_factory
+        self._model = model
+        self._block = max(1, block_size)
+        self._lock = threading.Lock()
+        self._free: Iterator[int] = iter(())
+
+    def next_id(self) -> int:
+        with self._lock:
+            value = next(self._free, None)
+            if value is None:
+                self._free = iter(self._reserve())
+                value = next(self._free)
+            return value
+
+    def _reserve(self) -> Iterable[int]:
+        name = self._model.__tablename__
+        for attempt in range(2):
+            with self._session_factory() as db:
+                if db.get_bind().dialect.name == "postgresql":
+                    return self._reserve_from_sequence(db)
+                try:
+                    # UPDATE first so the read below happens under the write lock.
+                    db.execute(
+                        update(IdAllocation)
+                        .where(IdAllocation.name == name)
+                        .values(next_id=IdAllocation.next_id + self._block)
+                    )
+                    current = db.scalar(select(IdAllocation.next_id).where(IdAllocation.name == name))
+                    max_id = db.scalar(select(func.coalesce(func.max(self._model.id), 0)))
+                    if current is None:
+                        start = max_id + 1
+                        db.add(IdAllocation(name=name, next_id=start + self._block))
+                    else:
+                        start = current - self._block
+                        if start <= max_id:
+                            # Rows were inserted without the allocator; skip past them.
+                            start = max_id + 1
+                            db.execute(
+                                update(IdAllocation)
+                                .where(IdAllocation.name == name)
+                                .values(next_id=start + self._block)
+                            )
+                    db.commit()
+                    return range(start, start + self._block)
+                except IntegrityError:
+                    # Another process created the row first.
+                    db.rollback()
+                    if attempt:
+                        raise
+        raise RuntimeError("unreachable")
+
+    def _reserve_from_sequence(self, db: Session) -> list[int]:
+        name = self._model.__tablename__
+        sequence = db.scalar(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": name})
+        max_id = db.scalar(select(func.coalesce(func.max(self._model.id), 0)))
+        # Blocks once came from id_allocations, which left the sequence behind.
+        db.execute(
+            text(
+                "SELECT setval(:s, :m) FROM pg_sequences"
+                " WHERE schemaname || '.' || sequencename = :s AND coalesce(last_value, 0) < :m"
+            ),
+            {"s": sequence, "m": max_id},
+        )
+        ids = list(
+            db.scalars(text("SELECT nextval(:s) FROM generate_series(1, :n)"), {"s": sequence, "n": self._block})
+        )
+        db.commit()
+        return ids
+
+
+class TraceAckTimeout(Exception):
+    """The writer did not take or commit a record within its ack timeout."""
+
+    def __init__(self, timeout_s: float) -> None:
+        super().__init__(f"trace writer did not acknowledge the record within {timeout_s:g}s")
+
+
+def _try_lock(fh) -> bool:
+    """
+    Take an exclusive lock on an open file without waiting. It is released
+    when the file is closed or the process dies.
+    """
+    try:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+_STOP = object()
+
+
+class TraceWriter:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        spool_path: Path,
+        ack: str = "commit",
+        ack_timeout_s: float = 30.0,
+        queue_size: int = 1024,
+        batch_max: int = 256,
+        batch_wait_ms: float = 5.0,
+        fsync: bool = True,
+        id_block: int = 1000,
+        segment_bytes: int = 8 << 20,
+    ) -> None:
+        if ack not in ("commit", "enqueue"):
+            raise ValueError(f"SW_TRACE_ACK must be 'commit' or 'enqueue', got {ack!r}")
+        self._session_factory = session_factory
+        self.spool_path = Path(spool_path)  # base name; see _segment_path()
+        self.segment_bytes = max(1, segment_bytes)
+        self._spool_id = f"{self.spool_path.stem}.{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.ack = ack
+        self.ack_timeout_s = ack_timeout_s
+        self.batch_max = max(1, batch_max)
+        self.batch_wait_s = max(0.0, batch_wait_ms) / 1000.0
+        self.fsync = fsync
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+        self._log_ids = IdBlockAllocator(session_factory, GateLog, id_block)
+        self._trace_ids = IdBlockAllocator(session_factory, DecisionTrace, id_block)
+
+        self._spool_lock = threading.Lock()
+        self._spool = None
+        self._spool_owner = None  # the open, locked .lock file
+        self._segment = 0
+        self._segment_pending: dict[int, int] = {}  # segment -> records not yet committed (or rejected)
+        self._pending = 0  # spooled but not yet committed (or rejected)
+        self._drained = threading.Condition(self._spool_lock)
+
+        self._start_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "records": 0,
+            "batches": 0,
+            "max_batch_size": 0,
+            "rejected": 0,
+            "recovered": 0,
+            "enqueue_blocked": 0,
+            "enqueue_wait_ms_total": 0.0,
+            "enqueue_wait_ms_max": 0.0,
+            "max_queue_depth": 0,
+            "commit_ms_total": 0.0,
+            "commit_ms_max": 0.0,
+        }
+
+    # -- request side -----------------------------------------------------
+
+    def submit(self, record: TraceRecord) -> TraceRecord:
+        """
+        Assign IDs, spool and queue the record; returns once acked per SW_TRACE_ACK.
+        Raises TraceAckTimeout if that takes longer than ack_timeout_s.
+        """
+        fut = self.enqueue(record)
+        if fut is not None:
+            try:
+                fut.result(timeout=self.ack_timeout_s)
+            except FutureTimeout:
+                raise TraceAckTimeout(self.ack_timeout_s) from None
+        return record
+
+    def assign_ids(self, record: TraceRecord) -> TraceRecord:
+        """
+        Give the record log/trace IDs from this writer's blocks, for callers
+        that insert it themselves (write_records) instead of queueing it.
+        """
+        if record.log.get("id") is None:
+            record.log["id"] = self._log_ids.next_id()
+        if record.trace.get("id") is None:
+            record.trace["id"] = self._trace_ids.next_id()
+        return record
+
+    def next_log_id(self) -> int:
+        """A log ID from this writer's blocks, for a GateLog inserted through the ORM (reframe)."""
+        return self._log_ids.next_id()
+
+    def enqueue(self, record: TraceRecord) -> Optional[Future]:
+        """
+        Assign IDs, spool and queue the record without waiting for its commit.
+        Returns the Future that completes on commit (ack=commit), or None.
+        Raises TraceAckTimeout if the queue stays full for ack_timeout_s.
+        """
+        self.start()
+        self.assign_ids(record)
+
+        line = (record.to_json() + "\n").encode("utf-8")
+        with self._spool_lock:
+            self._spool.write(line)
+            self._spool.flush()
+            if self.fsync:
+                os.fsync(self._spool.fileno())
+            segment = self._segment
+            self._segment_pending[segment] = self._segment_pending.get(segment, 0) + 1
+            self._pending += 1
+            if self._spool.tell() >= self.segment_bytes:
+                self._spool.close()
+                self._segment += 1
+                self._spool = open(self._segment_path(self._segment), "ab")
+
+        fut: Optional[Future] = Future() if self.ack == "commit" else None
+        item = (record, fut, segment)
+        started = time.perf_counter()
+        blocked = self._queue.full()
+        try:
+            self._queue.put(item, timeout=self.ack_timeout_s)
+        except queue.Full:
+            self._release([item])
+            raise TraceAckTimeout(self.ack_timeout_s) from None
+        waited_ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            s = self._stats
+            s["enqueue_blocked"] += int(blocked)
+            s["enqueue_wait_ms_total"] += waited_ms
+            s["enqueue_wait_ms_max"] = max(s["enqueue_wait_ms_max"], waited_ms)
+            s["max_queue_depth"] = max(s["max_queue_depth"], self._queue.qsize())
+        return fut
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every submitted record is committed or rejected."""
+        with self._drained:
+            return self._drained.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            s = dict(self._stats)
+        batches = s["batches"]
+        s["mean_batch_size"] = round(s["records"] / batches, 2) if batches else 0.0
+        s["mean_commit_ms"] = round(s.pop("commit_ms_total") / batches, 3) if batches else 0.0
+        s["commit_ms_max"] = round(s["commit_ms_max"], 3)
+        s["enqueue_wait_ms_max"] = round(s["enqueue_wait_ms_max"], 3)
+        s["enqueue_wait_ms_total"] = round(s["enqueue_wait_ms_total"], 3)
+        s["queue_depth"] = self._queue.qsize()
+        s["queue_capacity"] = self._queue.maxsize
+        s["pending"] = self._pending
+        s["spool_segments"] = len(self._segment_pending)
+        s["ack"] = self.ack
+        return s
+
+    # -- lifecycle --------------------------------------------------------
+
+    def start(self) -> None:
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is not None:
+                return
+            self.recover()
+            self._spool_owner = open(self.spool_path.with_name(self._spool_id + ".lock"), "ab")
+            if not _try_lock(self._spool_owner):
+                raise RuntimeError(f"trace spool {self._spool_id} is locked by another writer")
+            self._spool = open(self._segment_path(self._segment), "ab")
+            self._worker = threading.Thread(target=self._run, name="sw-trace-writer", daemon=True)
+            self._worker.start()
+
+    def close(self, timeout: float = 10.0) -> None:
+        worker = self._worker
+        if worker is None:
+            return
+        self._queue.put((_STOP, None, None))
+        worker.join(timeout=timeout)
+        with self._spool_lock:
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+            if self._pending == 0:
+                for segment in {*self._segment_pending, self._segment}:
+                    self._segment_path(segment).unlink(missing_ok=True)
+                self._segment_pending.clear()
+            # Left behind, uncommitted segments are recovered by the next start.
+            if self._spool_owner is not None:
+                self._spool_owner.close()
+                self._spool_owner = None
+                if self._pending == 0:
+                    self.spool_path.with_name(self._spool_id + ".lock").unlink(missing_ok=True)
+        self._worker = None
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.spool_path.with_name(f"{self._spool_id}.{segment:06d}{self.spool_path.suffix}")
+
+    def recover(self) -> int:
+        """
+        Insert records that dead processes spooled but never committed: those
+        in spools whose lock can be taken, plus a single-file spool at the
+        base path left by an older version.
+        """
+        recovered = 0
+        for lock_path in sorted(self.spool_path.parent.glob(f"{self.spool_path.stem}.*.lock")):
+            spool_id = lock_path.name[: -len(".lock")]
+            if spool_id == self._spool_id:
+                continue
+            try:
+                owner = open(lock_path, "rb")  # "rb": never recreate a spool another writer just removed
+            except FileNotFoundError:
+                continue
+            with owner:
+                if not _try_lock(owner):
+                    continue  # its process is alive
+                segments = sorted(self.spool_path.parent.glob(f"{spool_id}.*{self.spool_path.suffix}"))
+                recovered += self._recover_files(segments)
+                for path in segments:
+                    path.unlink(missing_ok=True)
+            lock_path.unlink(missing_ok=True)
+
+        try:
+            legacy = open(self.spool_path, "rb")
+        except FileNotFoundError:
+            legacy = None
+        if legacy is not None:
+            with legacy:
+                orphaned = _try_lock(legacy)
+                if orphaned:
+                    recovered += self._recover_files([self.spool_path])
+            if orphaned:
+                self.spool_path.unlink(missing_ok=True)
+
+        with self._stats_lock:
+            self._stats["recovered"] += recovered
+        return recovered
+
+    def _recover_files(self, paths: list[Path]) -> int:
+        records = []
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        records.append(TraceRecord.from_json(line))
+                    except (ValueError, KeyError):
+                        # A torn final line from the crash; its request was never acked.
+                        logger.warning("skipping unreadable trace spool line in %s", path)
+        if not records:
+            return 0
+
+        with self._session_factory() as db:
+            ids = [r.log["id"] for r in records]
+            present = set(db.scalars(select(GateLog.id).where(GateLog.id.in_(ids))))
+        missing = [r for r in records if r.log["id"] not in present]
+        if not missing:
+            return 0
+
+        failed = self._write(missing)
+        for record, e in failed:
+            logger.error("spooled trace record for log %s rejected: %s", record.log.get("id"), e)
+            self._reject(record)
+        with self._stats_lock:
+            self._stats["rejected"] += len(failed)
+        recovered = len(missing) - len(failed)
+        if recovered:
+            logger.warning("recovered %d trace records from %s", recovered, ", ".join(p.name for p in paths))
+        return recovered
+
+    # -- writer thread ----------------------------------------------------
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = []
+            item = self._queue.get()
+            if item[0] is _STOP:
+                break
+            batch.append(item)
+            deadline = time.perf_counter() + self.batch_wait_s
+            while len(batch) < self.batch_max:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item[0] is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._finish(batch)
+
+    def _finish(self, batch: list) -> None:
+        """Commit a batch, settle its spool entries, then answer its requests. Never raises."""
+        try:
+            failed = self._commit_batch(batch)
+        except Exception as e:
+            # E.g. the rejected file can't be written: fail this batch, keep the thread.
+            logger.exception("trace writer failed a batch of %d records", len(batch))
+            failed = {id(record): e for record, _fut, _seg in batch}
+        try:
+            self._release(batch)
+        except Exception:
+            logger.exception("trace spool cleanup failed")
+        for record, fut, _seg in batch:
+            if fut is None or fut.done():
+                continue
+            error = failed.get(id(record))
+            if error is None:
+                fut.set_result(record)
+            else:
+                fut.set_exception(error)
+
+    def _commit_batch(self, batch: list) -> dict:
+        """Write a batch, rejecting records that can't be written; returns {id(record): error}."""
+        started = time.perf_counter()
+        failed = self._write([record for record, _fut, _seg in batch])
+        commit_ms = (time.perf_counter() - started) * 1000
+
+        for record, e in failed:
+            logger.error("trace record for log %s rejected: %s", record.log.get("id"), e)
+            self._reject(record)
+
+        with self._stats_lock:
+            s = self._stats
+            s["batches"] += 1
+            s["records"] += len(batch) - len(failed)
+            s["rejected"] += len(failed)
+            s["max_batch_size"] = max(s["max_batch_size"], len(batch))
+            s["commit_ms_total"] += commit_ms
+            s["commit_ms_max"] = max(s["commit_ms_max"], commit_ms)
+        return {id(record): e for record, e in failed}
+
+    def _write(self, records: list[TraceRecord]) -> list[tuple[TraceRecord, Exception]]:
+        """Insert records in one transaction, or one by one if that fails; returns the failures."""
+        failed = []
+        try:
+            with self._session_factory() as db:
+                write_records(db, records)
+                db.commit()
+        except Exception:
+            # Isolate the bad record(s) so the rest still land.
+            for record in records:
+                try:
+                    with self._session_factory() as db:
+                        write_records(db, [record])
+                        db.commit()
+                except Exception as e:
+                    failed.append((record, e))
+        return failed
+
+    def _release(self, batch: list) -> None:
+        """Count a batch's records as settled and drop the spool segments they emptied."""
+        with self._spool_lock:
+            self._pending -= len(batch)
+            for _record, _fut, segment in batch:
+                self._segment_pending[segment] -= 1
+            try:
+                for segment, left in list(self._segment_pending.items()):
+                    if left == 0 and segment != self._segment:
+                        # Rotated out and fully committed.
+                        self._segment_path(segment).unlink(missing_ok=True)
+                        del self._segment_pending[segment]
+                if self._pending == 0 and self._spool is not None:
+                    self._spool.truncate(0)
+                    self._spool.flush()
+            finally:
+                if self._pending == 0:
+                    self._drained.notify_all()
+
+    def _reject(self, record: TraceRecord) -> None:
+        rejected = self.spool_path.with_name(self.spool_path.name + ".rejected.jsonl")
+        with open(rejected, "a", encoding="utf-8") as fh:
+            fh.write(record.to_json() + "\n")
+
+
+_writer: Optional[TraceWriter] = None
+_writer_lock = threading.Lock()
+
+
+def trace_writer_enabled() -> bool:
+    return os.getenv("SW_TRACE_WRITER", "inline").lower() == "group"
+
+
+def _default_spool_path() -> Path:
+    from app.db import DB_PATH
+    return DB_PATH.with_name(DB_PATH.stem + ".trace-spool.jsonl")
+
+
+def get_trace_writer() -> TraceWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                from app.db import SessionLocal
+
+                spool = os.getenv("SW_TRACE_SPOOL")
+                _writer = TraceWriter(
+                    SessionLocal,
+                    spool_path=Path(spool) if spool else _default_spool_path(),
+                    ack=os.getenv("SW_TRACE_ACK", "commit").lower(),
+                    ack_timeout_s=float(os.getenv("SW_TRACE_ACK_TIMEOUT_S", "30")),
+                    queue_size=int(os.getenv("SW_TRACE_QUEUE_SIZE", "1024")),
+                    batch_max=int(os.getenv("SW_TRACE_BATCH_MAX", "256")),
+                    batch_wait_ms=float(os.getenv("SW_TRACE_BATCH_WAIT_MS", "5")),
+                    fsync=os.getenv("SW_TRACE_SPOOL_FSYNC", "1") != "0",
+                    id_block=int(os.getenv("SW_TRACE_ID_BLOCK", "1000")),
+                    segment_bytes=int(os.getenv("SW_TRACE_SPOOL_SEGMENT_BYTES", str(8 << 20))),
+                )
+                atexit.register(_writer.close)
+    return _writer
+
+
+def writer_stats() -> dict:
+    """Queue/batch/backpressure counters; empty until the group writer is used."""
+    return _writer.stats() if _writer is not None else {}
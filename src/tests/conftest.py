@@ -1,5 +1,8 @@
 import os
 import sys
+import uuid
+from types import SimpleNamespace
+
 import pytest
 # Ensure imports like `from app.main import app` work when running pytest from /src
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__) + "/.."))
@@ -13,16 +16,22 @@ sys.path.insert(0, os.path.abspath(os.path.dirname(__file__) + "/.."))
 
 from app.main import app
 from app.db import get_db
-from app.models import Base
+from app.models import Base, Tenant
 
-# Single in-memory SQLite DB shared across the whole test session
-TEST_DATABASE_URL = "sqlite://"
+# Single in-memory SQLite DB shared across the whole test session, unless
+# SW_TEST_DATABASE_URL points at a scratch server database (e.g. a local
+# PostgreSQL: postgresql+psycopg2://postgres@localhost/signalweaver_test).
+# Its tables are dropped when the session ends.
+TEST_DATABASE_URL = os.getenv("SW_TEST_DATABASE_URL", "sqlite://")
 
-engine = create_engine(
-    TEST_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
+if TEST_DATABASE_URL.startswith("sqlite"):
+    engine = create_engine(
+        TEST_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+else:
+    engine = create_engine(TEST_DATABASE_URL)
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -57,4 +66,13 @@ def db_session():
 @pytest.fixture()
 def client():
     with TestClient(app) as c:
-        yield c
\ No newline at end of file
+        yield c
+
+
+@pytest.fixture()
+def tenant(db_session):
+    """A real tenant row (server databases enforce tenant_id foreign keys)."""
+    row = Tenant(name=f"test-{uuid.uuid4().hex[:12]}", api_key_hash=uuid.uuid4().hex)
+    db_session.add(row)
+    db_session.commit()
+    return SimpleNamespace(id=row.id)
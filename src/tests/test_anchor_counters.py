@@ -0,0 +1,67 @@
+"""
+Tests for the insight counters (app.anchor_counters): kept up to date by the
+write paths and reproducible from history with rebuild().
+"""
+
+import uuid
+
+import pytest
+from fastapi import Response
+from sqlalchemy import select
+
+import app.api.gate as gate
+import app.api.insight as insight
+from app.anchor_counters import TOTALS, rebuild
+from app.models import AnchorCounter, Tenant, TruthAnchor
+from app.schemas import GateEvaluateBatchIn, GateEvaluateIn, GateReframeIn
+
+
+@pytest.fixture()
+def own_tenant(db_session):
+    row = Tenant(name=f"counters-{uuid.uuid4().hex[:12]}", api_key_hash=uuid.uuid4().hex)
+    db_session.add(row)
+    db_session.commit()
+    return row
+
+
+@pytest.fixture()
+def anchor(db_session, own_tenant):
+    row = TruthAnchor(level=3, statement=f"do not delete production database {uuid.uuid4().hex[:6]}",
+                      scope="ops", tenant_id=own_tenant.id)
+    db_session.add(row)
+    db_session.commit()
+    return row
+
+
+def _counters(db, tenant_id: int) -> dict:
+    rows = db.scalars(select(AnchorCounter).where(AnchorCounter.tenant_id == tenant_id))
+    return {(r.anchor_id, r.decision): (r.logs, r.traces, r.overrides, r.last_hit_at) for r in rows}
+
+
+def test_write_paths_count_and_rebuild_agrees(db_session, own_tenant, anchor):
+    out = gate.evaluate(GateEvaluateIn(request_summary="please delete production database"), Response(),
+                        db=db_session, tenant=own_tenant)
+    gate.evaluate_batch(
+        GateEvaluateBatchIn(items=[GateEvaluateIn(request_summary="what's the weather like")] * 2),
+        Response(), db=db_session, tenant=own_tenant,
+    )
+    gate.reframe(GateReframeIn(log_id=out.log_id, new_intent="please delete production database now"),
+                 db=db_session, tenant=own_tenant)
+
+    live = _counters(db_session, own_tenant.id)
+    assert anchor.id in out.conflicted_anchor_ids
+    assert live[(TOTALS, "proceed")][:3] == (2, 2, 0)
+    assert live[(TOTALS, out.decision)][:2] == (2, 1)  # the evaluation and its reframe; one trace
+    assert live[(anchor.id, out.decision)][0] == 2
+
+    rebuild(db_session)
+    assert _counters(db_session, own_tenant.id) == live
+
+
+def test_summary_reads_tenant_totals(db_session, own_tenant, anchor):
+    before = insight.summary(db=db_session, tenant=own_tenant)
+    gate.evaluate(GateEvaluateIn(request_summary="please delete production database"), Response(),
+                  db=db_session, tenant=own_tenant)
+    after = insight.summary(db=db_session, tenant=own_tenant)
+    assert after.total_decisions == before.total_decisions + 1
+    assert anchor.id not in {d.anchor_id for d in insight.dead_anchors(db=db_session, tenant=own_tenant)}
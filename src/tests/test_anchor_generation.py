@@ -0,0 +1,120 @@
+"""
+Tests for persisted anchor-set generations.
+"""
+
+import threading
+import uuid
+
+import pytest
+from fastapi import Response
+from sqlalchemy.orm import sessionmaker
+
+from app.anchor_generation import anchor_generation_etag, bump_anchor_generation, current_anchor_generation
+from app.api.gate import evaluate, reframe
+from app.auth import get_tenant
+from app.db import get_db
+from app.main import app
+from app.models import Tenant, TruthAnchor
+from app.schemas import GateEvaluateIn, GateReframeIn
+
+
+def test_tenant_generation_includes_shared_anchors(db_session):
+    t1, t2 = 9101, 9102
+    base1 = current_anchor_generation(db_session, t1)
+    base2 = current_anchor_generation(db_session, t2)
+
+    bump_anchor_generation(db_session, t1)
+    db_session.commit()
+    assert current_anchor_generation(db_session, t1) == base1 + 1
+    assert current_anchor_generation(db_session, t2) == base2
+
+    bump_anchor_generation(db_session, None)
+    db_session.commit()
+    assert current_anchor_generation(db_session, t1) == base1 + 2
+    assert current_anchor_generation(db_session, t2) == base2 + 1
+
+
+def test_concurrent_first_bumps_both_count(db_session):
+    if db_session.get_bind().dialect.name == "sqlite":
+        pytest.skip("the in-memory test database has one shared connection")
+    key = 9000 + uuid.uuid4().int % 100000
+    session_factory = sessionmaker(bind=db_session.get_bind())
+    first, second = session_factory(), session_factory()
+    errors = []
+
+    def bump_second():
+        try:
+            bump_anchor_generation(second, key)  # waits on first's uncommitted row
+            second.commit()
+        except Exception as e:
+            errors.append(e)
+
+    bump_anchor_generation(first, key)
+    waiter = threading.Thread(target=bump_second)
+    waiter.start()
+    waiter.join(timeout=0.5)
+    first.commit()
+    waiter.join(timeout=10)
+    first.close()
+    second.close()
+
+    assert errors == []
+    assert current_anchor_generation(db_session, key) - current_anchor_generation(db_session, None) == 2
+
+
+def test_bump_rolls_back_with_the_change(db_session):
+    before = current_anchor_generation(db_session, 9103)
+    bump_anchor_generation(db_session, 9103)
+    db_session.rollback()
+    assert current_anchor_generation(db_session, 9103) == before
+
+
+def test_evaluate_reports_generation_and_etag(db_session, tenant):
+    response = Response()
+    out = evaluate(GateEvaluateIn(request_summary="hello there"), response, db=db_session, tenant=tenant)
+
+    generation = current_anchor_generation(db_session, tenant.id)
+    assert out.anchor_generation == generation
+    assert response.headers["etag"] == anchor_generation_etag(generation)
+
+
+@pytest.fixture()
+def tenant_client(client, db_session, tenant, monkeypatch):
+    # Other modules swap the app's get_db override at import; pin it for this test.
+    monkeypatch.setitem(app.dependency_overrides, get_db, lambda: db_session)
+    monkeypatch.setitem(app.dependency_overrides, get_tenant, lambda: tenant)
+    return client
+
+
+def test_generation_endpoint_honours_if_none_match(tenant_client):
+    first = tenant_client.get("/anchors/generation")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    assert tenant_client.get("/anchors/generation", headers={"If-None-Match": etag}).status_code == 304
+
+    created = tenant_client.post("/anchors/", json={"level": 1, "statement": "Prefer plain language", "scope": "global"})
+    assert created.status_code == 200
+
+    after = tenant_client.get("/anchors/generation", headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.json()["generation"] == first.json()["generation"] + 1
+
+
+def test_reframe_sees_only_the_tenants_anchors(db_session):
+    owner, other = (Tenant(name=f"reframe-{uuid.uuid4().hex[:12]}", api_key_hash=uuid.uuid4().hex) for _ in range(2))
+    db_session.add_all([owner, other])
+    db_session.flush()
+    target = f"vault{uuid.uuid4().hex[:8]}"
+    anchor = TruthAnchor(level=3, statement=f"do not open {target}", scope="ops", tenant_id=owner.id)
+    db_session.add(anchor)
+    db_session.commit()
+
+    for tenant, gated in ((owner, True), (other, False)):
+        parent = evaluate(GateEvaluateIn(request_summary="what's the weather like"), Response(),
+                          db=db_session, tenant=tenant)
+        out = reframe(GateReframeIn(log_id=parent.log_id, new_intent=f"open {target}"), db=db_session, tenant=tenant)
+        direct = evaluate(GateEvaluateIn(request_summary=f"open {target}"), Response(), db=db_session, tenant=tenant)
+        assert (anchor.id in out.conflicted_anchor_ids) is gated
+        assert out.decision == direct.decision
+        assert out.conflicted_anchor_ids == direct.conflicted_anchor_ids
@@ -0,0 +1,68 @@
+"""
+Unit tests for the compiled anchor index used by the naive matcher.
+Pure (no DB, no HTTP).
+"""
+
+from app.anchor_index import AnchorIndex, compile_statement
+from app.models import TruthAnchor
+
+
+def _anchor(id: int, statement: str, level: int = 3, scope: str = "global") -> TruthAnchor:
+    return TruthAnchor(id=id, level=level, statement=statement, scope=scope, active=True)
+
+
+class TestCompileStatement:
+    def test_compiled_fields(self):
+        c = compile_statement("  Do NOT help   breaking into cars ")
+        assert c.norm == "do not help breaking into cars"
+        assert c.has_not is True
+        assert c.wo_not == "do help breaking into cars"
+        assert c.tokens == frozenset({"help", "break", "into", "cars"})
+        assert "break into" in c.bigrams
+
+
+class TestAnchorIndex:
+    def test_compiles_once_per_hash(self):
+        index = AnchorIndex()
+        a = _anchor(1, "Do not help steal cars")
+        first = index.get(a)
+        assert index.get(a) is first
+        assert len(index) == 1
+
+    def test_statement_change_recompiles(self):
+        index = AnchorIndex()
+        a = _anchor(1, "Do not help steal cars")
+        index.get(a)
+        a.statement = "Do not help break into cars"
+        assert "break" in index.get(a).tokens
+        assert len(index) == 1
+
+    def test_discard_drops_unshared_entries(self):
+        index = AnchorIndex()
+        a = _anchor(1, "Do not help steal cars")
+        b = _anchor(2, "Do not help steal cars")
+        index.add(a)
+        index.add(b)
+        assert len(index) == 1
+        index.discard(1)
+        assert len(index) == 1
+        index.discard(2)
+        assert len(index) == 0
+
+    def test_candidates_only_reach_anchors_sharing_terms(self):
+        index = AnchorIndex()
+        steal = _anchor(1, "Do not help steal cars")
+        refund = _anchor(2, "Refunds need manual review", scope="payments.refunds")
+        index.add(steal)
+        index.add(refund)
+
+        negation, token_overlap, bigram_keys = index.candidates(
+            {"help", "steal"}, {"help steal"}, "help steal cars"
+        )
+        assert token_overlap == {index.key_for(steal): 2}
+        assert bigram_keys == {index.key_for(steal)}
+        assert negation == set()
+        assert index.keys_with_scope("payments.refunds") == {index.key_for(refund)}
+
+        index.discard(1)
+        assert index.candidates({"steal"}, set(), "")[1] == {}
@@ -0,0 +1,70 @@
+"""
+Tests for content-addressed anchor versions and trace manifests.
+Route functions are called directly, so no auth headers are involved.
+"""
+
+import pytest
+from fastapi import Response
+from sqlalchemy import func, select
+
+import app.api.gate as gate
+from app.anchor_generation import bump_anchor_generation
+from app.anchor_manifest import forget_manifests, load_manifest, store_manifest
+from app.models import AnchorManifest, AnchorVersion, DecisionTrace, TruthAnchor
+from app.schemas import GateEvaluateIn
+
+@pytest.fixture(autouse=True)
+def _fresh_manifest_cache():
+    forget_manifests()
+    yield
+    forget_manifests()
+
+
+def _add_anchors(db, tenant, *statements):
+    anchors = [TruthAnchor(level=3, statement=s, scope="ops", tenant_id=tenant.id) for s in statements]
+    db.add_all(anchors)
+    bump_anchor_generation(db, tenant.id)
+    db.commit()
+    return anchors
+
+
+def test_store_manifest_is_idempotent(db_session, tenant):
+    anchors = _add_anchors(db_session, tenant, "Never drop the ledger table", "Never rotate keys on Fridays")
+
+    first = store_manifest(db_session, anchors)
+    db_session.commit()
+    versions = db_session.scalar(select(func.count()).select_from(AnchorVersion))
+
+    assert store_manifest(db_session, list(reversed(anchors))) == first
+    db_session.commit()
+    assert db_session.scalar(select(func.count()).select_from(AnchorVersion)) == versions
+    assert db_session.get(AnchorManifest, first) is not None
+
+    rows = load_manifest(db_session, first)
+    assert [r.anchor_id for r in rows] == sorted(a.id for a in anchors)
+    assert [r.anchor_hash for r in rows] == [a.stable_hash() for a in sorted(anchors, key=lambda a: a.id)]
+
+
+def test_trace_keeps_matched_rows_and_replay_reads_manifest(db_session, tenant):
+    hit, other = _add_anchors(db_session, tenant, "Never truncate the audit journal", "Never page the CEO at night")
+
+    out = gate.evaluate(
+        GateEvaluateIn(request_summary="please truncate the audit journal"), Response(), db=db_session, tenant=tenant
+    )
+    trace = db_session.get(DecisionTrace, out.trace_id)
+
+    assert out.conflicted_anchor_ids == [hit.id]
+    assert [r.anchor_id for r in trace.anchors] == [hit.id]
+    assert trace.anchors[0].matched
+    manifest_ids = [r.anchor_id for r in load_manifest(db_session, trace.manifest_hash)]
+    assert hit.id in manifest_ids and other.id in manifest_ids
+
+    assert gate.replay(out.trace_id, db=db_session, tenant=tenant).anchor_drift == []
+
+    other.active = False
+    bump_anchor_generation(db_session, tenant.id)
+    db_session.commit()
+
+    drift = gate.replay(out.trace_id, db=db_session, tenant=tenant).anchor_drift
+    assert drift[0].startswith(f"Anchor {other.id} changed (hash ")
+    assert drift[1] == f"Anchor {other.id} active flag changed (True -> False)"
@@ -0,0 +1,42 @@
+"""
+Unit tests for the IVF approximate nearest-neighbour index.
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.ann_index import IVFIndex
+
+
+def _unit_rows(n: int, d: int = 16, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=(n, d)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def test_probing_every_list_is_exact():
+    matrix = _unit_rows(500)
+    ivf = IVFIndex.train(matrix, np.arange(500), nlist=10, nprobe=10)
+    query = matrix[7]
+    rows, scores = ivf.search(matrix, query, threshold=0.3)
+    exact = np.flatnonzero(matrix @ query >= 0.3)
+    assert sorted(rows.tolist()) == exact.tolist()
+    assert np.allclose(scores, matrix[rows] @ query)
+
+
+def test_nearest_row_found_with_few_probes():
+    matrix = _unit_rows(2000)
+    ivf = IVFIndex.train(matrix, np.arange(2000), nlist=20, nprobe=3)
+    for r in (0, 99, 1500):
+        rows, _scores = ivf.search(matrix, matrix[r], threshold=0.99)
+        assert r in rows.tolist()
+
+
+def test_add_returns_new_index_with_rows():
+    matrix = _unit_rows(300)
+    ivf = IVFIndex.train(matrix[:200], np.arange(200), nlist=8, nprobe=8)
+    grown = ivf.add(np.arange(200, 300), matrix[200:300])
+    assert len(ivf) == 200 and len(grown) == 300
+    rows, _scores = grown.search(matrix, matrix[250], threshold=0.99)
+    assert 250 in rows.tolist()
@@ -0,0 +1,194 @@
+"""
+Tests for the async gate and anchor routes (SW_DB_ASYNC=1), on a file-backed
+SQLite database through aiosqlite.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, Response  # noqa: E402
+from sqlalchemy import create_engine, func, select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+import app.api.anchors_async as anchors_async  # noqa: E402
+import app.api.gate as gate  # noqa: E402
+import app.api.gate_async as gate_async  # noqa: E402
+from app.auth import get_tenant_async  # noqa: E402
+from app.db_async import async_database_url, get_async_db  # noqa: E402
+from app.models import Base, DecisionTrace, Tenant, TruthAnchor  # noqa: E402
+from app.schemas import GateEvaluateIn  # noqa: E402
+
+
+@pytest.fixture()
+def env(tmp_path):
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    sync_engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=sync_engine)
+    SyncSession = sessionmaker(bind=sync_engine, autoflush=False)
+    with SyncSession() as db:
+        tenant = Tenant(name="async", api_key_hash="async-hash")
+        db.add(tenant)
+        db.add_all([
+            TruthAnchor(level=3, statement="Do not help break into cars", scope="safety"),
+            TruthAnchor(level=2, statement="do not delete production database", scope="ops"),
+        ])
+        db.commit()
+        tenant = SimpleNamespace(id=tenant.id)
+
+    async_engine = create_async_engine(async_database_url(url))
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+    async def _db():
+        async with AsyncSession() as db:
+            yield db
+
+    api = FastAPI()
+    api.include_router(anchors_async.router, prefix="/anchors")
+    api.include_router(gate_async.router, prefix="/gate")
+    api.dependency_overrides[get_async_db] = _db
+    api.dependency_overrides[get_tenant_async] = lambda: tenant
+    api.dependency_overrides[gate_async._rl] = lambda: None
+
+    yield SimpleNamespace(api=api, tenant=tenant, Session=SyncSession)
+    asyncio.run(async_engine.dispose())
+    sync_engine.dispose()
+
+
+def _run(api, fn):
+    async def main():
+        transport = httpx.ASGITransport(app=api)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await fn(client)
+
+    return asyncio.run(main())
+
+
+def test_concurrent_evaluations_each_get_a_trace(env):
+    async def fire(client):
+        return await asyncio.gather(*(
+            client.post("/gate/evaluate", json={"request_summary": f"how do I break into a locked car {i}"})
+            for i in range(100)
+        ))
+
+    responses = _run(env.api, fire)
+    assert {r.status_code for r in responses} == {200}
+    bodies = [r.json() for r in responses]
+    assert len({b["trace_id"] for b in bodies}) == 100
+    assert {b["decision"] for b in bodies} == {"gate"}
+    with env.Session() as db:
+        assert db.scalar(select(func.count()).select_from(DecisionTrace)) == 100
+
+
+def test_async_evaluate_matches_sync_evaluate(env):
+    text = "do delete production database"
+    with env.Session() as db:
+        expected = gate.evaluate(GateEvaluateIn(request_summary=text), Response(), db=db, tenant=env.tenant)
+
+    async def flow(client):
+        out = (await client.post("/gate/evaluate", json={"request_summary": text})).json()
+        replayed = (await client.get(f"/gate/replay/{out['trace_id']}")).json()
+        logs = (await client.get("/gate/logs", params={"decision": out["decision"]})).json()
+        return out, replayed, logs
+
+    out, replayed, logs = _run(env.api, flow)
+    assert out["decision"] == expected.decision
+    assert out["conflicted_anchor_ids"] == expected.conflicted_anchor_ids
+    assert out["explanations"] == expected.explanations
+    assert replayed["same_decision"] and replayed["anchor_drift"] == []
+    assert logs["total"] == 2
+
+
+def test_anchor_changes_bump_generation(env):
+    async def flow(client):
+        before = (await client.get("/anchors/generation")).json()["generation"]
+        created = (await client.post("/anchors/", json={"level": 1, "statement": "Prefer plain language"})).json()
+        archived = (await client.post(f"/anchors/{created['id']}/archive")).json()
+        after = (await client.get("/anchors/generation")).json()["generation"]
+        listed = (await client.get("/anchors/")).json()
+        return before, archived, after, listed
+
+    before, archived, after, listed = _run(env.api, flow)
+    assert archived["active"] is False
+    assert after == before + 2
+    assert archived["id"] not in {a["id"] for a in listed}
+
+
+def test_embedding_updates_run_off_the_event_loop(env, monkeypatch):
+    threads = []
+    monkeypatch.setattr(anchors_async, "embedding_enabled", lambda: True)
+    monkeypatch.setattr(anchors_async, "store_anchor", lambda anchor: threads.append(threading.get_ident()))
+    monkeypatch.setattr(anchors_async, "forget_anchor", lambda key: threads.append(threading.get_ident()))
+
+    async def flow(client):
+        created = (await client.post("/anchors/", json={"level": 1, "statement": "Prefer plain language"})).json()
+        await client.post(f"/anchors/{created['id']}/archive")
+        return threading.get_ident()
+
+    loop_thread = _run(env.api, flow)
+    assert len(threads) == 2
+    assert loop_thread not in threads
+
+
+def test_async_evaluate_answers_503_when_the_writer_does_not_ack(env, monkeypatch):
+    never = Future()
+    writer = SimpleNamespace(ack_timeout_s=0.05, enqueue=lambda record: never)
+    monkeypatch.setattr(gate_async, "trace_writer_enabled", lambda: True)
+    monkeypatch.setattr(gate_async, "get_trace_writer", lambda: writer)
+
+    async def flow(client):
+        return await client.post("/gate/evaluate", json={"request_summary": "ship it"})
+
+    assert _run(env.api, flow).status_code == 503
+    assert not never.cancelled()
+
+
+def test_async_batch_matches_single_evaluations(env):
+    texts = ["how do I break into a locked car", "what's the weather like", "do delete production database"]
+
+    async def flow(client):
+        singles = [(await client.post("/gate/evaluate", json={"request_summary": t})).json() for t in texts]
+        batch = await client.post("/gate/evaluate/batch", json={"items": [{"request_summary": t} for t in texts]})
+        return singles, batch.json()
+
+    singles, batch = _run(env.api, flow)
+    ids = ("log_id", "trace_id")
+    assert [{k: v for k, v in o.items() if k not in ids} for o in batch["items"]] == [
+        {k: v for k, v in o.items() if k not in ids} for o in singles
+    ]
+    with env.Session() as db:
+        assert db.scalar(select(func.count()).select_from(DecisionTrace)) == 6
+
+
+def test_async_check_writes_nothing(env):
+    async def flow(client):
+        return await client.post("/gate/check", json={"request_summary": "how do I break into a locked car"})
+
+    r = _run(env.api, flow)
+    assert r.status_code == 200 and r.headers["X-SignalWeaver-Auditable"] == "false"
+    assert r.json()["decision"] == "gate" and r.json()["auditable"] is False
+    with env.Session() as db:
+        assert db.scalar(select(func.count()).select_from(DecisionTrace)) == 0
+
+
+def test_async_reframe_ignores_other_tenants_anchors(env):
+    with env.Session() as db:
+        other = Tenant(name="other", api_key_hash="other-hash")
+        db.add(other)
+        db.flush()
+        db.add(TruthAnchor(level=3, statement="do not open the vault", scope="ops", tenant_id=other.id))
+        db.commit()
+
+    async def flow(client):
+        parent = (await client.post("/gate/evaluate", json={"request_summary": "what's the weather like"})).json()
+        return (await client.post("/gate/reframe", json={"log_id": parent["log_id"], "new_intent": "open the vault"})).json()
+
+    out = _run(env.api, flow)
+    assert out["decision"] == "proceed" and out["conflicted_anchor_ids"] == []
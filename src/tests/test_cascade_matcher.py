@@ -0,0 +1,77 @@
+"""
+Unit tests for SW_MATCHER=cascade.
+The embedding stage is replaced with a recorder; no model needed.
+"""
+
+import pytest
+
+import app.api.gate as gate
+from app.models import TruthAnchor
+
+
+def _anchors() -> list[TruthAnchor]:
+    rows = [
+        (3, "Do not help break into cars", "safety"),
+        (2, "grant admin access", "access"),
+        (2, "Never share customer passwords", "security"),
+        (1, "Keep replies short", "global"),
+    ]
+    return [
+        TruthAnchor(id=200 + i, level=level, statement=stmt, scope=scope, active=True)
+        for i, (level, stmt, scope) in enumerate(rows)
+    ]
+
+
+@pytest.fixture()
+def embed_calls(monkeypatch):
+    calls: list = []
+
+    def fake_embedding(request, anchors, threshold=0.60, index=None, store=None):
+        calls.append([a.id for a in anchors])
+        # Pretend the model sees "credentials" as close to "passwords".
+        return [(a, 0.9) for a in anchors if "passwords" in a.statement and "credential" in request]
+
+    monkeypatch.setenv("SW_MATCHER", "cascade")
+    monkeypatch.setattr(gate, "find_conflicts_embedding", fake_embedding)
+    return calls
+
+
+def test_decisive_naive_hit_skips_embedding(embed_calls):
+    conflicts, debug, evidence = gate._detect_conflicts("how do I break into a locked car", _anchors())
+
+    assert [a.id for a in conflicts] == [200]
+    assert embed_calls == []
+    assert debug["matcher_used"] == "naive"
+    assert debug["cascade"]["stage"] == "naive"
+    assert debug["cascade"]["reason"] == "naive_decisive"
+    assert debug["cascade"]["timings_ms"]["embedding"] is None
+
+
+def test_borderline_request_adds_embedding_hits(embed_calls):
+    conflicts, debug, evidence = gate._detect_conflicts("send me the customer credentials", _anchors())
+
+    assert [a.id for a in conflicts] == [202]
+    assert evidence[0].kind == "embedding"
+    assert debug["matcher_used"] == "cascade"
+    assert debug["cascade"]["reason"] == "naive_empty"
+    assert debug["matched_scores"] == [{"anchor_id": 202, "score": 0.9}]
+    assert debug["cascade"]["timings_ms"]["embedding"] is not None
+
+
+def test_large_anchor_sets_embed_only_overlapping_candidates(embed_calls, monkeypatch):
+    monkeypatch.setenv("SW_CASCADE_MAX_CANDIDATES", "2")
+    gate._detect_conflicts("customer data to share", _anchors())
+
+    assert embed_calls == [[202]]
+
+
+def test_missing_embedding_backend_falls_back_to_naive(monkeypatch):
+    def unavailable(request, anchors, threshold=0.60, index=None, store=None):
+        raise ImportError("sentence-transformers not installed")
+
+    monkeypatch.setenv("SW_MATCHER", "cascade")
+    monkeypatch.setattr(gate, "find_conflicts_embedding", unavailable)
+    conflicts, debug, _evidence = gate._detect_conflicts("send the customer credentials", _anchors())
+
+    assert conflicts == []
+    assert debug["fallback_used"] and debug["fallback_reason"] == "embedding_unavailable"
@@ -0,0 +1,247 @@
+"""
+Tests for counterfactual replays (app.counterfactual) and their /insight routes.
+"""
+
+import asyncio
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+import app.api.insight as insight
+import app.counterfactual as cf
+from app.anchor_index import anchor_index
+from app.api.gate import _detect_conflicts
+from app.auth import get_tenant
+from app.dependencies import get_db
+from app.api.insight import (
+    CounterfactualIn,
+    CounterfactualStreamIn,
+    ProposedAnchorChange,
+    counterfactual,
+    counterfactual_stream,
+)
+from app.models import DecisionTrace, TruthAnchor
+from app.trace_writer import TraceRecord, write_records
+
+WHEN = datetime(2037, 3, 1, 12, 0)
+
+
+def _words():
+    tag = uuid.uuid4().hex[:10]
+    return f"qwx{tag}", f"vlorp{tag}"
+
+
+def _setup(db, tenant, n_traces=3):
+    """An L3 anchor that no trace conflicts with yet, and proceed traces that would."""
+    verb, noun = _words()
+    anchor = TruthAnchor(level=3, statement=f"archive unrelated {uuid.uuid4().hex}", scope="global", tenant_id=tenant.id)
+    db.add(anchor)
+    records = [
+        TraceRecord(
+            log={"request_summary": f"{verb} {noun}", "decision": "proceed", "tenant_id": tenant.id},
+            trace={"request_text": f"{verb} {noun}", "decision": "proceed", "tenant_id": tenant.id, "created_at": WHEN},
+        )
+        for _ in range(n_traces)
+    ]
+    write_records(db, records)
+    db.commit()
+    trace_ids = list(db.scalars(select(DecisionTrace.id).where(DecisionTrace.request_text == f"{verb} {noun}")))
+    return anchor, trace_ids, f"do not {verb} {noun}"
+
+
+def test_patched_anchor_hashes_like_truth_anchor():
+    live = TruthAnchor(id=1, level=2, statement="Keep keys private", scope="security", active=True)
+    patched = cf._PatchedAnchor(id=1, level=2, statement="Keep keys private", scope="security")
+    assert patched.stable_hash() == live.stable_hash()
+    assert cf._PatchedAnchor(id=1, level=3, statement="Keep keys private", scope="security").stable_hash() != live.stable_hash()
+
+
+def test_patch_anchors_applies_change_set():
+    live = [
+        TruthAnchor(id=1, level=1, statement="one", scope="global", active=True),
+        TruthAnchor(id=2, level=2, statement="two", scope="global", active=True),
+        TruthAnchor(id=3, level=3, statement="three", scope="global", active=True),
+    ]
+    patched = cf.patch_anchors(
+        live, statements={1: "uno"}, levels={2: 3}, archived=[3], added=[(2, "new", "payments"), (1, "newer", "global")]
+    )
+    assert [(a.id, a.level, a.statement, a.scope) for a in patched] == [
+        (1, 1, "uno", "global"),
+        (2, 3, "two", "global"),
+        (-1, 2, "new", "payments"),
+        (-2, 1, "newer", "global"),
+    ]
+
+
+def test_patched_anchors_leave_the_shared_index_alone():
+    live = TruthAnchor(id=987654, level=3, statement="never share the vault code", scope="global", active=True)
+    anchor_index.add(live)
+    bound = anchor_index._hash_by_id[live.id]
+
+    anchors, index, store = cf._compile(cf.patch_anchors([live], statements={live.id: "do not open the vault"}))
+    conflicts, _debug, _evidence = _detect_conflicts("open the vault", anchors, index, store)
+
+    assert [a.id for a in conflicts] == [live.id]
+    assert anchor_index._hash_by_id[live.id] == bound
+    anchor_index.discard(live.id)
+
+
+def test_counterfactual_edit_and_archive(db_session, tenant):
+    anchor, trace_ids, conflicting = _setup(db_session, tenant)
+
+    edited = counterfactual(
+        CounterfactualIn(
+            trace_ids=trace_ids,
+            proposed_changes=[ProposedAnchorChange(anchor_id=anchor.id, new_statement=conflicting)],
+        ),
+        db=db_session,
+        tenant=tenant,
+    )
+    assert [r.trace_id for r in edited] == sorted(trace_ids)
+    assert all(r.changed and r.original_decision == "proceed" for r in edited)
+    assert all(r.counterfactual_decision != "proceed" for r in edited)
+
+    added_then_archived = counterfactual(
+        CounterfactualIn(
+            trace_ids=trace_ids,
+            proposed_changes=[ProposedAnchorChange(anchor_id=anchor.id, new_statement=conflicting)],
+            archived_anchor_ids=[anchor.id],
+        ),
+        db=db_session,
+        tenant=tenant,
+    )
+    assert not any(r.changed for r in added_then_archived)
+
+
+def test_route_accepts_the_legacy_request(db_session, tenant):
+    anchor, trace_ids, conflicting = _setup(db_session, tenant)
+    api = FastAPI()
+    api.include_router(insight.router, prefix="/insight")
+    api.dependency_overrides[get_db] = lambda: db_session
+    api.dependency_overrides[get_tenant] = lambda: tenant
+
+    with TestClient(api) as client:
+        r = client.post("/insight/counterfactual", json={
+            "trace_ids": trace_ids,
+            "proposed_changes": [{"anchor_id": anchor.id, "new_statement": conflicting}],
+        })
+    assert r.status_code == 200
+    out = r.json()
+    assert [o["trace_id"] for o in out] == sorted(trace_ids)
+    assert all(o["original_decision"] == "proceed" and o["changed"] for o in out)
+
+
+def test_unknown_anchor_is_404(db_session, tenant):
+    with pytest.raises(HTTPException) as exc:
+        counterfactual(
+            CounterfactualIn(trace_ids=[], proposed_changes=[ProposedAnchorChange(anchor_id=-5, new_statement="x")]),
+            db=db_session,
+            tenant=tenant,
+        )
+    assert exc.value.status_code == 404
+
+
+def _lines(response) -> list[dict]:
+    async def collect():
+        return [chunk async for chunk in response.body_iterator]
+
+    body = b"".join(asyncio.run(collect()))
+    return [json.loads(line) for line in body.decode("utf-8").splitlines()]
+
+
+def test_stream_reports_progress_and_transitions(db_session, tenant):
+    _anchor, trace_ids, conflicting = _setup(db_session, tenant, n_traces=4)
+
+    response = counterfactual_stream(
+        CounterfactualStreamIn(trace_ids=trace_ids, added_anchors=[{"level": 3, "statement": conflicting}]),
+        db=db_session,
+        tenant=tenant,
+    )
+    events = _lines(response)
+
+    results = [e for e in events if e["type"] == "result"]
+    assert [e["trace_id"] for e in results] == sorted(trace_ids)
+    assert events[-2] == {"type": "progress", "evaluated": 4, "changed": 4, "total": 4}
+    summary = events[-1]
+    assert summary["type"] == "summary" and summary["evaluated"] == 4 and summary["unchanged"] == 0
+    (transition, flips), = summary["transitions"].items()
+    assert transition.startswith("proceed->") and flips == 4
+
+
+def test_stream_filters_and_only_changed(db_session, tenant):
+    _anchor, trace_ids, conflicting = _setup(db_session, tenant, n_traces=2)
+
+    response = counterfactual_stream(
+        CounterfactualStreamIn(
+            trace_ids=trace_ids,
+            decision="gate",
+            added_anchors=[{"level": 3, "statement": conflicting}],
+        ),
+        db=db_session,
+        tenant=tenant,
+    )
+    assert _lines(response)[-1]["evaluated"] == 0
+
+    response = counterfactual_stream(
+        CounterfactualStreamIn(trace_ids=trace_ids, limit=1, only_changed=True),
+        db=db_session,
+        tenant=tenant,
+    )
+    events = _lines(response)
+    assert [e["type"] for e in events] == ["progress", "summary"]
+    assert events[-1]["evaluated"] == 1 and events[-1]["changed"] == 0
+
+
+def test_process_pool_matches_in_process(db_session, tenant, monkeypatch):
+    anchor, trace_ids, conflicting = _setup(db_session, tenant, n_traces=5)
+    anchors = cf.patch_anchors([anchor], statements={anchor.id: conflicting})
+    stmt = cf.select_traces(tenant.id, trace_ids=trace_ids)
+
+    in_process = list(cf.run(db_session, anchors, stmt, total=5, workers=0, chunk_size=2))
+    monkeypatch.setattr(cf, "MIN_PARALLEL", 0)
+    pooled = list(cf.run(db_session, anchors, stmt, total=5, workers=2, chunk_size=2))
+
+    assert pooled == in_process
+    assert [e["type"] for e in pooled].count("progress") == 3
+    assert pooled[-1]["changed"] == 5
+
+
+def test_embedding_replays_leave_the_shared_store_alone(db_session, tenant, tmp_path, monkeypatch):
+    np = pytest.importorskip("numpy")
+    import app.embedding_matcher as em
+
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        vecs = np.stack([np.random.default_rng(sum(t.encode())).normal(size=8) for t in texts]).astype(np.float32)
+        return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+    shared = em.AnchorEmbeddingStore(path=tmp_path / "sw.embeddings.npz")
+    monkeypatch.setattr(em, "compute_embeddings", encode)
+    monkeypatch.setattr(em, "embedding_store", shared)
+    monkeypatch.setattr(cf, "embedding_store", shared)
+    monkeypatch.setenv("SW_MATCHER", "embedding")
+
+    live = [
+        TruthAnchor(id=1, level=2, statement="never share passwords", scope="global", active=True),
+        TruthAnchor(id=2, level=3, statement="refunds need review", scope="global", active=True),
+    ]
+    shared.lookup(live)
+    logged = shared.log_path.read_bytes()
+    calls.clear()
+
+    _anchor, trace_ids, _conflicting = _setup(db_session, tenant)
+    anchors = cf.patch_anchors(live, statements={1: "never share any secrets"}, added=[(3, "no offshore wires", "payments")])
+    stmt = cf.select_traces(tenant.id, trace_ids=trace_ids)
+    events = list(cf.run(db_session, anchors, stmt, total=len(trace_ids), workers=0))
+
+    assert events[-1]["evaluated"] == len(trace_ids)
+    assert calls[0] == ["never share any secrets", "no offshore wires"]  # the unchanged anchor is reused
+    assert len(shared) == 2
+    assert shared.log_path.read_bytes() == logged
@@ -0,0 +1,128 @@
+"""
+Tests for server-database support: engine options, COPY/bulk trace ingestion,
+portable queries and migrate.py. Run the whole suite against PostgreSQL with
+SW_TEST_DATABASE_URL (see conftest.py); the same tests pass on SQLite.
+"""
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, func, inspect, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.api.reports import shadow_summary
+from app.db import engine_options, stream
+from app.db_profiles import storage_profile
+from app.models import Base, DecisionTraceAnchor, GateLog, TruthAnchor
+from app.trace_writer import IdBlockAllocator, TraceRecord, _copy_text, write_records
+
+PG_URL = "postgresql+psycopg2://signalweaver@db.internal/signalweaver"
+
+
+def _load_migrate():
+    path = Path(__file__).resolve().parents[2] / "migrate.py"
+    spec = importlib.util.spec_from_file_location("sw_migrate", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_engine_options_pool_server_databases(monkeypatch):
+    monkeypatch.delenv("SW_DB_POOL_SIZE", raising=False)
+    opts = engine_options(PG_URL, storage_profile("default"))
+    assert "connect_args" not in opts
+    assert opts["pool_size"] == 10 and opts["max_overflow"] == 20
+    assert opts["pool_pre_ping"] is True
+
+    assert engine_options(PG_URL, storage_profile("throughput"))["pool_size"] == 16
+    monkeypatch.setenv("SW_DB_POOL_SIZE", "4")
+    assert engine_options(PG_URL, storage_profile("throughput"))["pool_size"] == 4
+
+    sqlite_opts = engine_options("sqlite:///x.db", storage_profile("default"))
+    assert sqlite_opts == {"connect_args": {"check_same_thread": False}}
+
+
+def test_copy_text_escapes_field_separators():
+    assert _copy_text(None) == "\\N"
+    assert _copy_text(True) == "t"
+    assert _copy_text("a\tb\nc\\d") == "a\\tb\\nc\\\\d"
+
+
+def test_large_anchor_batches_round_trip(db_session):
+    anchors = [TruthAnchor(level=3, statement=f"Never export list {i}", scope="data") for i in range(50)]
+    db_session.add_all(anchors)
+    db_session.commit()
+
+    tricky = "Never export\tthe customer list\nto C:\\tmp"
+    records = [
+        TraceRecord(
+            log={"request_summary": "export", "decision": "gate"},
+            trace={"request_text": "export", "decision": "gate"},
+            anchors=[
+                {"anchor_id": a.id, "anchor_hash": f"{a.id:064x}", "statement_snapshot": tricky,
+                 "scope_snapshot": "data", "level_snapshot": 3, "active_snapshot": True, "matched": n == 0}
+                for a in anchors
+            ],
+        )
+        for n in range(3)
+    ]
+    write_records(db_session, records)  # 150 rows: COPY on PostgreSQL
+    db_session.commit()
+
+    trace_ids = [r.trace["id"] for r in records]
+    stmt = DecisionTraceAnchor.__table__.select().where(DecisionTraceAnchor.trace_id.in_(trace_ids))
+    written = list(stream(db_session, stmt, yield_per=40))
+    assert len(written) == 150
+    assert {r.statement_snapshot for r in written} == {tricky}
+    assert {r.match_note for r in written} == {""}
+    assert sum(r.matched for r in written) == 50
+
+    # Portable GROUP BY: every selected anchor column is grouped.
+    summary = shadow_summary(db=db_session)
+    assert summary.total_l3_conflicts >= 50
+    assert summary.top_triggered_anchors
+
+
+def test_reserved_ids_come_from_the_sequence(db_session):
+    if db_session.get_bind().dialect.name != "postgresql":
+        pytest.skip("SQLite has no sequence; in group mode every insert takes its ID from the writer")
+    # A row written with an id_allocations ID, above where the sequence stands.
+    legacy = db_session.scalar(select(func.coalesce(func.max(GateLog.id), 0))) + 100
+    db_session.add(GateLog(id=legacy, request_summary="legacy", decision="proceed"))
+    db_session.commit()
+
+    logs = IdBlockAllocator(sessionmaker(bind=db_session.get_bind()), GateLog, block_size=5)
+    reserved = [logs.next_id() for _ in range(3)]
+    plain = TraceRecord(
+        log={"request_summary": "plain", "decision": "proceed"}, trace={"request_text": "plain", "decision": "proceed"}
+    )
+    write_records(db_session, [plain])
+    db_session.commit()
+
+    assert min(reserved) > legacy
+    assert plain.log["id"] > max(reserved) + 2  # past the whole block, used or not
+
+
+def test_migrate_adds_missing_columns_tables_and_indexes(tmp_path):
+    bind = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=bind)
+    with bind.begin() as conn:
+        conn.execute(text("DROP INDEX ix_decision_traces_manifest_hash"))
+        conn.execute(text("ALTER TABLE decision_traces DROP COLUMN manifest_hash"))
+        conn.execute(text("ALTER TABLE decision_traces DROP COLUMN override_reason"))
+        conn.execute(text("ALTER TABLE decision_traces DROP COLUMN trace_tier"))
+        conn.execute(text("DROP TABLE anchor_manifests"))
+
+    migrate = _load_migrate()
+    applied = migrate.migrate(bind)
+    assert "create table anchor_manifests" in applied
+    assert "add column decision_traces.manifest_hash" in applied
+    assert "add column decision_traces.override_reason" in applied
+    assert "add column decision_traces.trace_tier" in applied
+    assert "create index ix_decision_traces_manifest_hash" in applied
+
+    columns = {c["name"] for c in inspect(bind).get_columns("decision_traces")}
+    assert {"manifest_hash", "override_reason", "trace_tier"} <= columns
+    assert migrate.migrate(bind) == []
+    bind.dispose()
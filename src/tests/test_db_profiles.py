@@ -0,0 +1,57 @@
+"""
+Tests for SQLite storage profiles (app.db_profiles).
+"""
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.db_profiles import PROFILES, storage_profile
+
+
+def _engine(tmp_path, name):
+    profile = storage_profile(name)
+    engine = create_engine(
+        profile.url((tmp_path / "sw.db").as_posix()),
+        connect_args={"check_same_thread": False},
+        **profile.engine_kwargs(),
+    )
+    profile.install(engine)
+    return engine
+
+
+def _pragma(conn, name):
+    return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError, match="throughput"):
+        storage_profile("fast")
+
+
+@pytest.mark.parametrize("name, synchronous", [("throughput", 1), ("durable", 2)])
+def test_write_profiles_apply_pragmas_on_every_connection(tmp_path, name, synchronous):
+    engine = _engine(tmp_path, name)
+    pragmas = dict(PROFILES[name].pragmas)
+    with engine.connect() as a, engine.connect() as b:
+        for conn in (a, b):
+            assert _pragma(conn, "journal_mode") == "wal"
+            assert _pragma(conn, "synchronous") == synchronous
+            assert _pragma(conn, "cache_size") == int(pragmas["cache_size"])
+            assert _pragma(conn, "busy_timeout") == int(pragmas["busy_timeout"])
+    engine.dispose()
+
+
+def test_readonly_profile_refuses_writes(tmp_path):
+    writer = _engine(tmp_path, "throughput")
+    with writer.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+
+    reader = _engine(tmp_path, "readonly-analytics")
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT x FROM t")).scalar() == 1
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO t VALUES (2)"))
+    reader.dispose()
+    writer.dispose()
@@ -0,0 +1,91 @@
+"""
+Tests for the evaluate decision cache.
+The route function is called directly, so no auth headers are involved.
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Response
+
+import app.api.gate as gate
+from app.anchor_generation import bump_anchor_generation
+from app.decision_cache import DecisionCache
+from app.models import DecisionTrace, TruthAnchor
+from app.schemas import GateEvaluateIn
+
+
+class TestDecisionCache:
+    def test_disabled_by_default(self):
+        cache = DecisionCache()
+        cache.put("k", 1)
+        assert cache.get("k") is None and len(cache) == 0
+
+    def test_lru_eviction(self):
+        cache = DecisionCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+
+    def test_ttl_expiry(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr("app.decision_cache.time.monotonic", lambda: now[0])
+        cache = DecisionCache(max_entries=4, ttl_s=5)
+        cache.put("a", 1)
+        now[0] += 4.9
+        assert cache.get("a") == 1
+        now[0] += 0.2
+        assert cache.get("a") is None
+
+    def test_invalidate_bumps_generation(self):
+        cache = DecisionCache(max_entries=4)
+        cache.put("a", 1)
+        gen = cache.generation
+        cache.invalidate()
+        assert cache.generation == gen + 1
+        assert cache.get("a") is None
+
+
+@pytest.fixture()
+def cache(monkeypatch):
+    c = DecisionCache(max_entries=16)
+    monkeypatch.setattr(gate, "decision_cache", c)
+    return c
+
+
+def _evaluate(db, text):
+    out = gate.evaluate(GateEvaluateIn(request_summary=text), Response(), db=db, tenant=SimpleNamespace(id=1))
+    trace = db.get(DecisionTrace, out.trace_id)
+    return out, json.loads(trace.match_debug_json)
+
+
+def test_repeat_request_hits_cache_and_still_writes_trace(db_session, cache):
+    db_session.add(TruthAnchor(level=3, statement="Never wire funds offshore", scope="payments"))
+    db_session.commit()
+
+    first, debug1 = _evaluate(db_session, "Please wire funds offshore")
+    second, debug2 = _evaluate(db_session, "  please WIRE funds   offshore ")
+
+    assert debug1["cache_hit"] is False and debug2["cache_hit"] is True
+    assert second.trace_id != first.trace_id and second.log_id != first.log_id
+    assert second.model_dump(exclude={"trace_id", "log_id"}) == first.model_dump(exclude={"trace_id", "log_id"})
+
+
+def test_generation_bump_invalidates(db_session, cache):
+    text = "schedule a purge of customer archives"
+    before, _ = _evaluate(db_session, text)
+
+    anchor = TruthAnchor(level=3, statement="Never purge customer archives", scope="ops")
+    db_session.add(anchor)
+    bump_anchor_generation(db_session, anchor.tenant_id)
+    db_session.commit()
+
+    after, debug = _evaluate(db_session, text)
+    assert debug["cache_hit"] is False
+    assert after.anchor_generation == before.anchor_generation + 1
+    assert anchor.id in after.conflicted_anchor_ids
+    assert anchor.id not in before.conflicted_anchor_ids
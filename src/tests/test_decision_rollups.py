@@ -0,0 +1,103 @@
+"""
+Tests for the time-bucketed decision rollups and /insight/timeseries.
+Traces are written in 2001, one day per test, so no other test's rows
+fall in the windows read.
+"""
+
+import itertools
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+import app.api.insight as insight
+from app.decision_rollups import bucket_start, rebuild
+from app.models import DecisionRollup
+from app.trace_writer import TraceRecord, write_records
+
+T0 = datetime(2001, 2, 3, 10, 0, tzinfo=timezone.utc)
+TENANT = SimpleNamespace(id=1)
+_days = itertools.count()
+
+
+def _record(t0: datetime, minutes: float, decision: str, would_block: bool = False, tenant_id: int = 1) -> TraceRecord:
+    at = t0 + timedelta(minutes=minutes)
+    return TraceRecord(
+        log={"created_at": at, "request_summary": "r", "decision": decision, "tenant_id": tenant_id},
+        trace={"created_at": at, "request_text": "r", "decision": decision, "reason": "x", "tenant_id": tenant_id,
+               "would_block": would_block, "enforcement_mode_snapshot": "shadow" if would_block else "hard"},
+    )
+
+
+def _window(db, t0: datetime) -> list[tuple]:
+    day = bucket_start(t0, "day")
+    rows = db.scalars(
+        select(DecisionRollup)
+        .where(DecisionRollup.bucket_start >= day, DecisionRollup.bucket_start < day + timedelta(days=1))
+    )
+    return sorted((r.granularity, r.bucket_start, r.tenant_id, r.profile_id, r.decision, r.reason,
+                   r.enforcement_mode, r.decisions, r.would_block) for r in rows)
+
+
+@pytest.fixture()
+def t0(db_session):
+    """A day of its own, with four traces written from 10:00."""
+    t0 = T0 + timedelta(days=next(_days))
+    records = [_record(t0, 0.5, "gate"), _record(t0, 1, "proceed", would_block=True), _record(t0, 1.5, "proceed"),
+               _record(t0, 75, "refuse")]
+    write_records(db_session, records)
+    db_session.commit()
+    return t0
+
+
+def test_bucket_start():
+    at = datetime(2001, 2, 3, 10, 17, 42, 5)
+    assert bucket_start(at, "minute") == datetime(2001, 2, 3, 10, 17)
+    assert bucket_start(at, "hour") == datetime(2001, 2, 3, 10)
+    assert bucket_start(at.replace(tzinfo=timezone.utc), "day") == datetime(2001, 2, 3)
+
+
+def test_hourly_timeseries_reads_rollups(db_session, t0):
+    out = insight.timeseries(bucket="hour", start=t0, end=t0 + timedelta(hours=3), profile_id=None,
+                             db=db_session, tenant=TENANT)
+    assert [p.total for p in out.points] == [3, 1, 0]
+    first = out.points[0]
+    assert (first.gate, first.proceed, first.would_block) == (1, 2, 1)
+    assert first.gate_pct == 33.3 and first.would_block_pct == 33.3
+    assert out.points[1].refuse_pct == 100.0
+
+    minutes = insight.timeseries(bucket="minute", start=t0, end=t0 + timedelta(minutes=2), profile_id=None,
+                                 db=db_session, tenant=TENANT)
+    assert [p.total for p in minutes.points] == [1, 2]
+
+
+def test_timeseries_counts_only_the_tenants_decisions(db_session, t0):
+    write_records(db_session, [_record(t0, 2, "refuse", tenant_id=2), _record(t0, 3, "refuse", tenant_id=2)])
+    db_session.commit()
+
+    def totals(tenant_id):
+        out = insight.timeseries(bucket="hour", start=t0, end=t0 + timedelta(hours=1), profile_id=None,
+                                 db=db_session, tenant=SimpleNamespace(id=tenant_id))
+        return [(p.total, p.refuse) for p in out.points]
+
+    assert totals(1) == [(3, 0)]
+    assert totals(2) == [(2, 2)]
+    assert totals(3) == [(0, 0)]
+
+
+def test_rebuild_matches_write_time_rollups(db_session, t0):
+    live = _window(db_session, t0)
+    assert {r[0] for r in live} == {"minute", "hour", "day"}
+    rebuild(db_session)
+    assert _window(db_session, t0) == live
+
+
+def test_range_limits(db_session):
+    with pytest.raises(HTTPException) as exc:
+        insight.timeseries(bucket="minute", start=T0, end=T0 + timedelta(days=30), profile_id=None,
+                           db=db_session, tenant=TENANT)
+    assert exc.value.status_code == 422
+    with pytest.raises(HTTPException):
+        insight.timeseries(bucket="hour", start=T0, end=T0, profile_id=None, db=db_session, tenant=TENANT)
@@ -0,0 +1,116 @@
+"""
+Unit tests for request-embedding micro-batching.
+The encoder is a plain function; no numpy or model needed.
+"""
+
+import threading
+
+import pytest
+
+from app.embedding_batcher import EmbeddingBatcher
+
+
+def test_concurrent_callers_share_one_encode_call():
+    calls: list = []
+    release = threading.Event()
+
+    def encode(texts):
+        calls.append(list(texts))
+        release.wait(timeout=5)
+        return [f"vec:{t}" for t in texts]
+
+    batcher = EmbeddingBatcher(encode, max_wait_ms=50, max_batch=8)
+    results: dict = {}
+
+    def call(text):
+        results[text] = batcher.encode_one(text)
+
+    threads = [threading.Thread(target=call, args=(f"req {i}",)) for i in range(5)]
+    for t in threads:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join(timeout=5)
+
+    assert results == {f"req {i}": f"vec:req {i}" for i in range(5)}
+    assert sum(len(c) for c in calls) == 5
+    assert len(calls) < 5
+
+    stats = batcher.stats()
+    assert stats["items"] == 5
+    assert stats["batches"] == len(calls)
+    assert stats["max_batch_size"] == max(len(c) for c in calls)
+    assert stats["max_queue_wait_ms"] >= stats["mean_queue_wait_ms"] >= 0
+
+
+def test_batch_size_is_capped():
+    calls: list = []
+    gate = threading.Event()
+
+    def encode(texts):
+        calls.append(len(texts))
+        gate.wait(timeout=5)
+        return list(texts)
+
+    batcher = EmbeddingBatcher(encode, max_wait_ms=50, max_batch=2)
+    threads = [threading.Thread(target=batcher.encode_one, args=(str(i),)) for i in range(6)]
+    for t in threads:
+        t.start()
+    gate.set()
+    for t in threads:
+        t.join(timeout=5)
+
+    assert sum(calls) == 6
+    assert max(calls) <= 2
+
+
+def test_encoder_errors_reach_every_caller():
+    def encode(texts):
+        raise RuntimeError("model unavailable")
+
+    batcher = EmbeddingBatcher(encode, max_wait_ms=0)
+    with pytest.raises(RuntimeError, match="model unavailable"):
+        batcher.encode_one("hello")
+    # The worker survives and keeps serving.
+    with pytest.raises(RuntimeError):
+        batcher.encode_one("again")
+
+
+def test_short_encoder_output_fails_every_caller():
+    gate = threading.Event()
+
+    def encode(texts):
+        gate.wait(timeout=5)
+        return list(texts)[:-1]
+
+    batcher = EmbeddingBatcher(encode, max_wait_ms=50, max_batch=4, timeout_s=5)
+    errors: list = []
+
+    def call(text):
+        try:
+            batcher.encode_one(text)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call, args=(str(i),)) for i in range(3)]
+    for t in threads:
+        t.start()
+    gate.set()
+    for t in threads:
+        t.join(timeout=5)
+
+    assert not any(t.is_alive() for t in threads)
+    assert len(errors) == 3 and all("vectors for" in e for e in errors)
+
+
+def test_callers_give_up_after_the_timeout():
+    release = threading.Event()
+
+    def encode(texts):
+        release.wait(timeout=5)
+        return list(texts)
+
+    batcher = EmbeddingBatcher(encode, max_wait_ms=0, timeout_s=0.05)
+    with pytest.raises(TimeoutError):
+        batcher.encode_one("stuck")
+    release.set()
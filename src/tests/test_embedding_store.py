@@ -0,0 +1,184 @@
+"""
+Unit tests for the persistent anchor embedding matrix.
+Uses a deterministic stand-in encoder; no sentence-transformers needed.
+"""
+
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import app.embedding_matcher as em
+from app.models import TruthAnchor
+
+
+def _fake_encoder(calls: list):
+    def encode(texts):
+        calls.append(list(texts))
+        out = []
+        for t in texts:
+            rng = np.random.default_rng(sum(t.encode("utf-8")))
+            v = rng.normal(size=8).astype(np.float32)
+            out.append(v / np.linalg.norm(v))
+        return np.stack(out)
+    return encode
+
+
+def _anchor(id: int, statement: str) -> TruthAnchor:
+    return TruthAnchor(id=id, level=2, statement=statement, scope="global", active=True)
+
+
+@pytest.fixture()
+def store(tmp_path, monkeypatch):
+    calls: list = []
+    monkeypatch.setattr(em, "compute_embeddings", _fake_encoder(calls))
+    s = em.AnchorEmbeddingStore(path=tmp_path / "sw.embeddings.npz")
+    monkeypatch.setattr(em, "embedding_store", s)
+    return s, calls
+
+
+def test_anchors_encoded_once_and_request_only_after(store):
+    s, calls = store
+    anchors = [_anchor(1, "never share passwords"), _anchor(2, "refunds need review")]
+
+    em.find_conflicts_embedding("share my password", anchors, threshold=-1.0)
+    assert calls == [["never share passwords", "refunds need review"], ["share my password"]]
+
+    calls.clear()
+    scored = em.find_conflicts_embedding("share my password", anchors, threshold=-1.0)
+    assert calls == [["share my password"]]
+
+    req = _fake_encoder([])(["share my password"])[0]
+    expected = {a.id: float(_fake_encoder([])([a.statement])[0] @ req) for a in anchors}
+    assert {a.id: pytest.approx(score) for a, score in scored} == expected
+
+
+def test_matrix_persists_and_discard_drops_rows(store, tmp_path):
+    s, calls = store
+    a, b = _anchor(1, "never share passwords"), _anchor(2, "refunds need review")
+    s.lookup([a, b])
+
+    reloaded = em.AnchorEmbeddingStore(path=tmp_path / "sw.embeddings.npz")
+    calls.clear()
+    matrix, rows, _ann = reloaded.lookup([b, a])
+    assert calls == []
+    assert matrix.shape == (2, 8) and sorted(rows) == [0, 1]
+
+    reloaded.discard(a.stable_hash())
+    assert len(reloaded) == 1
+    assert len(em.AnchorEmbeddingStore(path=tmp_path / "sw.embeddings.npz")) == 1
+
+
+def test_candidate_subsets_are_scored_exactly_without_ann(store, monkeypatch):
+    s, _calls = store
+    from app.ann_index import IVFIndex
+
+    monkeypatch.setenv("SW_EMBEDDING_INDEX", "ivf")
+    monkeypatch.setenv("SW_ANN_MIN_ANCHORS", "8")
+    anchors = [_anchor(i, f"policy statement number {i}") for i in range(1, 41)]
+    assert s.lookup(anchors)[2] is not None
+
+    def no_ann(*_args, **_kwargs):
+        raise AssertionError("a small candidate subset went through the IVF index")
+
+    monkeypatch.setattr(IVFIndex, "search", no_ann)
+    subset = anchors[:3]
+    scored = em.find_conflicts_embedding("share my password", subset, threshold=-1.0)
+
+    req = _fake_encoder([])(["share my password"])[0]
+    expected = {a.id: float(_fake_encoder([])([a.statement])[0] @ req) for a in subset}
+    assert {a.id: pytest.approx(score) for a, score in scored} == expected
+
+
+def test_cascade_keeps_the_store_current(store, monkeypatch):
+    s, _calls = store
+    monkeypatch.setenv("SW_MATCHER", "cascade")
+    a = _anchor(1, "never share passwords")
+
+    em.store_anchor(a)
+    assert len(s) == 1
+    em.forget_anchor(a.stable_hash())
+    assert len(s) == 0
+
+
+def test_cascade_anchor_writes_survive_a_missing_model(store, monkeypatch):
+    def unavailable(texts):
+        raise ImportError("sentence-transformers not installed")
+
+    monkeypatch.setattr(em, "compute_embeddings", unavailable)
+    monkeypatch.setenv("SW_MATCHER", "cascade")
+    em.store_anchor(_anchor(1, "never share passwords"))
+
+    monkeypatch.setenv("SW_MATCHER", "embedding")
+    with pytest.raises(ImportError):
+        em.store_anchor(_anchor(1, "never share passwords"))
+
+
+def test_writes_append_to_the_log_until_a_checkpoint(store, tmp_path):
+    s, calls = store
+    path = tmp_path / "sw.embeddings.npz"
+    a, b, c = _anchor(1, "never share passwords"), _anchor(2, "refunds need review"), _anchor(3, "keep it short")
+    s.lookup([a, b])
+    s.checkpoint()
+    snapshot = path.read_bytes()
+
+    s.add(c)
+    s.discard(a.stable_hash())
+    assert path.read_bytes() == snapshot  # the snapshot is not rewritten per write
+    assert s.log_path.stat().st_size > len(em._log_header())
+
+    calls.clear()
+    reloaded = em.AnchorEmbeddingStore(path=path)
+    matrix, rows, _ann = reloaded.lookup([b, c])
+    assert calls == [] and len(reloaded) == 2
+    np.testing.assert_allclose(matrix[rows], _fake_encoder([])([b.statement, c.statement]))
+
+    reloaded.checkpoint()
+    assert reloaded.log_path.read_bytes() == em._log_header()
+    assert len(em.AnchorEmbeddingStore(path=path)) == 2
+
+
+def test_torn_log_record_is_dropped(store, tmp_path):
+    s, _calls = store
+    a, b = _anchor(1, "never share passwords"), _anchor(2, "refunds need review")
+    s.add(a)
+    s.add(b)
+    data = s.log_path.read_bytes()
+    s.log_path.write_bytes(data[:-5])
+
+    reloaded = em.AnchorEmbeddingStore(path=tmp_path / "sw.embeddings.npz")
+    assert len(reloaded) == 1
+    reloaded.add(b)
+    assert len(em.AnchorEmbeddingStore(path=tmp_path / "sw.embeddings.npz")) == 2
+
+
+def test_long_logs_are_checkpointed_in_the_background(store, tmp_path):
+    s, _calls = store
+    s.checkpoint_rows = 3
+    for i in range(1, 5):
+        s.add(_anchor(i, f"statement {i}"))
+    for _ in range(100):
+        if not s._checkpointing:
+            break
+        time.sleep(0.01)
+    assert (tmp_path / "sw.embeddings.npz").exists()
+    assert len(em.AnchorEmbeddingStore(path=tmp_path / "sw.embeddings.npz")) == 4
+
+
+def test_private_stores_touch_no_files(store, tmp_path):
+    shared, calls = store
+    a, b = _anchor(1, "never share passwords"), _anchor(2, "refunds need review")
+    shared.lookup([a])
+    calls.clear()
+
+    private = em.AnchorEmbeddingStore(path=tmp_path / "sw.embeddings.npz", persist=False)
+    assert len(private) == 0  # the shared files are not read
+    private.put(*shared.vectors([a.stable_hash(), b.stable_hash()]))
+    private.lookup([a, b])
+    assert calls == [["refunds need review"]]
+    private.discard(a.stable_hash())
+    private.checkpoint()
+
+    assert not (tmp_path / "sw.embeddings.npz").exists()
+    assert em.AnchorEmbeddingStore(path=tmp_path / "sw.embeddings.npz").vectors([b.stable_hash()]) == ([], None)
@@ -0,0 +1,118 @@
+"""
+Tests for /gate/evaluate/batch.
+The route functions are called directly, so no auth headers are involved.
+"""
+
+import json
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+import app.api.gate as gate
+from app.decision_cache import DecisionCache
+from app.models import DecisionTrace, DecisionTraceAnchor, GateLog, TruthAnchor
+from app.schemas import GateEvaluateBatchIn, GateEvaluateIn
+from app.trace_writer import TraceWriter
+
+TEXTS = [
+    "Please wire funds offshore today",
+    "what's the weather like",
+    "do delete production database",
+    "Approve refund of £12000 for customer",
+]
+
+
+@pytest.fixture()
+def anchors(db_session, tenant):
+    rows = [
+        TruthAnchor(level=3, statement="Never wire funds offshore", scope="payments", tenant_id=tenant.id),
+        TruthAnchor(level=2, statement="do not delete production database", scope="ops", tenant_id=tenant.id),
+        TruthAnchor(level=3, statement="Do not approve refunds above £10000 without manual review",
+                    scope="payments.refunds", tenant_id=tenant.id),
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return rows
+
+
+def _count(db, model) -> int:
+    return db.scalar(select(func.count()).select_from(model))
+
+
+def _snapshots(db, trace_id):
+    rows = db.scalars(select(DecisionTraceAnchor).where(DecisionTraceAnchor.trace_id == trace_id))
+    return sorted((r.anchor_id, r.anchor_hash) for r in rows)
+
+
+def test_batch_items_match_single_calls(db_session, tenant, anchors):
+    singles = [
+        gate.evaluate(GateEvaluateIn(request_summary=t), Response(), db=db_session, tenant=tenant) for t in TEXTS
+    ]
+    response = Response()
+    batch = gate.evaluate_batch(
+        GateEvaluateBatchIn(items=[GateEvaluateIn(request_summary=t) for t in TEXTS]),
+        response,
+        db=db_session,
+        tenant=tenant,
+    )
+
+    assert response.headers["ETag"] == f'"anchors-{batch.anchor_generation}"'
+    assert [bool(o.conflicted_anchor_ids) for o in batch.items] == [True, False, True, True]
+    for single, item in zip(singles, batch.items):
+        assert item.model_dump(exclude={"trace_id", "log_id"}) == single.model_dump(exclude={"trace_id", "log_id"})
+        assert _snapshots(db_session, item.trace_id) == _snapshots(db_session, single.trace_id)
+        a, b = db_session.get(DecisionTrace, single.trace_id), db_session.get(DecisionTrace, item.trace_id)
+        assert (a.decision, a.reason, a.manifest_hash) == (b.decision, b.reason, b.manifest_hash)
+        assert json.loads(a.match_debug_json) == json.loads(b.match_debug_json)
+
+
+def test_repeat_within_batch_is_a_cache_hit(db_session, tenant, anchors, monkeypatch):
+    monkeypatch.setattr(gate, "decision_cache", DecisionCache(max_entries=16))
+    items = [GateEvaluateIn(request_summary=t) for t in ("wire funds offshore", "  WIRE funds offshore ")]
+    out = gate.evaluate_batch(GateEvaluateBatchIn(items=items), Response(), db=db_session, tenant=tenant)
+
+    hits = [json.loads(db_session.get(DecisionTrace, o.trace_id).match_debug_json)["cache_hit"] for o in out.items]
+    assert hits == [False, True]
+    assert out.items[0].trace_id != out.items[1].trace_id
+
+
+def test_oversized_batch_is_rejected(db_session, tenant, monkeypatch):
+    monkeypatch.setattr(gate, "BATCH_MAX_ITEMS", 2)
+    payload = GateEvaluateBatchIn(items=[GateEvaluateIn(request_summary=t) for t in TEXTS[:3]])
+    with pytest.raises(HTTPException) as exc:
+        gate.evaluate_batch(payload, Response(), db=db_session, tenant=tenant)
+    assert exc.value.status_code == 413
+
+
+def test_failed_write_rolls_back_the_whole_batch(db_session, tenant, anchors, monkeypatch):
+    before = (_count(db_session, GateLog), _count(db_session, DecisionTrace))
+    real_write = gate.write_records
+
+    def write_then_fail(db, records):
+        real_write(db, records)
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(gate, "write_records", write_then_fail)
+    payload = GateEvaluateBatchIn(items=[GateEvaluateIn(request_summary=t) for t in TEXTS])
+    with pytest.raises(RuntimeError):
+        gate.evaluate_batch(payload, Response(), db=db_session, tenant=tenant)
+
+    assert (_count(db_session, GateLog), _count(db_session, DecisionTrace)) == before
+
+
+def test_group_mode_takes_ids_from_the_writer(db_session, tenant, anchors, monkeypatch, tmp_path):
+    session_factory = sessionmaker(bind=db_session.get_bind(), autoflush=False)
+    writer = TraceWriter(session_factory, spool_path=tmp_path / "spool.jsonl", id_block=8)
+    monkeypatch.setattr(gate, "trace_writer_enabled", lambda: True)
+    monkeypatch.setattr(gate, "get_trace_writer", lambda: writer)
+
+    payload = GateEvaluateBatchIn(items=[GateEvaluateIn(request_summary=t) for t in TEXTS])
+    out = gate.evaluate_batch(payload, Response(), db=db_session, tenant=tenant)
+
+    log_ids = [o.log_id for o in out.items]
+    assert log_ids == sorted(log_ids) and len(set(log_ids)) == len(TEXTS)
+    # The next ID the writer hands out follows the batch's block.
+    assert writer.assign_ids(gate.TraceRecord(log={}, trace={})).log["id"] == log_ids[-1] + 1
+    assert all(db_session.get(GateLog, i) is not None for i in log_ids)
@@ -0,0 +1,87 @@
+"""
+Tests for the side-effect-free /gate/check fast path.
+The route functions are called directly, so no auth headers are involved.
+"""
+
+import uuid
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import func, select
+
+import app.api.gate as gate
+from app.latency_budget import LatencyBudget
+from app.models import AnchorManifest, DecisionTrace, DecisionTraceAnchor, GateLog, PolicyProfile, TruthAnchor
+from app.schemas import GateEvaluateIn
+
+WRITTEN = (GateLog, DecisionTrace, DecisionTraceAnchor, AnchorManifest)
+
+
+@pytest.fixture()
+def anchors(db_session, tenant):
+    rows = [
+        TruthAnchor(level=3, statement="Never wire funds offshore", scope="payments", tenant_id=tenant.id),
+        TruthAnchor(level=3, statement="Never move funds offshore", scope="payments", tenant_id=tenant.id),
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return rows
+
+
+@pytest.fixture()
+def budget(monkeypatch):
+    b = LatencyBudget(budget_ms=1000, window=16)
+    monkeypatch.setattr(gate, "check_budget", b)
+    return b
+
+
+def _counts(db):
+    return [db.scalar(select(func.count()).select_from(m)) for m in WRITTEN]
+
+
+def test_check_matches_evaluate_and_writes_nothing(db_session, tenant, anchors, budget):
+    payload = GateEvaluateIn(request_summary="please wire funds offshore")
+    before = _counts(db_session)
+    response = Response()
+    checked = gate.check(payload, response, db=db_session, tenant=tenant)
+
+    assert _counts(db_session) == before
+    assert checked.auditable is False
+    assert response.headers["X-SignalWeaver-Auditable"] == "false"
+    assert response.headers["Server-Timing"].startswith("check;dur=")
+    assert budget.count == 1
+
+    evaluated = gate.evaluate(payload, Response(), db=db_session, tenant=tenant)
+    assert (checked.decision, checked.reason) == (evaluated.decision, evaluated.reason)
+    assert checked.conflicted_anchor_ids == evaluated.conflicted_anchor_ids
+    assert checked.anchor_generation == evaluated.anchor_generation
+    assert checked.enforcement_mode is None
+
+
+def test_profile_enforcement_mode_is_applied(db_session, tenant, anchors, budget):
+    profile = PolicyProfile(name=f"shadow-{uuid.uuid4().hex[:8]}", enforcement_mode="shadow", tenant_id=tenant.id)
+    db_session.add(profile)
+    db_session.commit()
+
+    payload = GateEvaluateIn(request_summary="please wire funds offshore", profile_id=profile.id)
+    out = gate.check(payload, Response(), db=db_session, tenant=tenant)
+    assert out.decision == "proceed" and out.reason == "shadow_mode_observe_only"
+    assert out.would_block is True and out.enforcement_mode == "shadow"
+
+
+def test_unknown_profile_is_404(db_session, tenant, budget):
+    payload = GateEvaluateIn(request_summary="anything", profile_id=987654)
+    with pytest.raises(HTTPException) as exc:
+        gate.check(payload, Response(), db=db_session, tenant=tenant)
+    assert exc.value.status_code == 404
+
+
+def test_latency_budget_percentiles():
+    b = LatencyBudget(budget_ms=10, window=100)
+    for ms in range(1, 101):
+        b.record(ms * 0.1)
+    assert b.record(50) is False
+    s = b.stats()
+    assert s["count"] == 101 and s["over_budget"] == 1
+    assert s["p50_ms"] == pytest.approx(5.2) and s["p99_ms"] == 50
+    assert s["p99_within_budget"] is False
@@ -0,0 +1,99 @@
+"""
+Tests for gate_log_anchors: written with each gate log, backfilled from the
+legacy comma-joined column, and read by /gate/logs and (via the counters
+kept alongside them) the insight routes.
+"""
+
+import uuid
+
+import pytest
+from fastapi import Response
+from sqlalchemy import select
+
+import app.api.gate as gate
+import app.api.insight as insight
+from app.anchor_counters import count_logs
+from app.gate_log_anchors import anchor_ids_by_log, backfill, legacy_id_list
+from app.models import GateLog, GateLogAnchor, TruthAnchor
+from app.schemas import GateEvaluateIn
+
+
+@pytest.fixture()
+def anchors(db_session, tenant):
+    tag = uuid.uuid4().hex[:8]
+    rows = [
+        TruthAnchor(level=3, statement=f"Never wire funds offshore {tag}", scope="payments", tenant_id=tenant.id),
+        TruthAnchor(level=2, statement=f"Never move funds offshore {tag}", scope="payments", tenant_id=tenant.id),
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return rows
+
+
+def _links(db, log_id: int) -> list[tuple[int, int | None]]:
+    return list(db.execute(
+        select(GateLogAnchor.anchor_id, GateLogAnchor.level)
+        .where(GateLogAnchor.log_id == log_id)
+        .order_by(GateLogAnchor.anchor_id)
+    ).tuples())
+
+
+def test_evaluate_links_conflicted_anchors(db_session, tenant, anchors):
+    out = gate.evaluate(GateEvaluateIn(request_summary="please wire funds offshore"), Response(),
+                        db=db_session, tenant=tenant)
+    expected = sorted((w.id, w.level) for w in out.warning_anchors)
+    assert {a.id for a in anchors} <= set(out.conflicted_anchor_ids)
+    assert _links(db_session, out.log_id) == expected
+
+    listed = gate.list_gate_logs(limit=200, offset=0, decision=None, since=None, db=db_session)
+    item = next(i for i in listed.items if i.id == out.log_id)
+    assert sorted(item.conflicted_anchor_ids) == sorted(out.conflicted_anchor_ids)
+
+
+def test_legacy_column_is_cut_at_a_whole_id():
+    ids = list(range(100000, 100100))
+    joined = legacy_id_list(ids)
+    assert len(joined) <= 256
+    assert joined.split(",") == [str(i) for i in ids[: len(joined.split(","))]]
+    assert legacy_id_list([]) == ""
+
+
+def test_backfill_links_old_logs_once(db_session, anchors):
+    a, b = anchors
+    logs = [
+        GateLog(request_summary="old 1", decision="gate", conflicted_anchor_ids=f"{a.id},{b.id},{a.id}"),
+        GateLog(request_summary="old 2", decision="gate", conflicted_anchor_ids=f"{b.id}, 999999999"),
+        GateLog(request_summary="old 3", decision="proceed", conflicted_anchor_ids=""),
+    ]
+    db_session.add_all(logs)
+    db_session.commit()
+
+    assert anchor_ids_by_log(db_session, logs)[logs[1].id] == [b.id, 999999999]
+    backfill(db_session, chunk_size=1)
+    assert _links(db_session, logs[0].id) == sorted([(a.id, a.level), (b.id, b.level)])
+    assert _links(db_session, logs[1].id) == [(b.id, b.level), (999999999, None)]
+    assert _links(db_session, logs[2].id) == []
+    assert backfill(db_session) == 0
+
+
+def test_insight_aggregates_from_links(db_session, tenant, anchors):
+    a, b = anchors
+    logs = [
+        GateLog(request_summary="x", decision="gate" if reason == "needs_review" else "proceed", reason=reason,
+                tenant_id=tenant.id, anchors=[GateLogAnchor(anchor_id=a.id, level=a.level)])
+        for reason in ("needs_review", "needs_review", "needs_review", "proceed_acknowledged")
+    ]
+    db_session.add_all(logs)
+    db_session.flush()
+    count_logs(db_session, logs)
+    db_session.commit()
+
+    rates = {r.anchor_id: r for r in insight.override_rate(db=db_session, tenant=tenant)}
+    assert (rates[a.id].total_gates, rates[a.id].overrides, rates[a.id].override_rate) == (3, 1, 33.3)
+    assert b.id not in rates
+
+    appearances = {p.anchor_id: p.appearances for p in insight.participation(db=db_session, tenant=tenant)}
+    assert appearances[a.id] == 4
+
+    dead = {d.anchor_id for d in insight.dead_anchors(db=db_session, tenant=tenant)}
+    assert b.id in dead and a.id not in dead
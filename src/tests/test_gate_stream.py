@@ -0,0 +1,197 @@
+"""
+Tests for the NDJSON streaming endpoint /gate/evaluate/stream.
+"""
+
+import asyncio
+import json
+import tracemalloc
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from starlette.requests import ClientDisconnect
+
+import app.api.gate as gate
+import app.api.gate_stream as gate_stream
+from app.auth import get_tenant
+from app.db import get_db
+from app.models import DecisionTrace, TruthAnchor
+from app.schemas import GateEvaluateIn
+
+TEXTS = [
+    "Please wire funds offshore today",
+    "what's the weather like",
+    "do delete production database",
+]
+
+
+@pytest.fixture()
+def client(db_session, tenant):
+    db_session.add_all([
+        TruthAnchor(level=3, statement="Never wire funds offshore", scope="payments", tenant_id=tenant.id),
+        TruthAnchor(level=2, statement="do not delete production database", scope="ops", tenant_id=tenant.id),
+    ])
+    db_session.commit()
+
+    api = FastAPI()
+    api.include_router(gate_stream.router, prefix="/gate")
+    api.dependency_overrides[get_db] = lambda: db_session
+    api.dependency_overrides[get_tenant] = lambda: tenant
+    api.dependency_overrides[gate._rl] = lambda: None
+    with TestClient(api) as c:
+        yield c
+
+
+def _ndjson(*objs) -> bytes:
+    return b"".join((o if isinstance(o, str) else json.dumps(o)).encode() + b"\n" for o in objs)
+
+
+def _traces(db) -> int:
+    return db.scalar(select(func.count()).select_from(DecisionTrace))
+
+
+def test_stream_matches_single_calls(client, db_session, tenant):
+    singles = [
+        gate.evaluate(GateEvaluateIn(request_summary=t), Response(), db=db_session, tenant=tenant) for t in TEXTS
+    ]
+    before = _traces(db_session)
+    body = _ndjson({"request_summary": TEXTS[0]}, "", "{not json", {"request_summary": ""},
+                   {"request_summary": TEXTS[1]}, {"request_summary": TEXTS[2]})
+
+    r = client.post("/gate/evaluate/stream", content=body, params={"batch_size": 2})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    out = [json.loads(line) for line in r.text.splitlines()]
+
+    assert [o["line"] for o in out] == [1, 3, 4, 5, 6]
+    assert "error" in out[1] and "request_summary" in out[2]["error"]
+    scored = [o for o in out if "error" not in o]
+    for single, item in zip(singles, scored):
+        expected = single.model_dump(mode="json", exclude={"trace_id", "log_id"}, exclude_none=True)
+        assert {k: v for k, v in item.items() if k not in ("line", "trace_id", "log_id")} == expected
+    assert _traces(db_session) == before + 3
+    trace = db_session.get(DecisionTrace, scored[0]["trace_id"])
+    assert trace.decision == scored[0]["decision"] and trace.manifest_hash
+
+
+def test_persist_none_writes_nothing(client, db_session):
+    before = _traces(db_session)
+    r = client.post("/gate/evaluate/stream", content=_ndjson(*({"request_summary": t} for t in TEXTS)),
+                    params={"persist": "none"})
+    out = [json.loads(line) for line in r.text.splitlines()]
+    assert len(out) == 3
+    assert all("log_id" not in o and "trace_id" not in o for o in out)
+    assert _traces(db_session) == before
+
+
+def test_failed_write_ends_stream_with_error(client, db_session, monkeypatch):
+    calls = []
+
+    def fail_second(db, records):
+        calls.append(len(records))
+        if len(calls) == 2:
+            raise RuntimeError("disk full")
+        gate.write_records(db, records)
+
+    monkeypatch.setattr(gate_stream, "_write_batch", fail_second)
+    before = _traces(db_session)
+    r = client.post("/gate/evaluate/stream", content=_ndjson(*({"request_summary": t} for t in TEXTS)),
+                    params={"batch_size": 2})
+    out = [json.loads(line) for line in r.text.splitlines()]
+    assert [o["line"] for o in out] == [1, 2, 3]
+    assert "disk full" in out[-1]["error"]
+    assert _traces(db_session) == before + 2
+
+
+def test_lines_split_across_chunks():
+    async def chunks():
+        for part in (b'{"a": 1}\n{"b"', b': 2}\n', b'{"c": 3}'):
+            yield part
+
+    async def collect():
+        return [lines async for lines in gate_stream._ndjson_chunks(chunks())]
+
+    assert asyncio.run(collect()) == [[b'{"a": 1}'], [b'{"b": 2}'], [b'{"c": 3}']]
+
+
+def _split(*parts: bytes) -> list:
+    async def chunks():
+        for part in parts:
+            yield part
+
+    async def collect():
+        return [lines async for lines in gate_stream._ndjson_chunks(chunks())]
+
+    return asyncio.run(collect())
+
+
+def test_long_line_across_many_chunks():
+    line = b'{"request_summary": "' + b"x" * 5000 + b'"}'
+    parts = [line[i:i + 7] for i in range(0, len(line), 7)]
+    assert _split(*parts, b"\n{}") == [[line], [b"{}"]]
+
+
+def test_overlong_lines_get_an_error_line(monkeypatch, client):
+    monkeypatch.setattr(gate_stream, "MAX_LINE_BYTES", 8)
+    assert _split(b'{"a": 1}\n{"request_', b'summary": 1}\n{"b": 2}\n', b"0123456789") == [
+        [b'{"a": 1}'], [None, b'{"b": 2}'], [None]
+    ]
+
+    monkeypatch.setattr(gate_stream, "MAX_LINE_BYTES", 40)
+    r = client.post("/gate/evaluate/stream", params={"persist": "none"},
+                    content=_ndjson({"request_summary": "x" * 50}, {"request_summary": "hello"}))
+    out = [json.loads(line) for line in r.text.splitlines()]
+    assert out[0] == {"line": 1, "error": "line longer than 40 bytes"}
+    assert out[1]["line"] == 2 and out[1]["decision"]
+
+
+class _Upload:
+    """A request whose body arrives as `parts`; the client drops after them if `disconnect`."""
+
+    def __init__(self, *parts: bytes, disconnect: bool = False) -> None:
+        self.parts = parts
+        self.disconnect = disconnect
+
+    async def stream(self):
+        for part in self.parts:
+            yield part
+        if self.disconnect:
+            raise ClientDisconnect()
+
+
+def _stream(db, tenant, request) -> int:
+    """Run the route's body to the end without keeping it; the number of response lines."""
+    async def run():
+        response = await gate_stream.evaluate_stream(request, persist="batch", batch_size=500, db=db, tenant=tenant)
+        return sum([chunk.count(b"\n") async for chunk in response.body_iterator])
+
+    return asyncio.run(run())
+
+
+def test_memory_stays_flat_however_many_lines(db_session, tenant, monkeypatch):
+    db_session.add_all(
+        TruthAnchor(level=2, statement=f"Never wire funds offshore to vendor {i}", scope="payments", tenant_id=tenant.id)
+        for i in range(40)
+    )
+    db_session.commit()
+    monkeypatch.setattr(gate_stream, "MAX_CHUNK_CONFLICTS", 200)  # 5 of these lines per chunk
+
+    def peak(n: int) -> int:
+        upload = _Upload(_ndjson(*({"request_summary": f"{TEXTS[0]} {i}"} for i in range(n))))
+        tracemalloc.start()
+        try:
+            assert _stream(db_session, tenant, upload) == n
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    small, large = peak(40), peak(160)
+    assert large < 1.5 * small
+
+
+def test_client_disconnect_mid_upload_ends_the_stream(db_session, tenant):
+    before = _traces(db_session)
+    upload = _Upload(_ndjson(*({"request_summary": t} for t in TEXTS)), b'{"request_summ', disconnect=True)
+    assert _stream(db_session, tenant, upload) == len(TEXTS)
+    assert _traces(db_session) == before + len(TEXTS)
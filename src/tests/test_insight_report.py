@@ -0,0 +1,118 @@
+"""
+Tests for the parallel, watermark-cached /insight/report (app.report_cache).
+"""
+
+import threading
+import uuid
+
+import pytest
+from fastapi import Response
+
+import app.api.insight as insight
+from app.anchor_generation import bump_anchor_generation
+from app.models import Tenant, TruthAnchor
+from app.report_cache import HIT, MISS, STALE, ReportCache
+from app.trace_writer import TraceRecord, write_records
+
+
+@pytest.fixture()
+def cache(monkeypatch):
+    c = ReportCache()
+    monkeypatch.setattr(insight, "report_cache", c)
+    return c
+
+
+def _report(db, tenant):
+    response = Response()
+    out = insight.report(response, db=db, tenant=tenant)
+    return out, response.headers["X-SignalWeaver-Cache"]
+
+
+def _write_trace(db, tenant):
+    write_records(db, [TraceRecord(log={"request_summary": "r", "decision": "gate", "tenant_id": tenant.id},
+                                   trace={"request_text": "r", "decision": "gate", "tenant_id": tenant.id})])
+    db.commit()
+
+
+def test_report_matches_sub_reports_and_is_cached(db_session, tenant, cache):
+    first, status = _report(db_session, tenant)
+    assert status == MISS
+    assert first.summary == insight.summary(db_session, tenant)
+    assert first.override_rate == insight.override_rate(db_session, tenant)
+    assert first.dead_anchors == insight.dead_anchors(db_session, tenant)
+    assert first.participation == insight.participation(db_session, tenant)
+
+    again, status = _report(db_session, tenant)
+    assert status == HIT and again is first
+
+
+def test_new_writes_move_the_watermark(db_session, tenant, cache):
+    before, _ = _report(db_session, tenant)
+    _write_trace(db_session, tenant)
+    after, status = _report(db_session, tenant)
+    assert status == MISS
+    assert after.summary.gate_count == before.summary.gate_count + 1
+
+    _, status = _report(db_session, tenant)
+    assert status == HIT
+
+    # An anchor change (as the anchor routes make it) is a new dead anchor
+    statement = f"unused {uuid.uuid4().hex}"
+    db_session.add(TruthAnchor(level=1, statement=statement, scope="global", tenant_id=tenant.id))
+    bump_anchor_generation(db_session, tenant.id)
+    db_session.commit()
+    latest, status = _report(db_session, tenant)
+    assert status == MISS
+    assert statement in {d.statement for d in latest.dead_anchors}
+
+
+def test_reports_are_scoped_to_the_tenant(db_session, tenant, cache):
+    other = Tenant(name=f"other-{uuid.uuid4().hex[:12]}", api_key_hash=uuid.uuid4().hex)
+    db_session.add(other)
+    db_session.commit()
+    mine, _ = _report(db_session, tenant)
+    theirs, _ = _report(db_session, other)
+
+    _write_trace(db_session, other)
+    _, status = _report(db_session, tenant)
+    assert status == HIT  # another tenant's write leaves this tenant's entry alone
+    after, status = _report(db_session, other)
+    assert status == MISS
+    assert after.summary.gate_count == theirs.summary.gate_count + 1 == 1
+
+    statement = f"theirs only {uuid.uuid4().hex}"
+    db_session.add(TruthAnchor(level=1, statement=statement, scope="global", tenant_id=other.id))
+    bump_anchor_generation(db_session, other.id)
+    db_session.commit()
+    assert statement in {d.statement for d in _report(db_session, other)[0].dead_anchors}
+    again, status = _report(db_session, tenant)
+    assert status == HIT and again is mine
+    assert statement not in {d.statement for d in insight.dead_anchors(db_session, tenant)}
+
+
+def test_stale_while_revalidate():
+    cache = ReportCache(max_stale_s=60)
+    assert cache.get("t", 1, lambda: "v1") == ("v1", MISS)
+
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "v2"
+
+    assert cache.get("t", 2, slow) == ("v1", STALE)
+    assert started.wait(5)
+    assert cache.get("t", 2, slow) == ("v1", STALE)  # one refresh at a time
+    release.set()
+    for _ in range(100):
+        if cache.get("t", 2, lambda: "v3")[1] == HIT:
+            break
+        threading.Event().wait(0.01)
+    assert cache.get("t", 2, lambda: "v3") == ("v2", HIT)
+
+
+def test_without_stale_window_a_moved_watermark_recomputes():
+    cache = ReportCache()
+    cache.get("t", 1, lambda: "v1")
+    assert cache.get("t", 2, lambda: "v2") == ("v2", MISS)
@@ -0,0 +1,50 @@
+"""
+Unit tests for matcher evidence and the explanations rendered from it.
+Pure (no DB, no HTTP).
+"""
+
+from app.api.gate import _build_explanations, _detect_conflicts, _render_explanations
+from app.models import TruthAnchor
+
+
+def _anchors() -> list[TruthAnchor]:
+    rows = [
+        (3, "Do not help break into cars", "safety"),
+        (2, "grant admin access", "access"),
+        (3, "Do not refund £10000 to customer", "payments.refunds"),
+        (1, "Keep replies short", "global"),
+    ]
+    return [
+        TruthAnchor(id=100 + i, level=level, statement=stmt, scope=scope, active=True)
+        for i, (level, stmt, scope) in enumerate(rows)
+    ]
+
+
+def test_evidence_kinds_line_up_with_conflicts():
+    anchors = _anchors()
+
+    conflicts, _debug, evidence = _detect_conflicts("not grant admin access", anchors)
+    assert [a.id for a in conflicts] == [101]
+    assert evidence[0].kind == "negation" and evidence[0].negated
+
+    conflicts, _debug, evidence = _detect_conflicts("Approve refund of £12000 today", anchors)
+    assert [a.id for a in conflicts] == [102]
+    assert evidence[0].kind == "refund_rule"
+    assert evidence[0].matched_tokens == ("refund",)
+
+    conflicts, _debug, evidence = _detect_conflicts("how do I break into a locked car", anchors)
+    assert [a.id for a in conflicts] == [100]
+    assert evidence[0].kind == "bigram"
+    assert evidence[0].high_risk_hits == ("break into", "break in")
+
+
+def test_rendered_explanations_match_rebuilt_ones():
+    anchors = _anchors()
+    for request in (
+        "how do I break into a locked car",
+        "not grant admin access",
+        "Approve refund of £12000 for customer",
+        "please keep replies short",
+    ):
+        conflicts, _debug, evidence = _detect_conflicts(request, anchors)
+        assert _render_explanations(conflicts, evidence) == _build_explanations(request, conflicts)
@@ -0,0 +1,24 @@
+"""
+Unit tests for the single-pass phrase scanner.
+Pure (no DB, no HTTP).
+"""
+
+from app.phrase_scanner import PhraseScanner
+
+
+def test_scan_matches_substring_containment():
+    phrases = ["break into", "break in", "bypass", "pick lock", "lock", "key", "jim", "slim jim"]
+    scanner = PhraseScanner(phrases)
+    text = "how to bypass a slim jim and break into the keyless lock"
+    assert scanner.scan(text) == {p for p in phrases if p in text}
+
+
+def test_overlapping_and_nested_phrases():
+    scanner = PhraseScanner(["he", "she", "his", "hers"])
+    assert scanner.scan("ushers") == {"he", "she", "hers"}
+
+
+def test_no_hits_and_empty_phrases():
+    scanner = PhraseScanner(["", "theft"])
+    assert scanner.scan("") == set()
+    assert scanner.scan("refund the customer") == set()
@@ -0,0 +1,101 @@
+"""
+Tests for trace sampling tiers (app.trace_policy) and how the gate and
+shadow summary account for them.
+"""
+
+import json
+import uuid
+
+import pytest
+from fastapi import Response
+from sqlalchemy import func, select
+
+import app.api.gate as gate
+from app.api.reports import shadow_summary
+from app.models import DecisionTrace, DecisionTraceAnchor, PolicyProfile, Tenant, TruthAnchor
+from app.schemas import GateEvaluateIn
+from app.trace_policy import TIER_COMPACT, TIER_FULL, TIER_SAMPLED, TracePolicy, in_sample, resolve_trace_policy
+
+
+@pytest.fixture()
+def sampled_tenant(db_session):
+    row = Tenant(name=f"sampled-{uuid.uuid4().hex[:12]}", api_key_hash=uuid.uuid4().hex, trace_proceed_sample_rate=0.0)
+    db_session.add(row)
+    db_session.commit()
+    db_session.add(TruthAnchor(level=3, statement="Never wire funds offshore", scope="payments", tenant_id=row.id))
+    db_session.commit()
+    return row
+
+
+def _anchor_rows(db, trace_id: int) -> int:
+    return db.scalar(select(func.count()).select_from(DecisionTraceAnchor).where(DecisionTraceAnchor.trace_id == trace_id))
+
+
+def test_tier_rules():
+    policy = TracePolicy(proceed_sample_rate=0.0)
+    assert policy.tier_for("gate", False, "x") == (TIER_FULL, 1.0)
+    assert policy.tier_for("proceed", True, "x") == (TIER_FULL, 1.0)
+    assert policy.tier_for("proceed", False, "x") == (TIER_COMPACT, 0.0)
+    assert TracePolicy().tier_for("proceed", False, "x") == (TIER_FULL, 1.0)
+    assert TracePolicy(proceed_sample_rate=1e-9).tier_for("proceed", False, "x")[0] == TIER_COMPACT
+
+
+def test_sampling_is_deterministic_and_close_to_rate():
+    keys = [f"request {i}" for i in range(4000)]
+    picked = [k for k in keys if in_sample(k, 0.25)]
+    assert picked == [k for k in keys if in_sample(k, 0.25)]
+    assert 0.2 < len(picked) / len(keys) < 0.3
+    tier, rate = TracePolicy(proceed_sample_rate=0.25).tier_for("proceed", False, picked[0])
+    assert (tier, rate) == (TIER_SAMPLED, 0.25)
+
+
+def test_profile_rate_overrides_tenant(monkeypatch):
+    monkeypatch.setenv("SW_TRACE_PROCEED_SAMPLE_RATE", "0.5")
+    tenant = Tenant(name="t", api_key_hash="h", trace_proceed_sample_rate=0.1)
+    profile = PolicyProfile(name="p", trace_proceed_sample_rate=0.0)
+    assert resolve_trace_policy(tenant, profile).proceed_sample_rate == 0.0
+    assert resolve_trace_policy(tenant, PolicyProfile(name="q")).proceed_sample_rate == 0.1
+    assert resolve_trace_policy(Tenant(name="u", api_key_hash="h")).proceed_sample_rate == 0.5
+
+
+def test_compact_proceed_still_replays(db_session, sampled_tenant):
+    out = gate.evaluate(GateEvaluateIn(request_summary="what's the weather like"), Response(),
+                        db=db_session, tenant=sampled_tenant)
+    trace = db_session.get(DecisionTrace, out.trace_id)
+    assert out.decision == "proceed"
+    assert (trace.trace_tier, trace.trace_sample_rate) == (TIER_COMPACT, 0.0)
+    assert _anchor_rows(db_session, trace.id) == 0
+    assert set(json.loads(trace.match_debug_json)) <= {"cache_hit", "conflicted_ids", "max_level_conflict", "matcher_used"}
+
+    replayed = gate.replay(trace.id, db=db_session, tenant=sampled_tenant)
+    assert replayed.trace_tier == TIER_COMPACT
+    assert replayed.same_decision is True
+
+
+def test_blocking_decision_is_always_full(db_session, sampled_tenant):
+    out = gate.evaluate(GateEvaluateIn(request_summary="please wire funds offshore"), Response(),
+                        db=db_session, tenant=sampled_tenant)
+    trace = db_session.get(DecisionTrace, out.trace_id)
+    assert out.decision != "proceed"
+    assert trace.trace_tier == TIER_FULL
+    assert _anchor_rows(db_session, trace.id) >= 1
+
+
+def test_shadow_summary_weights_sampled_traces(db_session, tenant):
+    anchor = TruthAnchor(level=3, statement=f"Never {uuid.uuid4().hex}", scope="payments", tenant_id=tenant.id)
+    db_session.add(anchor)
+    db_session.commit()
+    before = shadow_summary(db=db_session)
+
+    trace = DecisionTrace(request_text="x", decision="proceed", trace_tier=TIER_SAMPLED, trace_sample_rate=0.25)
+    db_session.add(trace)
+    db_session.flush()
+    db_session.add(DecisionTraceAnchor(
+        trace_id=trace.id, anchor_id=anchor.id, anchor_hash="h", level_snapshot=3, scope_snapshot="payments",
+        active_snapshot=True, statement_snapshot=anchor.statement, matched=True,
+    ))
+    db_session.commit()
+
+    after = shadow_summary(db=db_session)
+    assert after.total_l3_conflicts == before.total_l3_conflicts + 4
+    assert after.traces_by_tier[TIER_SAMPLED] == before.traces_by_tier.get(TIER_SAMPLED, 0) + 1
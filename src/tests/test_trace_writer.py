@@ -0,0 +1,260 @@
+"""
+Tests for the group-commit trace writer.
+Each test gets its own file-backed SQLite DB and spool.
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+import app.api.gate as gate
+from app.models import Base, DecisionTrace, DecisionTraceAnchor, GateLog
+from app.schemas import GateEvaluateIn, GateReframeIn
+from app.trace_writer import (
+    IdBlockAllocator,
+    TraceAckTimeout,
+    TraceRecord,
+    TraceWriter,
+    _try_lock,
+    write_records,
+)
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'traces.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine, autoflush=False)
+    engine.dispose()
+
+
+def _record(i: int) -> TraceRecord:
+    return TraceRecord(
+        log={"request_summary": f"req {i}", "decision": "proceed"},
+        trace={"request_text": f"req {i}", "decision": "proceed"},
+        anchors=[{
+            "anchor_id": 1, "anchor_hash": "h", "statement_snapshot": "s", "scope_snapshot": "global",
+            "level_snapshot": 1, "active_snapshot": True, "matched": True,
+        }],
+    )
+
+
+def _count(sf, model) -> int:
+    with sf() as db:
+        return db.scalar(select(func.count()).select_from(model))
+
+
+def test_concurrent_submits_commit_in_batches(session_factory, tmp_path):
+    writer = TraceWriter(session_factory, spool_path=tmp_path / "spool.jsonl", batch_wait_ms=20, id_block=4)
+    results = {}
+
+    def submit(i):
+        results[i] = writer.submit(_record(i))
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    writer.close()
+
+    log_ids = sorted(r.log["id"] for r in results.values())
+    assert len(set(log_ids)) == 12
+    with session_factory() as db:
+        assert sorted(db.scalars(select(GateLog.id))) == log_ids
+        trace_ids = {r.trace["id"] for r in results.values()}
+        assert set(db.scalars(select(DecisionTraceAnchor.trace_id))) == trace_ids
+
+    stats = writer.stats()
+    assert stats["records"] == 12
+    assert stats["batches"] < 12
+    assert list(tmp_path.glob("spool.*")) == []
+
+
+def test_enqueue_ack_returns_ids_before_commit(session_factory, tmp_path):
+    writer = TraceWriter(session_factory, spool_path=tmp_path / "spool.jsonl", ack="enqueue")
+    record = writer.submit(_record(1))
+    assert record.log["id"] and record.trace["id"]
+    assert writer.flush(timeout=10)
+    writer.close()
+    with session_factory() as db:
+        assert db.get(DecisionTrace, record.trace["id"]).request_text == "req 1"
+
+
+def test_spooled_records_are_recovered_once(session_factory, tmp_path):
+    spool = tmp_path / "spool.jsonl"
+    committed, lost = _record(1), _record(2)
+    committed.log["id"], committed.trace["id"] = 1, 1
+    lost.log["id"], lost.trace["id"] = 2, 2
+    with session_factory() as db:
+        write_records(db, [committed])
+        db.commit()
+    spool.write_text(committed.to_json() + "\n" + lost.to_json() + "\n" + '{"torn', encoding="utf-8")
+
+    writer = TraceWriter(session_factory, spool_path=spool)
+    assert writer.recover() == 1
+    assert _count(session_factory, GateLog) == 2
+    assert _count(session_factory, DecisionTraceAnchor) == 2
+    assert not spool.exists()
+
+
+def _orphan(tmp_path, spool_id: str, log_id: int):
+    """Another process's spool: its lock file and one segment holding an uncommitted record."""
+    record = _record(log_id)
+    record.log["id"], record.trace["id"] = log_id, log_id
+    (tmp_path / f"{spool_id}.000000.jsonl").write_text(record.to_json() + "\n", encoding="utf-8")
+    (tmp_path / f"{spool_id}.lock").touch()
+
+
+def test_only_spools_of_dead_processes_are_recovered(session_factory, tmp_path):
+    _orphan(tmp_path, "spool.101-aaaa", 1)
+    _orphan(tmp_path, "spool.102-bbbb", 2)
+    live = open(tmp_path / "spool.102-bbbb.lock", "rb")
+    assert _try_lock(live)  # process 102 is still running
+
+    writer = TraceWriter(session_factory, spool_path=tmp_path / "spool.jsonl")
+    assert writer.recover() == 1
+    with session_factory() as db:
+        assert list(db.scalars(select(GateLog.id))) == [1]
+    assert sorted(p.name for p in tmp_path.glob("spool.*")) == ["spool.102-bbbb.000000.jsonl", "spool.102-bbbb.lock"]
+
+    live.close()  # process 102 dies
+    assert writer.recover() == 1
+    assert _count(session_factory, GateLog) == 2
+    assert list(tmp_path.glob("spool.*")) == []
+
+
+def test_committed_segments_are_rotated_away(session_factory, tmp_path):
+    writer = TraceWriter(session_factory, spool_path=tmp_path / "spool.jsonl", segment_bytes=1)
+    for i in range(5):
+        writer.submit(_record(i))
+        # Every record fills a segment; once committed, only the fresh, empty one is left.
+        (segment,) = tmp_path.glob("spool.*.jsonl")
+        assert segment.stat().st_size == 0
+    assert writer.stats()["spool_segments"] <= 1
+    writer.close()
+    assert _count(session_factory, GateLog) == 5
+    assert list(tmp_path.glob("spool.*")) == []
+
+
+def test_allocator_skips_rows_written_without_it(session_factory):
+    with session_factory() as db:
+        write_records(db, [_record(1), _record(2)])
+        db.commit()
+
+    logs = IdBlockAllocator(session_factory, GateLog, block_size=3)
+    assert [logs.next_id() for _ in range(4)] == [3, 4, 5, 6]
+    other = IdBlockAllocator(session_factory, GateLog, block_size=3)
+    assert other.next_id() == 9
+
+
+def test_write_records_assigns_ids_in_order(session_factory):
+    records = [_record(i) for i in range(3)]
+    with session_factory() as db:
+        write_records(db, records)
+        db.commit()
+        for r in records:
+            assert db.get(GateLog, r.log["id"]).request_summary == r.log["request_summary"]
+            assert db.get(DecisionTrace, r.trace["id"]).anchors[0].anchor_hash == "h"
+
+
+def test_recovery_rejects_bad_records_and_keeps_the_rest(session_factory, tmp_path):
+    good, bad = _record(1), _record(2)
+    good.log["id"], good.trace["id"] = 1, 1
+    bad.log["id"], bad.trace["id"] = 2, 2
+    bad.trace["decision"] = None
+    spool = tmp_path / "spool.jsonl"
+    spool.write_text(good.to_json() + "\n" + bad.to_json() + "\n", encoding="utf-8")
+
+    writer = TraceWriter(session_factory, spool_path=spool)
+    assert writer.recover() == 1
+    with session_factory() as db:
+        assert list(db.scalars(select(GateLog.id))) == [1]
+    assert writer.stats()["rejected"] == 1
+    rejected = (tmp_path / "spool.jsonl.rejected.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [TraceRecord.from_json(line).log["id"] for line in rejected] == [2]
+
+
+def test_a_failing_batch_does_not_stop_the_writer(session_factory, tmp_path, monkeypatch):
+    writer = TraceWriter(session_factory, spool_path=tmp_path / "spool.jsonl")
+    commit_batch = writer._commit_batch
+    calls = []
+
+    def fail_first(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise OSError("rejected file is read-only")
+        return commit_batch(batch)
+
+    monkeypatch.setattr(writer, "_commit_batch", fail_first)
+    with pytest.raises(OSError):
+        writer.submit(_record(1))
+    second = writer.submit(_record(2))
+    assert writer.flush(timeout=10)
+    writer.close()
+    with session_factory() as db:
+        assert list(db.scalars(select(GateLog.id))) == [second.log["id"]]
+
+
+def test_acks_give_up_after_the_timeout(session_factory, tmp_path, monkeypatch):
+    writer = TraceWriter(session_factory, spool_path=tmp_path / "spool.jsonl", queue_size=1, ack_timeout_s=0.05)
+    commit_batch = writer._commit_batch
+    unblock = threading.Event()
+    monkeypatch.setattr(writer, "_commit_batch", lambda batch: unblock.wait(10) and commit_batch(batch))
+
+    with pytest.raises(TraceAckTimeout):
+        writer.submit(_record(1))  # its batch can't commit in time
+    writer.enqueue(_record(2))  # fills the queue
+    with pytest.raises(TraceAckTimeout):
+        writer.enqueue(_record(3))  # no room in time
+    assert writer.stats()["pending"] == 2
+
+    unblock.set()
+    assert writer.flush(timeout=10)
+    writer.close()
+    assert _count(session_factory, GateLog) == 2
+
+
+def test_evaluate_answers_503_when_the_writer_does_not_ack(session_factory, monkeypatch):
+    class StalledWriter:
+        def submit(self, record):
+            raise TraceAckTimeout(0.05)
+
+    monkeypatch.setattr(gate, "trace_writer_enabled", lambda: True)
+    monkeypatch.setattr(gate, "get_trace_writer", StalledWriter)
+    with session_factory() as db:
+        with pytest.raises(HTTPException) as exc:
+            gate.evaluate(GateEvaluateIn(request_summary="ship it"), Response(), db=db, tenant=SimpleNamespace(id=1))
+    assert exc.value.status_code == 503
+
+
+def test_reframe_takes_its_log_id_from_the_writer(session_factory, tmp_path, monkeypatch):
+    # The batch waits for a second record, so the first is still queued while reframe inserts.
+    writer = TraceWriter(
+        session_factory, spool_path=tmp_path / "spool.jsonl", ack="enqueue", batch_max=2, batch_wait_ms=500
+    )
+    monkeypatch.setattr(gate, "trace_writer_enabled", lambda: True)
+    monkeypatch.setattr(gate, "get_trace_writer", lambda: writer)
+    with session_factory() as db:
+        parent = GateLog(request_summary="ship it", decision="gate")
+        db.add(parent)
+        db.commit()
+        parent_id = parent.id
+
+    queued = writer.submit(_record(1))
+    with session_factory() as db:
+        payload = GateReframeIn(log_id=parent_id, new_intent="ship it later")
+        out = gate.reframe(payload, db=db, tenant=SimpleNamespace(id=1))
+    assert writer.flush(timeout=10)
+    writer.close()
+
+    assert out.log_id != queued.log["id"]
+    assert writer.stats()["rejected"] == 0
+    assert not (tmp_path / "spool.jsonl.rejected.jsonl").exists()
+    with session_factory() as db:
+        assert db.get(GateLog, queued.log["id"]).request_summary == "req 1"
+        assert db.get(GateLog, out.log_id).user_choice == f"reframe_from:{parent_id}"